@@ -16,8 +16,13 @@ db = SQLAlchemy()
 jwt = JWTManager()
 migrate = Migrate()
 
-def create_app():
-    """Application factory function to create and configure Flask app"""
+def create_app(test_config=None):
+    """
+    Application factory function to create and configure Flask app
+
+    Args:
+        test_config: Optional mapping applied over the environment-based config (e.g. by the test suite)
+    """
     app = Flask(__name__)
     
     # Application Configuration
@@ -32,6 +37,57 @@ def create_app():
     app.config['MINIO_ACCESS_KEY'] = os.environ.get('MINIO_ACCESS_KEY', 'admin')
     app.config['MINIO_SECRET_KEY'] = os.environ.get('MINIO_SECRET_KEY', 'password123')
     app.config['MINIO_BUCKET_NAME'] = os.environ.get('MINIO_BUCKET_NAME', 'qc-images')
+    app.config['MINIO_EXTERNAL_ENDPOINT'] = os.environ.get('MINIO_EXTERNAL_ENDPOINT', 'localhost:9000')
+    app.config['MINIO_SECURE'] = os.environ.get('MINIO_SECURE', 'False').lower() == 'true'
+    app.config['MINIO_BUCKET_CHECK_BACKOFF'] = float(os.environ.get('MINIO_BUCKET_CHECK_BACKOFF', 0.5))  # Seconds of fail-fast after the first failed bucket check, doubled per failure
+    app.config['MINIO_BUCKET_CHECK_MAX_BACKOFF'] = float(os.environ.get('MINIO_BUCKET_CHECK_MAX_BACKOFF', 30))  # Cap on that fail-fast window
+    app.config['IMAGE_CACHE_MAX_AGE'] = int(os.environ.get('IMAGE_CACHE_MAX_AGE', 86400))  # Browser cache for /serve-image
+    app.config['EXPORT_PREFETCH_CONCURRENCY'] = int(os.environ.get('EXPORT_PREFETCH_CONCURRENCY', 8))  # Parallel MinIO reads during ZIP export
+    app.config['EXPORT_PREFETCH_MAX_BYTES'] = int(os.environ.get('EXPORT_PREFETCH_MAX_BYTES', 64 * 1024 * 1024))  # Object bytes held in memory ahead of the ZIP writer
+    app.config['EXPORT_STREAM_THRESHOLD'] = int(os.environ.get('EXPORT_STREAM_THRESHOLD', 8 * 1024 * 1024))  # Larger objects are streamed instead of prefetched
+    app.config['UPLOAD_SPOOL_MEMORY'] = int(os.environ.get('UPLOAD_SPOOL_MEMORY', 1024 * 1024))  # Archive members larger than this are spooled to disk
+    app.config['CHECKSUM_ALGORITHM'] = os.environ.get('CHECKSUM_ALGORITHM', 'blake2b')  # Hash for new uploads: blake2b, sha256 or md5
+    app.config['IMAGE_DEDUPLICATION'] = os.environ.get('IMAGE_DEDUPLICATION', 'True').lower() == 'true'  # Identical uploads share one stored object
+    app.config['IMAGE_BATCH_MAX_FILES'] = int(os.environ.get('IMAGE_BATCH_MAX_FILES', 1000))  # Files accepted by one POST /images/batch
+    app.config['IMAGE_BATCH_UPLOAD_CONCURRENCY'] = int(os.environ.get('IMAGE_BATCH_UPLOAD_CONCURRENCY', 8))  # Parallel MinIO puts per batch
+    app.config['PRESIGN_CACHE_SIZE'] = int(os.environ.get('PRESIGN_CACHE_SIZE', 50000))  # Presigned URLs kept in memory per worker
+    app.config['PRESIGN_CONCURRENCY'] = int(os.environ.get('PRESIGN_CONCURRENCY', 4))  # Signing threads for bulk presigning
+
+    # Endpoint discovery (Docker gateway) - explicit URLs skip discovery entirely
+    app.config['LABEL_STUDIO_URL'] = os.environ.get('LABEL_STUDIO_URL')
+    app.config['MINIO_LABEL_STUDIO_ENDPOINT'] = os.environ.get('MINIO_LABEL_STUDIO_ENDPOINT')
+    app.config['ENDPOINT_CACHE_TTL'] = int(os.environ.get('ENDPOINT_CACHE_TTL', 300))
+
+    # Label Studio imports send only new images, in chunks, several at a time
+    app.config['LABEL_STUDIO_IMPORT_CHUNK_SIZE'] = int(os.environ.get('LABEL_STUDIO_IMPORT_CHUNK_SIZE', 200))
+    app.config['LABEL_STUDIO_IMPORT_CONCURRENCY'] = int(os.environ.get('LABEL_STUDIO_IMPORT_CONCURRENCY', 4))
+    app.config['LABEL_STUDIO_IMPORT_TIMEOUT'] = int(os.environ.get('LABEL_STUDIO_IMPORT_TIMEOUT', 60))  # Seconds per chunk request
+    app.config['LABEL_STUDIO_SYNC_OVERLAP'] = int(os.environ.get('LABEL_STUDIO_SYNC_OVERLAP', 1000))  # Image ids below the cursor re-checked for late commits
+    app.config['LABEL_STUDIO_PROJECT_CLAIM_TIMEOUT'] = int(os.environ.get('LABEL_STUDIO_PROJECT_CLAIM_TIMEOUT', 60))  # Seconds before an unfinished project creation can be retried
+    app.config['LABEL_STUDIO_CLEANUP_INTERVAL'] = int(os.environ.get('LABEL_STUDIO_CLEANUP_INTERVAL', 0))  # Seconds between unattended duplicate cleanups (opt-in, 0 disables)
+    app.config['LABEL_STUDIO_SERVICE_TOKEN'] = os.environ.get('LABEL_STUDIO_SERVICE_TOKEN')  # Token the scheduled cleanup runs with; user tokens are never used unattended
+
+    # Per-worker limits for heavy endpoints (0 disables); excess requests get 503 + Retry-After
+    app.config['EXPORT_CONCURRENCY_LIMIT'] = int(os.environ.get('EXPORT_CONCURRENCY_LIMIT', 2))
+    app.config['LABEL_STUDIO_IMPORT_CONCURRENCY_LIMIT'] = int(os.environ.get('LABEL_STUDIO_IMPORT_CONCURRENCY_LIMIT', 2))
+    app.config['LABEL_STUDIO_CLEANUP_CONCURRENCY_LIMIT'] = int(os.environ.get('LABEL_STUDIO_CLEANUP_CONCURRENCY_LIMIT', 1))
+    app.config['IMAGE_BATCH_CONCURRENCY_LIMIT'] = int(os.environ.get('IMAGE_BATCH_CONCURRENCY_LIMIT', 4))
+
+    # Background jobs (?async=true on import/cleanup/download) run in `flask jobs worker`, not in web workers
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))  # Concurrent jobs per worker process
+    app.config['JOB_RUN_IN_PROCESS'] = os.environ.get('JOB_RUN_IN_PROCESS', 'False').lower() == 'true'  # Also run jobs inside this process (single-process development only)
+    app.config['JOB_POLL_INTERVAL'] = int(os.environ.get('JOB_POLL_INTERVAL', 2))
+    app.config['JOB_STALE_AFTER'] = int(os.environ.get('JOB_STALE_AFTER', 300))  # Seconds without heartbeat before a running job is failed
+
+    # Integrity verification of stored images; POST /images/verify starts a pass on demand, and
+    # setting IMAGE_VERIFICATION_INTERVAL on the jobs worker (e.g. 604800 for weekly) schedules it
+    app.config['IMAGE_VERIFICATION_INTERVAL'] = int(os.environ.get('IMAGE_VERIFICATION_INTERVAL', 0))  # Seconds between scheduled passes (opt-in, 0 disables)
+    app.config['IMAGE_VERIFICATION_CONCURRENCY'] = int(os.environ.get('IMAGE_VERIFICATION_CONCURRENCY', 2))  # Objects hashed in parallel
+    app.config['IMAGE_VERIFICATION_RATE'] = int(os.environ.get('IMAGE_VERIFICATION_RATE', 16 * 1024 * 1024))  # Bytes per second read from MinIO (0 = unthrottled)
+    app.config['IMAGE_VERIFICATION_BATCH_SIZE'] = int(os.environ.get('IMAGE_VERIFICATION_BATCH_SIZE', 200))  # Images per committed batch
+
+    if test_config:
+        app.config.update(test_config)
 
     # Initialize extensions with app
     db.init_app(app)
@@ -42,18 +98,37 @@ def create_app():
         "http://localhost:3000",  # Frontend development server
         "http://127.0.0.1:3000",  # Alternative localhost format
         "http://0.0.0.0:3000"     # Docker internal access
-    ], supports_credentials=True)
+    ], supports_credentials=True, expose_headers=['X-Next-Cursor', 'X-Total-Count', 'Link', 'Retry-After'])
     
     migrate.init_app(app, db)
 
+    # Resolve Label Studio / MinIO gateway endpoints once at startup (cached with TTL)
+    from .services.endpoint_resolver import endpoint_resolver
+    endpoint_resolver.init_app(app)
+
+    # Bind object storage; the client connects lazily on first use
+    from .services.minio_service import minio_service
+    minio_service.init_app(app)
+
+    # Deduplicate identical uploads onto shared, reference-counted objects
+    from .services.content_store import content_store
+    content_store.init_app(app)
+
+    # Background job queue for long-running imports, cleanups and exports (`flask jobs worker`)
+    from .services.job_queue import job_queue
+    job_queue.init_app(app)
+
     # Register blueprints
     from . import routes
     app.register_blueprint(routes.bp)
 
 
     # Automatically create tables if they do not exist (at startup)
+    # Workers boot concurrently, so only one of them may issue the CREATE TABLE statements
+    from .services.concurrency import advisory_lock
     with app.app_context():
-        db.create_all()
+        with advisory_lock('schema', 'create_all'):
+            db.create_all()
 
     # Label Studio integration is user-driven via personal access tokens
     # No automatic initialization required
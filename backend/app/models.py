@@ -1,6 +1,6 @@
 """
 Database Models for the QC Management System
-Defines all SQLAlchemy models for users, companies, products, steps, class counts, and captured images.
+Defines all SQLAlchemy models for users, companies, products, steps, class counts, captured images, their stored objects and variants, background jobs and their schedules and Label Studio project registry and sync state.
 """
 
 from . import db
@@ -33,7 +33,7 @@ class Company(db.Model):
 class Product(db.Model):
     """Product model representing items manufactured by companies"""
     id = db.Column(db.Integer, primary_key=True)
-    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     image_url = db.Column(db.String(500), nullable=True)
     # Relationships
@@ -42,7 +42,7 @@ class Product(db.Model):
 class ClassCount(db.Model):
     """ClassCount model for tracking different classes in products (renamed for legacy compatibility)"""
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
     class_ = db.Column('class', db.String(255), nullable=False)
 
 class CapturedImage(db.Model):
@@ -51,25 +51,182 @@ class CapturedImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, nullable=False, server_default=db.func.now())  # Keyset pagination column, never NULL
     
     # MinIO/Object Storage fields
     storage_url = db.Column(db.String(1000), nullable=True)  # Full URL to access the image
     storage_bucket = db.Column(db.String(100), default='qc-images')  # Bucket name
-    storage_key = db.Column(db.String(500), nullable=True)  # Object key/path in storage
+    storage_key = db.Column(db.String(500), nullable=True, index=True)  # Object key/path in storage
     file_size = db.Column(db.BigInteger, nullable=True)  # File size in bytes
     mime_type = db.Column(db.String(100), default='image/jpeg')  # MIME type
-    checksum = db.Column(db.String(64), nullable=True)  # MD5 or SHA256 for integrity
+    checksum = db.Column(db.String(64), nullable=True, index=True)  # Content hash for integrity and deduplication
+    checksum_algorithm = db.Column(db.String(16), nullable=True)  # blake2b, sha256 or md5 (NULL: MD5, hashed before this was recorded)
     storage_provider = db.Column(db.String(50), default='minio')  # Storage provider type
+    
+    # Integrity verification
+    integrity_status = db.Column(db.String(20), nullable=True, index=True)  # ok, corrupt or missing (NULL: not verified yet)
+    verified_at = db.Column(db.DateTime, nullable=True)  # When the stored object was last re-hashed
+
+    __table_args__ = (
+        # Per-product listings/imports ordered by time (also serves plain product_id lookups)
+        db.Index('ix_captured_image_product_id_timestamp_id', 'product_id', 'timestamp', 'id'),
+        # Keyset pagination over all images
+        db.Index('ix_captured_image_timestamp_id', 'timestamp', 'id'),
+    )
 
     # Relationships
     product = db.relationship('Product', backref='images')
     
-    def get_access_url(self, expires=3600):
-        """Get a URL for accessing the image via backend serving endpoint"""
+    def get_access_url(self, expires=3600, base_url=None, presigned=False):
+        """
+        Get a URL for accessing the image via backend serving endpoint
+        
+        Pass base_url when building many URLs to avoid a config lookup per row. With
+        presigned=True a direct MinIO presigned URL valid for `expires` seconds is returned
+        instead (served from the presigned URL cache when possible).
+        """
         if self.storage_provider == 'minio' and self.storage_key:
+            if presigned:
+                from .services.minio_service import minio_service
+                return minio_service.get_presigned_url(self.storage_key, expires=expires)
             # Use backend serving endpoint instead of presigned URLs
-            from flask import current_app
-            base_url = current_app.config.get('EXTERNAL_URL', 'http://localhost:5000')
+            if base_url is None:
+                from flask import current_app
+                base_url = current_app.config.get('EXTERNAL_URL', 'http://localhost:5000')
             return f"{base_url}/serve-image/{self.storage_key}"
         return self.storage_url
+    
+    def get_thumbnail_url(self, width=360, height=240, fmt='webp', base_url=None):
+        """Get a URL for a downscaled variant of the image (generated and cached on first request)"""
+        access_url = self.get_access_url(base_url=base_url)
+        if self.storage_provider == 'minio' and self.storage_key:
+            return f"{access_url}?w={width}&h={height}&fmt={fmt}"
+        return access_url
+
+class StoredObject(db.Model):
+    """StoredObject model reference-counting image objects in storage so identical uploads share one object"""
+    __tablename__ = 'stored_object'
+    id = db.Column(db.Integer, primary_key=True)
+    storage_key = db.Column(db.String(500), nullable=False, unique=True)  # Object key in storage
+    checksum_algorithm = db.Column(db.String(16), nullable=False)  # Algorithm the checksum was computed with
+    checksum = db.Column(db.String(64), nullable=False)  # Content checksum the object is addressed by
+    file_size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=1)  # Images (and in-flight uploads) using the object
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        # Content lookup on upload; the size guards against checksum collisions
+        db.Index('ix_stored_object_checksum_file_size', 'checksum', 'file_size'),
+    )
+
+class ImageVariant(db.Model):
+    """ImageVariant model for resized/thumbnail renditions of captured images stored next to the original"""
+    __tablename__ = 'image_variant'
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('captured_image.id', ondelete='CASCADE'), nullable=False, index=True)
+    width = db.Column(db.Integer, nullable=False)  # Requested bounding box (0 = unconstrained)
+    height = db.Column(db.Integer, nullable=False)
+    format = db.Column(db.String(10), nullable=False)  # jpeg or webp
+    storage_key = db.Column(db.String(500), nullable=False)  # Object key of the variant in storage
+    file_size = db.Column(db.BigInteger, nullable=True)
+    mime_type = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('image_id', 'width', 'height', 'format', name='uq_image_variant_size_format'),
+    )
+
+    # Relationships
+    image = db.relationship('CapturedImage', backref=db.backref('variants', cascade='all, delete-orphan', passive_deletes=True))
+
+class Job(db.Model):
+    """Job model for long-running work (Label Studio import/cleanup, image export) run by the background job queue"""
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # Registered handler name, e.g. 'label_studio_import'
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True, index=True)
+    params = db.Column(db.JSON, nullable=True)  # Keyword arguments passed to the handler
+    progress_current = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(500), nullable=True)  # Latest human-readable progress message
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    artifact_key = db.Column(db.String(500), nullable=True)  # Object key of the produced file in storage
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed while a worker is running the job
+
+    def to_dict(self):
+        """Serialize the job for the /jobs API"""
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'progress': {
+                'current': self.progress_current,
+                'total': self.progress_total,
+                'message': self.message
+            },
+            'result': self.result,
+            'error': self.error,
+            'has_artifact': bool(self.artifact_key),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class JobSchedule(db.Model):
+    """JobSchedule model holding when each periodically scheduled job type is next due"""
+    __tablename__ = 'job_schedule'
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, unique=True)  # Registered handler name
+    next_run_at = db.Column(db.DateTime, nullable=False)  # On the database clock, like created_at
+
+class LabelStudioProject(db.Model):
+    """LabelStudioProject model registering the Label Studio project of a product for a user"""
+    __tablename__ = 'label_studio_project'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False)
+    project_id = db.Column(db.Integer, nullable=True, index=True)  # Label Studio project id, set once created
+    title = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, creating, ready
+    claimed_at = db.Column(db.DateTime, nullable=True)  # When a worker started creating the project
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        # (user, product) is the idempotency key: at most one project is ever created for it
+        db.UniqueConstraint('user_id', 'product_id', name='uq_label_studio_project_user_product'),
+    )
+
+    def to_dict(self):
+        return {'id': self.project_id, 'title': self.title}
+
+class LabelStudioTask(db.Model):
+    """LabelStudioTask model mapping a captured image to the Label Studio task created for it in a project"""
+    __tablename__ = 'label_studio_task'
+    id = db.Column(db.Integer, primary_key=True)
+    image_id = db.Column(db.Integer, db.ForeignKey('captured_image.id', ondelete='CASCADE'), nullable=False)
+    project_id = db.Column(db.Integer, nullable=False)  # Label Studio project id
+    task_id = db.Column(db.Integer, nullable=True, index=True)  # Label Studio task id (when reported by the import API)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        # One task per image and project; also serves the "not yet imported" anti-join
+        db.UniqueConstraint('project_id', 'image_id', name='uq_label_studio_task_project_image'),
+    )
+
+class LabelStudioSyncState(db.Model):
+    """LabelStudioSyncState model holding the per-product import cursor for a Label Studio project"""
+    __tablename__ = 'label_studio_sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False)  # Label Studio project id
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False)
+    last_image_id = db.Column(db.Integer, nullable=False, default=0)  # Every image up to this id has been synced
+    last_synced_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'product_id', name='uq_label_studio_sync_state_project_product'),
+    )
@@ -3,298 +3,252 @@ API Routes for the QC Management System
 Handles all HTTP endpoints for authentication, companies, products, and image management.
 """
 
-from flask import Blueprint, request, jsonify, send_from_directory, current_app, Response, redirect
+from flask import Blueprint, request, jsonify, send_from_directory, current_app, Response, redirect, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from .models import db, User, Company, Product, CapturedImage, ClassCount
-from .services.minio_service import minio_service
+from .models import db, User, Company, Product, CapturedImage, ImageVariant, ClassCount, Job, LabelStudioProject, LabelStudioTask, LabelStudioSyncState
+from .services.minio_service import minio_service, LEGACY_CHECKSUM_ALGORITHM
+from .services.content_store import content_store
+from .services.label_studio_client import label_studio_client, LabelStudioError
+from .services.endpoint_resolver import endpoint_resolver
+from .services.thumbnail_service import thumbnail_service, VARIANT_PREFIX
+from .services.zip_stream import ZipEntry, stream_zip
+from .services.prefetch import prefetch_ordered
+from .services.concurrency import advisory_lock, concurrency_limit
+from .services.job_queue import job_queue, ARTIFACT_PREFIX
 from werkzeug.utils import secure_filename
+from werkzeug.http import is_resource_modified
+from werkzeug.datastructures import FileStorage, MultiDict
+from sqlalchemy import or_, and_, func, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload, contains_eager, load_only
 import os
 import uuid
-import requests
-import subprocess
+import base64
 import json
+import csv
 import tempfile
-import socket
 import time
 import io
 import zipfile
+import tarfile
+import shutil
+from urllib.parse import urlencode
 
 bp = Blueprint('routes', __name__)
 
-def get_docker_gateway_ip():
-    """Dynamically get the Docker gateway IP to reach the host"""
-    try:
-        # Method 1: Try to get gateway from route table
-        try:
-            result = subprocess.run(['ip', 'route', 'show', 'default'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                for line in result.stdout.strip().split('\n'):
-                    if 'default' in line:
-                        parts = line.split()
-                        if 'via' in parts:
-                            gateway_idx = parts.index('via') + 1
-                            if gateway_idx < len(parts):
-                                gateway_ip = parts[gateway_idx]
-                                current_app.logger.info(f"Found gateway IP via route: {gateway_ip}")
-                                return gateway_ip
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
-            pass
-        
-        # Method 2: Try to get gateway from /proc/net/route
-        try:
-            with open('/proc/net/route', 'r') as f:
-                for line in f:
-                    fields = line.strip().split()
-                    if len(fields) >= 3 and fields[1] == '00000000':  # Default route
-                        gateway_hex = fields[2]
-                        # Convert hex to IP (little-endian)
-                        gateway_ip = socket.inet_ntoa(bytes.fromhex(gateway_hex)[::-1])
-                        current_app.logger.info(f"Found gateway IP via /proc/net/route: {gateway_ip}")
-                        return gateway_ip
-        except (IOError, ValueError):
-            pass
-        
-        # Method 3: Try common Docker gateway IPs
-        common_gateways = ['172.17.0.1', '172.18.0.1', '172.19.0.1', '172.20.0.1', '172.21.0.1']
-        for gateway in common_gateways:
-            try:
-                # Test if we can reach Label Studio on this gateway
-                result = subprocess.run(['curl', '-s', '--max-time', '2', 
-                                       f'http://{gateway}:8081/api/projects/', 
-                                       '-w', '%{http_code}'], 
-                                     capture_output=True, text=True, timeout=3)
-                if result.returncode == 0:
-                    # Check if we got a reasonable HTTP response (even 401 is good - means LS is there)
-                    status_code = result.stdout[-3:] if len(result.stdout) >= 3 else '000'
-                    if status_code in ['200', '401', '403']:  # Label Studio is responding
-                        current_app.logger.info(f"Found working gateway IP by testing: {gateway}")
-                        return gateway
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
-                continue
-        
-        # Method 4: Fall back to host.docker.internal if available
-        try:
-            result = subprocess.run(['getent', 'hosts', 'host.docker.internal'], 
-                                  capture_output=True, text=True, timeout=3)
-            if result.returncode == 0:
-                host_ip = result.stdout.split()[0]
-                current_app.logger.info(f"Found host IP via host.docker.internal: {host_ip}")
-                return host_ip
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
-            pass
-        
-        # Default fallback
-        current_app.logger.warning("Could not determine gateway IP, using default 172.20.0.1")
-        return '172.20.0.1'
-        
-    except Exception as e:
-        current_app.logger.error(f"Error determining gateway IP: {str(e)}")
-        return '172.20.0.1'
+def group_oldest_first(items, key):
+    """
+    Group Label Studio objects by key with the oldest (lowest id) first in each group
+
+    Keeping the lowest id makes duplicate cleanup deterministic, so concurrent
+    workers always agree on which project or task survives regardless of the
+    order Label Studio returns them in.
+    """
+    groups = {}
+    for item in items:
+        value = key(item)
+        if value:
+            groups.setdefault(value, []).append(item)
+    for group in groups.values():
+        group.sort(key=lambda item: item.get('id') or 0)
+    return groups
+
+def forget_label_studio_project(project_id):
+    """Drop the registry entry, local task mapping and sync cursors of a deleted Label Studio project"""
+    LabelStudioProject.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    LabelStudioTask.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    LabelStudioSyncState.query.filter_by(project_id=project_id).delete(synchronize_session=False)
+    db.session.commit()
+
+def remap_label_studio_tasks(kept_by_deleted):
+    """Point images mapped to deleted duplicate tasks at the tasks that were kept"""
+    for deleted_task_id, kept_task_id in kept_by_deleted.items():
+        LabelStudioTask.query.filter_by(task_id=deleted_task_id).update({'task_id': kept_task_id}, synchronize_session=False)
+    db.session.commit()
 
-def cleanup_label_studio_duplicates_internal(user):
-    """Internal function to clean up duplicate projects and tasks"""
+def find_duplicate_tasks(base_url, headers, project_id):
+    """
+    Find tasks of a project that share an image filename, keeping the oldest of each
+    
+    Tasks are read page by page and only ids are kept, so memory is bounded by the
+    number of distinct filenames instead of the full task payloads.
+    
+    Returns:
+        List of (duplicate task id, kept task id, filename) tuples
+    """
+    kept = {}
+    duplicates = []
+    for task in label_studio_client.iter_tasks(base_url, project_id, headers):
+        data = task.get('data')
+        task_id = task.get('id')
+        filename = data.get('image_filename') if isinstance(data, dict) else None
+        if not filename or not task_id:
+            continue
+        kept_id = kept.get(filename)
+        if kept_id is None:
+            kept[filename] = task_id
+        elif task_id < kept_id:
+            duplicates.append((kept_id, filename))
+            kept[filename] = task_id
+        else:
+            duplicates.append((task_id, filename))
+    return [(task_id, kept[filename], filename) for task_id, filename in duplicates]
+
+def _cleanup_label_studio_duplicates(user, base_url, progress=None, details=None):
+    """
+    Delete duplicate projects and tasks, keeping the oldest of each; caller holds the cleanup lock
+    
+    Args:
+        user: User whose Label Studio token is used
+        base_url: Label Studio base URL
+        progress: Optional callback progress(current, total, message, force=False)
+        details: Optional list that receives a line per deleted project or task
+        
+    Returns:
+        Dict with deleted_projects and deleted_tasks counts
+        
+    Raises:
+        LabelStudioError: If the project or task lists cannot be fetched
+    """
+    progress = progress or (lambda *args, **kwargs: None)
+    details = details if details is not None else []
+    headers = {
+        'Authorization': f'Token {user.label_studio_api_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    # Group projects by title to find duplicates (oldest first), keeping only ids and titles
+    project_groups = group_oldest_first(
+        ({'id': project.get('id'), 'title': project['title']}
+         for project in label_studio_client.iter_projects(base_url, headers) if 'title' in project),
+        lambda project: project['title']
+    )
+    duplicated = [(title, project_list) for title, project_list in project_groups.items() if len(project_list) > 1]
+    
+    deleted_projects = 0
+    deleted_tasks = 0
+    
+    # Process each group of projects with the same title
+    for index, (title, project_list) in enumerate(duplicated):
+        progress(index, len(duplicated), f"Cleaning up project '{title}'")
+        
+        # Keep the oldest project, delete the rest
+        projects_to_delete = project_list[1:]
+        current_app.logger.info(f"Found {len(project_list)} projects with title '{title}', keeping 1, deleting {len(projects_to_delete)}")
+        
+        for project_to_delete in projects_to_delete:
+            project_id = project_to_delete.get('id')
+            if project_id:
+                # Delete the duplicate project
+                delete_response = label_studio_client.request(
+                    method='DELETE',
+                    url=f'{base_url}/api/projects/{project_id}/',
+                    headers=headers,
+                    timeout=30
+                )
+                
+                if delete_response['success']:
+                    deleted_projects += 1
+                    forget_label_studio_project(project_id)
+                    current_app.logger.info(f"Deleted duplicate project '{title}' with ID {project_id}")
+                    details.append(f"Deleted duplicate project '{title}' (ID: {project_id})")
+                else:
+                    current_app.logger.error(f"Failed to delete project {project_id}: {delete_response}")
+        
+        # Clean up duplicate tasks in the remaining project; deletes run in batches after
+        # the listing so they cannot shift the pages still being read
+        project_id = project_list[0].get('id')
+        if project_id:
+            duplicates = find_duplicate_tasks(base_url, headers, project_id)
+            if duplicates:
+                deleted = set(label_studio_client.delete_tasks(
+                    base_url, project_id, [task_id for task_id, _, _ in duplicates], headers
+                ))
+                remap_label_studio_tasks({
+                    task_id: kept_task_id for task_id, kept_task_id, _ in duplicates if task_id in deleted
+                })
+                deleted_tasks += len(deleted)
+                current_app.logger.info(f"Deleted {len(deleted)} of {len(duplicates)} duplicate tasks in project {project_id}")
+                details.extend(
+                    f"Deleted duplicate task for '{filename}' (ID: {task_id})"
+                    for task_id, _, filename in duplicates if task_id in deleted
+                )
+    
+    if deleted_projects > 0 or deleted_tasks > 0:
+        current_app.logger.info(f"Cleanup completed: {deleted_projects} duplicate projects and {deleted_tasks} duplicate tasks deleted")
+    
+    return {'deleted_projects': deleted_projects, 'deleted_tasks': deleted_tasks}
+
+def label_studio_project_title(product):
+    """Label Studio project title for a product (at least 3 characters, as Label Studio requires)"""
+    base_title = product.name.strip()
+    if len(base_title) < 3:
+        return f'{base_title}_QC_Project'  # Append suffix to make it longer
+    return base_title
+
+def reserve_label_studio_project(user, product, title):
+    """
+    Get or create the registry entry for (user, product)
+    
+    Concurrent callers race on the unique constraint; the losers read the winner's row.
+    """
+    entry = LabelStudioProject.query.filter_by(user_id=user.id, product_id=product.id).first()
+    if entry:
+        return entry
     try:
-        base_url = get_label_studio_base_url()
-        headers = {
-            'Authorization': f'Token {user.label_studio_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Get all projects
-        projects_response = execute_curl_command(
-            method='GET',
-            url=f'{base_url}/api/projects/',
-            headers=headers,
-            timeout=30
+        entry = LabelStudioProject(user_id=user.id, product_id=product.id, title=title, status='pending')
+        db.session.add(entry)
+        db.session.commit()
+        return entry
+    except IntegrityError:
+        db.session.rollback()
+        return LabelStudioProject.query.filter_by(user_id=user.id, product_id=product.id).one()
+
+def claim_label_studio_project(entry_id, stale_after):
+    """
+    Atomically take over creating the project of a registry entry
+    
+    Returns:
+        True if this request must create the project, False if it already exists or
+        another request is creating it (claims older than stale_after seconds are taken over)
+    """
+    from datetime import datetime, timedelta
+    
+    now = datetime.utcnow()
+    table = LabelStudioProject.__table__
+    claimed = db.session.execute(
+        update(table)
+        .where(
+            table.c.id == entry_id,
+            table.c.project_id.is_(None),
+            or_(table.c.status == 'pending', table.c.claimed_at < now - timedelta(seconds=stale_after))
         )
-        
-        if not projects_response['success']:
-            current_app.logger.warning("Failed to fetch projects for cleanup")
-            return {'deleted_projects': 0, 'deleted_tasks': 0}
-        
-        projects = projects_response['json']
-        if not isinstance(projects, list):
-            current_app.logger.warning("Invalid response format from Label Studio during cleanup")
-            return {'deleted_projects': 0, 'deleted_tasks': 0}
-        
-        # Group projects by title to find duplicates
-        project_groups = {}
-        for project in projects:
-            if isinstance(project, dict) and 'title' in project:
-                title = project['title']
-                if title not in project_groups:
-                    project_groups[title] = []
-                project_groups[title].append(project)
-        
-        deleted_projects = 0
-        deleted_tasks = 0
-        
-        # Process each group of projects with the same title
-        for title, project_list in project_groups.items():
-            if len(project_list) > 1:
-                # Keep the first project, delete the rest
-                projects_to_delete = project_list[1:]
-                
-                current_app.logger.info(f"Auto-cleanup: Found {len(project_list)} projects with title '{title}', deleting {len(projects_to_delete)} duplicates")
-                
-                for project_to_delete in projects_to_delete:
-                    project_id = project_to_delete.get('id')
-                    if project_id:
-                        # Delete the duplicate project
-                        delete_response = execute_curl_command(
-                            method='DELETE',
-                            url=f'{base_url}/api/projects/{project_id}/',
-                            headers=headers,
-                            timeout=30
-                        )
-                        
-                        if delete_response['success']:
-                            deleted_projects += 1
-                            current_app.logger.info(f"Auto-cleanup: Deleted duplicate project '{title}' with ID {project_id}")
-                
-                # Clean up duplicate tasks in the remaining project
-                if project_list:
-                    remaining_project = project_list[0]
-                    project_id = remaining_project.get('id')
-                    
-                    if project_id:
-                        # Get tasks for the remaining project
-                        tasks_response = execute_curl_command(
-                            method='GET',
-                            url=f'{base_url}/api/projects/{project_id}/tasks/',
-                            headers=headers,
-                            timeout=30
-                        )
-                        
-                        if tasks_response['success'] and tasks_response['json']:
-                            tasks = tasks_response['json']
-                            
-                            # Group tasks by image filename to find duplicates
-                            task_groups = {}
-                            for task in tasks:
-                                if isinstance(task, dict) and 'data' in task:
-                                    filename = task['data'].get('image_filename')
-                                    if filename:
-                                        if filename not in task_groups:
-                                            task_groups[filename] = []
-                                        task_groups[filename].append(task)
-                            
-                            # Delete duplicate tasks
-                            for filename, task_list in task_groups.items():
-                                if len(task_list) > 1:
-                                    tasks_to_delete = task_list[1:]  # Keep first, delete rest
-                                    
-                                    for task_to_delete in tasks_to_delete:
-                                        task_id = task_to_delete.get('id')
-                                        if task_id:
-                                            delete_task_response = execute_curl_command(
-                                                method='DELETE',
-                                                url=f'{base_url}/api/tasks/{task_id}/',
-                                                headers=headers,
-                                                timeout=30
-                                            )
-                                            
-                                            if delete_task_response['success']:
-                                                deleted_tasks += 1
-                                                current_app.logger.info(f"Auto-cleanup: Deleted duplicate task for '{filename}' with ID {task_id}")
-        
-        if deleted_projects > 0 or deleted_tasks > 0:
-            current_app.logger.info(f"Auto-cleanup completed: {deleted_projects} duplicate projects and {deleted_tasks} duplicate tasks deleted")
-        
-        return {'deleted_projects': deleted_projects, 'deleted_tasks': deleted_tasks}
-        
-    except Exception as e:
-        current_app.logger.error(f"Error during auto-cleanup: {str(e)}")
-        return {'deleted_projects': 0, 'deleted_tasks': 0}
+        .values(status='creating', claimed_at=now)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
 
-def get_label_studio_base_url():
-    """Get the base URL for Label Studio API calls"""
-    gateway_ip = get_docker_gateway_ip()
-    return f'http://{gateway_ip}:8081'
+def release_label_studio_project(entry_id, project_id=None, title=None):
+    """Record the created project on the registry entry, or give up the claim if project_id is None"""
+    values = {'status': 'ready', 'project_id': project_id, 'title': title} if project_id else {'status': 'pending'}
+    db.session.rollback()  # Creation may have failed mid-transaction
+    db.session.execute(update(LabelStudioProject.__table__).where(LabelStudioProject.__table__.c.id == entry_id).values(**values))
+    db.session.commit()
 
-def execute_curl_command(method, url, headers=None, data=None, timeout=30):
-    """Execute a curl command and return the response"""
-    try:
-        # Build curl command with status code extraction from the start
-        curl_cmd = ['curl', '-s', '--max-time', str(timeout), '-X', method.upper(), '-w', '%{http_code}']
-        
-        # Add headers
-        if headers:
-            for key, value in headers.items():
-                curl_cmd.extend(['-H', f'{key}: {value}'])
-        
-        # Add data for POST requests
-        if data and method.upper() in ['POST', 'PUT', 'PATCH']:
-            if isinstance(data, (dict, list)):
-                data = json.dumps(data)
-            curl_cmd.extend(['-d', data])
-        
-        # Add URL
-        curl_cmd.append(url)
-        
-        # Execute curl command ONLY ONCE
-        request_id = f"curl-{int(time.time())}-{os.getpid()}"
-        current_app.logger.info(f"[{request_id}] STARTING curl execution: {method} {url}")
-        current_app.logger.info(f"[{request_id}] Full curl command: {' '.join(curl_cmd[:10])}...")  # Don't log sensitive data
-        
-        result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=timeout)
-        
-        current_app.logger.info(f"[{request_id}] COMPLETED curl execution with return code: {result.returncode}")
-        current_app.logger.info(f"[{request_id}] COMPLETED curl execution with return code: {result.returncode}")
-        
-        # Parse response
-        response_data = {
-            'status_code': 0,
-            'text': '',
-            'success': result.returncode == 0,
-            'json': {}
-        }
-        
-        # Extract HTTP status code and response body
-        if result.returncode == 0 and result.stdout:
-            try:
-                # The last 3 characters should be the HTTP status code
-                full_output = result.stdout
-                if len(full_output) >= 3:
-                    status_code = int(full_output[-3:])
-                    response_data['status_code'] = status_code
-                    response_data['text'] = full_output[:-3]  # Remove status code from body
-                    
-                    current_app.logger.info(f"[{request_id}] HTTP Status: {status_code}, Response length: {len(response_data['text'])}")
-                    
-                    # Try to parse JSON response
-                    if response_data['text']:
-                        try:
-                            response_data['json'] = json.loads(response_data['text'])
-                            current_app.logger.info(f"[{request_id}] Successfully parsed JSON response")
-                        except json.JSONDecodeError:
-                            current_app.logger.warning(f"[{request_id}] Failed to parse JSON response")
-                            response_data['json'] = {}
-                    else:
-                        response_data['json'] = {}
-            except (ValueError, IndexError):
-                current_app.logger.warning(f"[{request_id}] Could not parse status code from curl output: {result.stdout}")
-                response_data['text'] = result.stdout
-        
-        current_app.logger.info(f"[{request_id}] FINAL RESULT: Status {response_data['status_code']}, Success: {response_data['success']}")
-        return response_data
-        
-    except subprocess.TimeoutExpired:
-        return {
-            'status_code': 0,
-            'text': 'Request timeout',
-            'success': False,
-            'json': {}
-        }
-    except Exception as e:
-        current_app.logger.error(f"Curl command failed: {str(e)}")
-        return {
-            'status_code': 0,
-            'text': f'Curl execution failed: {str(e)}',
-            'success': False,
-            'json': {}
-        }
+def wait_for_label_studio_project(entry_id, timeout):
+    """Wait for another request to finish creating the project; returns the entry or None on timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.commit()  # End the transaction so the next read sees the other worker's commit
+        entry = db.session.get(LabelStudioProject, entry_id, populate_existing=True)
+        if entry is None or entry.project_id or entry.status == 'pending':
+            return entry
+        time.sleep(0.25)
+    return None
+
+def get_label_studio_base_url():
+    """Get the base URL for Label Studio API calls (cached by the endpoint resolver)"""
+    return endpoint_resolver.get_label_studio_base_url()
 
 # =============================================================================
 # LABEL STUDIO API KEY ENDPOINTS
@@ -356,7 +310,7 @@ def get_label_studio_api_key_status():
 @bp.route('/label-studio/test-connection', methods=['POST'])
 @jwt_required()
 def test_label_studio_connection():
-    """Test the Label Studio API connection with the user's Legacy Token using curl"""
+    """Test the Label Studio API connection with the user's Legacy Token"""
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     
@@ -369,7 +323,7 @@ def test_label_studio_connection():
     try:
         current_app.logger.info(f"Testing connection with legacy token ending in: ...{user.label_studio_api_key[-4:] if user.label_studio_api_key else 'None'}")
         
-        # Use curl to test connection to Label Studio via dynamic gateway discovery
+        # Test connection to Label Studio via dynamic gateway discovery
         base_url = get_label_studio_base_url()
         headers = {
             'Authorization': f'Token {user.label_studio_api_key}',
@@ -378,7 +332,7 @@ def test_label_studio_connection():
         
         current_app.logger.info(f"Using Label Studio URL: {base_url}")
         
-        response = execute_curl_command(
+        response = label_studio_client.request(
             method='GET',
             url=f'{base_url}/api/projects/',
             headers=headers,
@@ -405,10 +359,98 @@ def test_label_studio_connection():
         current_app.logger.error(f"Connection test error: {str(e)}")
         return jsonify({'error': f'Connection test failed: {str(e)}'}), 500
 
+def create_label_studio_project_remote(user, product, project_title):
+    """
+    Create the Label Studio project of a product; the caller holds the registry claim
+    
+    A project with the same title that predates the registry is adopted instead of
+    creating a second one.
+    
+    Returns:
+        Tuple of (response payload dict, HTTP status code); on success payload['project']
+        holds the Label Studio project
+    """
+    base_url = get_label_studio_base_url()
+    headers = {
+        'Authorization': f'Token {user.label_studio_api_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    # Get classes for this product
+    labels = [cc.class_ for cc in ClassCount.query.filter_by(product_id=product.id).all()]
+    
+    # Pages are fetched only until the title is found
+    try:
+        existing_project = label_studio_client.find_project(base_url, project_title, headers)
+    except LabelStudioError as e:
+        # Continue with project creation if we can't check for duplicates
+        existing_project = None
+        current_app.logger.warning(f"Failed to fetch existing projects: {str(e)}")
+    
+    if existing_project:
+        current_app.logger.info(f"Project '{project_title}' already exists with ID: {existing_project.get('id')}")
+        return {
+            'success': True,
+            'project': existing_project,
+            'message': f'Project "{project_title}" already exists',
+            'labels': labels,
+            'project_url': f'http://localhost:8081/projects/{existing_project.get("id")}'
+        }, 200
+    
+    if not labels:
+        return {'error': 'No classes found for this product. Please add classes first.'}, 400
+    
+    # Prepare project data for Label Studio
+    project_data = {
+        'title': project_title,
+        'description': f'Quality control project for {project_title}',
+        'label_config': '''<View>
+      <Image name="image_object" value="$image_url"/>
+      <RectangleLabels name="label" toName="image_object">
+    ''' + '\n'.join([f'    <Label value="{label}" background="red"/>' for label in labels]) + '''
+      </RectangleLabels>
+    </View>'''
+    }
+    
+    current_app.logger.info(f"Creating Label Studio project '{project_data['title']}' with {len(labels)} labels at {base_url}")
+    current_app.logger.info(f"Project creation request ID: {request.headers.get('X-Request-ID', 'unknown')}")
+    current_app.logger.info(f"Project data being sent: {project_data}")
+    
+    response = label_studio_client.request(
+        method='POST',
+        url=f'{base_url}/api/projects/',
+        headers=headers,
+        data=project_data,
+        timeout=30
+    )
+    
+    if response['success'] and response['status_code'] == 201:
+        project_info = response['json']
+        current_app.logger.info(f"Project created successfully with ID: {project_info.get('id')}")
+        return {
+            'success': True,
+            'project': project_info,
+            'message': f'Project "{project_info.get("title")}" created successfully',
+            'labels': labels,
+            'project_url': f'http://localhost:8081/projects/{project_info.get("id")}'
+        }, 200
+    
+    error_detail = response['text'] or f"HTTP {response['status_code']}"
+    current_app.logger.error(f"Failed to create project. Status: {response['status_code']}, Response: {error_detail}")
+    
+    if response['status_code'] == 401:
+        return {'error': 'Legacy Token authentication failed. Please verify your Legacy Token is correct.'}, 401
+    elif response['status_code'] == 403:
+        return {'error': 'Access forbidden. Please check your Legacy Token permissions.'}, 403
+    return {
+        'error': f'Failed to create Label Studio project: {error_detail}',
+        'status_code': response['status_code']
+    }, 400
+
 @bp.route('/label-studio/create-project', methods=['POST'])
 @jwt_required()
 def create_label_studio_project():
-    """Create a Label Studio project for a specific product with classes as labels using curl"""
+    """Create a Label Studio project for a specific product with classes as labels"""
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -433,130 +475,328 @@ def create_label_studio_project():
             return jsonify({'error': 'Product not found'}), 404
 
         # Create a unique project title for deduplication check
-        # Ensure the title is at least 3 characters long as required by Label Studio
-        base_title = product.name.strip()
-        if len(base_title) < 3:
-            project_title = f'{base_title}_QC_Project'  # Append suffix to make it longer
-        else:
-            project_title = base_title
-            
-        current_app.logger.info(f"Product name: '{product.name}', base_title: '{base_title}', final project_title: '{project_title}', length: {len(project_title)}")
-        
-        # Check if project with this exact title already exists in Label Studio
-        base_url = get_label_studio_base_url()
-        headers = {
-            'Authorization': f'Token {user.label_studio_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # First, get existing projects to check for duplicates
-        existing_projects_response = execute_curl_command(
-            method='GET',
-            url=f'{base_url}/api/projects/',
-            headers=headers,
-            timeout=30
-        )
-        
-        if existing_projects_response['success']:
-            existing_projects = existing_projects_response['json']
-            current_app.logger.info(f"Fetched existing projects: {type(existing_projects)}, {existing_projects}")
-            
-            # Check if existing_projects is a list (expected format)
-            if isinstance(existing_projects, list):
-                # Check if a project with the same title already exists
-                for project in existing_projects:
-                    if isinstance(project, dict) and project.get('title') == project_title:
-                        current_app.logger.info(f"Project '{project_title}' already exists with ID: {project.get('id')}")
-                        return jsonify({
-                            'success': True,
-                            'project': project,
-                            'message': f'Project "{project_title}" already exists',
-                            'labels': [cc.class_ for cc in ClassCount.query.filter_by(product_id=product_id).all()],
-                            'project_url': f'http://localhost:8081/projects/{project.get("id")}'
-                        })
-            else:
-                current_app.logger.warning(f"Unexpected response format from Label Studio: {existing_projects}")
-        else:
-            current_app.logger.warning(f"Failed to fetch existing projects: {existing_projects_response}")
-            # Continue with project creation if we can't check for duplicates
-            
-        # Get classes for this product
-        class_counts = ClassCount.query.filter_by(product_id=product_id).all()
-        labels = [cc.class_ for cc in class_counts]
-        
-        if not labels:
-            return jsonify({'error': 'No classes found for this product. Please add classes first.'}), 400
-        
-        # Prepare project data for Label Studio
-        project_data = {
-            'title': project_title,
-            'description': f'Quality control project for {project_title}',
-            'label_config': '''<View>
-  <Image name="image_object" value="$image_url"/>
-  <RectangleLabels name="label" toName="image_object">
-''' + '\n'.join([f'    <Label value="{label}" background="red"/>' for label in labels]) + '''
-  </RectangleLabels>
-</View>'''
-        }
-        
-        # Use curl to create the project via dynamic gateway discovery
-        base_url = get_label_studio_base_url()
-        headers = {
-            'Authorization': f'Token {user.label_studio_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        current_app.logger.info(f"Creating Label Studio project '{project_data['title']}' with {len(labels)} labels at {base_url}")
-        current_app.logger.info(f"Project creation request ID: {request.headers.get('X-Request-ID', 'unknown')}")
-        current_app.logger.info(f"Project data being sent: {project_data}")
-        
-        response = execute_curl_command(
-            method='POST',
-            url=f'{base_url}/api/projects/',
-            headers=headers,
-            data=project_data,
-            timeout=30
-        )
-        
-        if response['success'] and response['status_code'] == 201:
-            project_info = response['json']
-            current_app.logger.info(f"Project created successfully with ID: {project_info.get('id')}")
-            
-            # Automatically clean up duplicates after project creation
-            cleanup_results = cleanup_label_studio_duplicates_internal(user)
-            cleanup_msg = ""
-            if cleanup_results['deleted_projects'] > 0 or cleanup_results['deleted_tasks'] > 0:
-                cleanup_msg = f" (Auto-cleanup: {cleanup_results['deleted_projects']} duplicate projects and {cleanup_results['deleted_tasks']} duplicate tasks removed)"
+        project_title = label_studio_project_title(product)
             
+        current_app.logger.info(f"Product name: '{product.name}', final project_title: '{project_title}', length: {len(project_title)}")
+        
+        # (user, product) is the idempotency key: the registry row is created once thanks to
+        # its unique constraint, and only the request that claims it talks to Label Studio
+        claim_timeout = current_app.config.get('LABEL_STUDIO_PROJECT_CLAIM_TIMEOUT', 60)
+        entry = reserve_label_studio_project(user, product, project_title)
+        claimed = entry.project_id is None and claim_label_studio_project(entry.id, claim_timeout)
+        if entry.project_id is None and not claimed:
+            # Another request is creating this project; wait for it instead of creating a duplicate
+            entry = wait_for_label_studio_project(entry.id, claim_timeout)
+            if entry is not None and entry.project_id is None:
+                claimed = claim_label_studio_project(entry.id, claim_timeout)  # The other request failed
+            if entry is None or (entry.project_id is None and not claimed):
+                return jsonify({'error': 'This project is already being created, please retry shortly'}), 409
+        
+        if not claimed:
+            current_app.logger.info(f"Project '{entry.title}' already exists with ID: {entry.project_id}")
             return jsonify({
                 'success': True,
-                'project': project_info,
-                'message': f'Project "{project_info.get("title")}" created successfully{cleanup_msg}',
-                'labels': labels,
-                'project_url': f'http://localhost:8081/projects/{project_info.get("id")}'
+                'project': entry.to_dict(),
+                'message': f'Project "{entry.title}" already exists',
+                'labels': [cc.class_ for cc in ClassCount.query.filter_by(product_id=product_id).all()],
+                'project_url': f'http://localhost:8081/projects/{entry.project_id}'
             })
-        else:
-            error_detail = response['text'] or f"HTTP {response['status_code']}"
-            current_app.logger.error(f"Failed to create project. Status: {response['status_code']}, Response: {error_detail}")
-            
-            if response['status_code'] == 401:
-                return jsonify({'error': 'Legacy Token authentication failed. Please verify your Legacy Token is correct.'}), 401
-            elif response['status_code'] == 403:
-                return jsonify({'error': 'Access forbidden. Please check your Legacy Token permissions.'}), 403
-            else:
-                return jsonify({
-                    'error': f'Failed to create Label Studio project: {error_detail}',
-                    'status_code': response['status_code']
-                }), 400
+        
+        created_project = None
+        try:
+            payload, status_code = create_label_studio_project_remote(user, product, project_title)
+            created_project = payload.get('project') if status_code == 200 else None
+            return jsonify(payload), status_code
+        finally:
+            # Record the project, or release the claim so a later request can retry
+            release_label_studio_project(
+                entry.id,
+                created_project.get('id') if created_project else None,
+                created_project.get('title') or project_title if created_project else None
+            )
                 
     except Exception as e:
         current_app.logger.error(f"Unexpected error creating project: {str(e)}")
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
 
+def build_import_task(image, product, company, image_url):
+    """Label Studio task data for a captured image of the product"""
+    return {
+        'image_url': image_url,
+        'image_filename': image.storage_key.split('/')[-1],  # Just the filename
+        'image_id': image.id,
+        'product': product.name,
+        'company': company.name,
+        'file_size': image.file_size,
+        'upload_date': image.timestamp.isoformat() if image.timestamp else None
+    }
+
+def post_import_chunk(base_url, headers, project_id, tasks, timeout):
+    """
+    POST one chunk of tasks to Label Studio
+    
+    Runs on a prefetch worker thread, so it must not touch the app context or the session.
+    
+    Returns:
+        List of created task ids in task order (empty if Label Studio did not report them)
+        
+    Raises:
+        LabelStudioError: If Label Studio did not accept the chunk
+    """
+    response = label_studio_client.request(
+        method='POST',
+        url=f'{base_url}/api/projects/{project_id}/import?return_task_ids=true',
+        headers=headers,
+        data=tasks,
+        timeout=timeout
+    )
+    if not (response['success'] and response['status_code'] in [200, 201]):
+        raise LabelStudioError(response['text'] or f"HTTP {response['status_code']}", response['status_code'])
+    task_ids = (response['json'] or {}).get('task_ids') if isinstance(response['json'], dict) else None
+    return task_ids if isinstance(task_ids, list) and len(task_ids) == len(tasks) else []
+
+def fetch_remote_task_index(base_url, headers, project_id):
+    """
+    Page through a project's tasks and index them by image id and by filename
+    
+    Only used by full syncs; incremental imports rely on the local label_studio_task table.
+    
+    Raises:
+        LabelStudioError: If the task list cannot be fetched
+    """
+    by_image_id = {}
+    by_filename = {}
+    for task in label_studio_client.iter_tasks(base_url, project_id, headers):
+        if isinstance(task.get('data'), dict):
+            if task['data'].get('image_id') is not None:
+                by_image_id.setdefault(task['data']['image_id'], task.get('id'))
+            if task['data'].get('image_filename'):
+                by_filename.setdefault(task['data']['image_filename'], task.get('id'))
+    return by_image_id, by_filename
+
+def run_label_studio_import(user, product, project_id, progress=None, full_sync=False, since=None):
+    """
+    Import a product's new images into a Label Studio project
+    
+    Only the delta is sent: images of the product above its sync cursor
+    (label_studio_sync_state.last_image_id) that have no label_studio_task mapping yet,
+    so a sync costs O(new images) and never downloads the remote task list. Imported
+    images are mapped one by one, which also makes a failed import resume with exactly
+    the images that did not make it. A full sync (the first sync of a project/product,
+    or full_sync=True) considers every image and adopts tasks Label Studio already has.
+    
+    Images are sent in LABEL_STUDIO_IMPORT_CHUNK_SIZE chunks, up to
+    LABEL_STUDIO_IMPORT_CONCURRENCY chunks at once.
+    
+    Used both inline by the import endpoint and by the 'label_studio_import' background job.
+    
+    Args:
+        user: User whose Label Studio token is used
+        product: Product whose images are imported
+        project_id: Target Label Studio project id
+        progress: Optional callback progress(current, total, message, force=False)
+        full_sync: Reconcile every image with the remote task list instead of the cursor
+        since: Only import images captured at or after this datetime (cursor is left as is)
+        
+    Returns:
+        Tuple of (response payload dict, HTTP status code)
+    """
+    progress = progress or (lambda *args, **kwargs: None)
+    company = product.company
+    if not company:
+        return {'error': 'Company not found for product'}, 404
+    
+    chunk_size = max(1, current_app.config.get('LABEL_STUDIO_IMPORT_CHUNK_SIZE', 200))
+    concurrency = current_app.config.get('LABEL_STUDIO_IMPORT_CONCURRENCY', 4)
+    timeout = current_app.config.get('LABEL_STUDIO_IMPORT_TIMEOUT', 60)
+    overlap = current_app.config.get('LABEL_STUDIO_SYNC_OVERLAP', 1000)
+    project_url = f'http://localhost:8081/projects/{project_id}'
+    
+    base_url = get_label_studio_base_url()
+    headers = {
+        'Authorization': f'Token {user.label_studio_api_key}',
+        'Content-Type': 'application/json'
+    }
+    
+    # Serialize imports into the same project across workers so the delta, the import
+    # and the mapping/cursor updates cannot interleave
+    with advisory_lock('label-studio-import', project_id):
+        state = LabelStudioSyncState.query.filter_by(project_id=project_id, product_id=product.id).first()
+        full_sync = full_sync or state is None
+        
+        # Stored images of this product without a task in this project, oldest first
+        images_query = CapturedImage.query.options(
+            load_only(CapturedImage.id, CapturedImage.storage_key, CapturedImage.file_size, CapturedImage.timestamp)
+        ).filter(
+            CapturedImage.product_id == product.id,
+            CapturedImage.storage_provider == 'minio',
+            CapturedImage.storage_key.isnot(None),
+            ~db.session.query(LabelStudioTask.id).filter(
+                LabelStudioTask.project_id == project_id,
+                LabelStudioTask.image_id == CapturedImage.id
+            ).exists()
+        )
+        if not full_sync:
+            # Re-check a window below the cursor for rows that committed late with a lower id
+            images_query = images_query.filter(CapturedImage.id > state.last_image_id - overlap)
+        if since is not None:
+            images_query = images_query.filter(CapturedImage.timestamp >= since)
+        latest_image_id = db.session.query(func.max(CapturedImage.id)).filter(
+            CapturedImage.product_id == product.id
+        ).scalar() or 0
+        images = images_query.order_by(CapturedImage.id).all()
+        
+        # Full sync: adopt tasks Label Studio already has instead of sending them again
+        adopted_count = 0
+        if full_sync and images:
+            try:
+                by_image_id, by_filename = fetch_remote_task_index(base_url, headers, project_id)
+            except LabelStudioError as e:
+                # Importing without the remote index would duplicate every existing task
+                current_app.logger.error(f"Failed to list tasks of project {project_id} for full sync: {str(e)}")
+                return {'error': f'Failed to fetch existing tasks from Label Studio: {str(e)}'}, 502
+            pending = []
+            for image in images:
+                task_id = by_image_id.get(image.id) or by_filename.get(image.storage_key.split('/')[-1])
+                if task_id:
+                    db.session.add(LabelStudioTask(image_id=image.id, project_id=project_id, task_id=task_id))
+                    adopted_count += 1
+                else:
+                    pending.append(image)
+            images = pending
+            if adopted_count:
+                current_app.logger.info(f"Full sync of product {product.id}: adopted {adopted_count} existing Label Studio tasks")
+        
+        # Presign every URL up front (valid for 24 hours, cached per signing window)
+        try:
+            image_urls = minio_service.presign_many([image.storage_key for image in images], expires=86400)
+        except Exception as e:
+            current_app.logger.error(f"Error generating presigned URLs for project {project_id}: {str(e)}")
+            image_urls = {}
+        
+        # Build tasks per chunk; image ids are read here, before any commit expires the rows
+        chunks_to_post = []
+        failed_image_ids = []
+        chunk_summaries = []
+        for index, start in enumerate(range(0, len(images), chunk_size)):
+            tasks = []
+            image_ids = []
+            url_errors = 0
+            for image in images[start:start + chunk_size]:
+                image_url = image_urls.get(image.storage_key)
+                if image_url is None:
+                    url_errors += 1
+                    failed_image_ids.append(image.id)
+                    continue
+                tasks.append(build_import_task(image, product, company, image_url))
+                image_ids.append(image.id)
+            
+            url_error = f'Could not generate access URLs for {url_errors} images' if url_errors else None
+            summary = {'chunk': index, 'images': len(tasks) + url_errors, 'imported': 0, 'status': 'failed', 'error': url_error}
+            chunk_summaries.append(summary)
+            if tasks:
+                chunks_to_post.append((summary, tasks, image_ids))
+        
+        total_tasks = sum(len(tasks) for _, tasks, _ in chunks_to_post)
+        imported_count = 0
+        project_missing = False
+        if chunks_to_post:
+            current_app.logger.info(
+                f"Importing {total_tasks} new images of product {product.id} into project {project_id} "
+                f"in {len(chunks_to_post)} chunks ({'full' if full_sync else 'incremental'} sync)"
+            )
+        progress(0, total_tasks, f"Importing {total_tasks} new tasks in {len(chunks_to_post)} chunks", force=True)
+        
+        # Post chunks concurrently; results come back in chunk order and are mapped one by one
+        posted = prefetch_ordered(
+            chunks_to_post,
+            lambda item: post_import_chunk(base_url, headers, project_id, item[1], timeout),
+            concurrency
+        )
+        for (summary, tasks, image_ids), task_ids, error in posted:
+            if error is None:
+                imported_count += len(tasks)
+                summary['imported'] = len(tasks)
+                summary['status'] = 'failed' if summary['error'] else 'succeeded'
+                db.session.add_all([
+                    LabelStudioTask(image_id=image_id, project_id=project_id, task_id=task_id)
+                    for image_id, task_id in zip(image_ids, task_ids or [None] * len(image_ids))
+                ])
+            else:
+                current_app.logger.error(f"Failed to import chunk {summary['chunk']} ({len(tasks)} tasks) into project {project_id}: {error}")
+                summary['error'] = str(error)
+                failed_image_ids.extend(image_ids)
+                project_missing = project_missing or getattr(error, 'status_code', None) == 404
+            db.session.commit()
+            progress(imported_count, total_tasks, f"Imported {imported_count} of {total_tasks} tasks")
+        
+        if project_missing and not imported_count:
+            # The project was deleted in Label Studio; drop it from the registry so it can be recreated
+            forget_label_studio_project(project_id)
+            return {'error': f'Label Studio project {project_id} no longer exists, please create it again'}, 404
+        
+        # Advance the cursor up to (not past) the first image that failed; partial imports
+        # limited by 'since' skip older images and must not move it
+        if since is None:
+            cursor = min(failed_image_ids) - 1 if failed_image_ids else latest_image_id
+            if state is None:
+                state = LabelStudioSyncState(project_id=project_id, product_id=product.id, last_image_id=0)
+                db.session.add(state)
+            state.last_image_id = max(state.last_image_id or 0, cursor) if not full_sync else cursor
+            state.last_synced_at = func.now()
+        db.session.commit()
+    
+    failed_chunks = [chunk for chunk in chunk_summaries if chunk['status'] == 'failed']
+    result = {
+        'imported_count': imported_count,
+        'adopted_count': adopted_count,
+        'total_images_found': len(images) + adopted_count,
+        'sync': 'full' if full_sync else 'incremental',
+        'chunk_size': chunk_size,
+        'chunks': chunk_summaries,
+        'failed_chunks': len(failed_chunks),
+        'project_url': project_url
+    }
+    
+    if failed_chunks and not imported_count:
+        current_app.logger.error(f"Failed to import tasks into project {project_id}: all {len(failed_chunks)} chunks failed")
+        return {
+            'error': f"Failed to import images to Label Studio: {failed_chunks[0]['error']}",
+            **result
+        }, 400
+    
+    if not imported_count:
+        if since is not None:
+            message = f'No new images since {since.isoformat()}'
+        elif full_sync and not adopted_count and not latest_image_id:
+            return {'error': 'No images found for this product', **result}, 404
+        else:
+            message = 'All images already exist in the project'
+        return {'success': True, 'message': message, **result}, 200
+    
+    current_app.logger.info(f"Imported {imported_count} tasks to project {project_id} ({len(failed_chunks)} chunks failed)")
+    
+    if failed_chunks:
+        # Partial success: failed images stay unmapped, so rerunning the import retries just those
+        return {
+            'success': False,
+            'message': f'Imported {imported_count} images, but {len(failed_chunks)} of {len(chunk_summaries)} chunks failed; run the import again to resume',
+            **result
+        }, 207
+    
+    return {
+        'success': True,
+        'message': f'Successfully imported {imported_count} images to Label Studio project',
+        **result
+    }, 200
+
 @bp.route('/label-studio/import-images', methods=['POST'])
 @jwt_required()
+@concurrency_limit('LABEL_STUDIO_IMPORT_CONCURRENCY_LIMIT')
 def import_images_to_label_studio():
-    """Import images from MinIO to Label Studio project"""
+    """Import a product's stored images into a Label Studio project"""
+    from datetime import datetime
+    
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -575,135 +815,36 @@ def import_images_to_label_studio():
         
         if not project_id or not product_id:
             return jsonify({'error': 'project_id and product_id are required'}), 400
+        
+        # full_sync=true reconciles every image with the remote task list instead of
+        # only sending images above the product's sync cursor
+        full_sync = bool(data.get('full_sync', False))
+        
+        # since (ISO 8601) limits the import to images captured from then on
+        since = data.get('since')
+        if since:
+            try:
+                datetime.fromisoformat(since)
+            except (TypeError, ValueError):
+                return jsonify({'error': "'since' must be an ISO 8601 date or datetime"}), 400
             
         # Get product info for folder structure
         product = Product.query.get(product_id)
         if not product:
             return jsonify({'error': 'Product not found'}), 404
-            
-        company = product.company
-        if not company:
-            return jsonify({'error': 'Company not found for product'}), 404
-        
-        # Generate folder prefix for MinIO
-        def sanitize_name(name):
-            return name.replace(' ', '_').replace('/', '_').lower()
-        
-        company_name = sanitize_name(company.name)
-        product_name = sanitize_name(product.name)
-        
-        folder_prefix = f"{company_name}/{product_name}/"
-        
-        # Get images from MinIO for this product
-        images = minio_service.list_images(prefix=folder_prefix)
-        
-        if not images:
-            return jsonify({'error': 'No images found for this product'}), 404
-        
-        # Generate presigned URLs for Label Studio access (24 hours expiry)
-        tasks_to_import = []
-        successful_urls = 0
-        
-        for image in images:
-            try:
-                # Generate presigned URL (valid for 24 hours)
-                image_url = minio_service.get_presigned_url(image['object_name'], expires=86400)
-                
-                # Create task data for Label Studio
-                task_data = {
-                    'image_url': image_url,
-                    'image_filename': image['object_name'].split('/')[-1],  # Just the filename
-                    'product': product.name,
-                    'company': company.name,
-                    'file_size': image['size'],
-                    'upload_date': image['last_modified'].isoformat() if image['last_modified'] else None
-                }
-                
-                tasks_to_import.append(task_data)
-                successful_urls += 1
-                
-            except Exception as e:
-                current_app.logger.error(f"Error generating URL for {image['object_name']}: {str(e)}")
-                continue
         
-        if not tasks_to_import:
-            return jsonify({'error': 'Failed to generate accessible URLs for images'}), 500
+        # Large imports can outlive HTTP timeouts; let the client opt into a background job
+        if wants_async():
+            job = job_queue.enqueue('label_studio_import', user_id=user.id, project_id=project_id,
+                                    product_id=product.id, full_sync=full_sync, since=since)
+            return job_accepted(job)
         
-        # Check for existing tasks in the project to avoid duplicates
-        base_url = get_label_studio_base_url()
-        headers = {
-            'Authorization': f'Token {user.label_studio_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Get existing tasks
-        existing_tasks_response = execute_curl_command(
-            method='GET',
-            url=f'{base_url}/api/projects/{project_id}/tasks/',
-            headers=headers,
-            timeout=30
+        payload, status_code = run_label_studio_import(
+            user, product, project_id, full_sync=full_sync,
+            since=datetime.fromisoformat(since) if since else None
         )
+        return jsonify(payload), status_code
         
-        existing_filenames = set()
-        if existing_tasks_response['success'] and existing_tasks_response['json']:
-            for task in existing_tasks_response['json']:
-                if isinstance(task, dict) and 'data' in task:
-                    filename = task['data'].get('image_filename')
-                    if filename:
-                        existing_filenames.add(filename)
-        
-        # Filter out tasks that already exist
-        original_count = len(tasks_to_import)
-        tasks_to_import = [task for task in tasks_to_import if task['image_filename'] not in existing_filenames]
-        
-        if not tasks_to_import:
-            return jsonify({
-                'success': True,
-                'message': f'All {original_count} images already exist in the project',
-                'imported_count': 0,
-                'total_images_found': len(images),
-                'project_url': f'http://localhost:8081/projects/{project_id}'
-            })
-        
-        current_app.logger.info(f"Filtered {original_count - len(tasks_to_import)} duplicate tasks, importing {len(tasks_to_import)} new tasks")
-        current_app.logger.info(f"Image import request ID: {request.headers.get('X-Request-ID', 'unknown')}")
-        
-        # Import tasks to Label Studio using curl
-        
-        # Import tasks in batches (Label Studio can handle multiple tasks at once)
-        import_response = execute_curl_command(
-            method='POST',
-            url=f'{base_url}/api/projects/{project_id}/import',
-            headers=headers,
-            data=tasks_to_import,
-            timeout=60  # Longer timeout for potentially large imports
-        )
-        
-        if import_response['success'] and import_response['status_code'] in [200, 201]:
-            current_app.logger.info(f"Successfully imported {len(tasks_to_import)} tasks to project {project_id}")
-            
-            # Automatically clean up duplicate tasks after import
-            cleanup_results = cleanup_label_studio_duplicates_internal(user)
-            cleanup_msg = ""
-            if cleanup_results['deleted_tasks'] > 0:
-                cleanup_msg = f" (Auto-cleanup: {cleanup_results['deleted_tasks']} duplicate tasks removed)"
-            
-            return jsonify({
-                'success': True,
-                'message': f'Successfully imported {len(tasks_to_import)} images to Label Studio project{cleanup_msg}',
-                'imported_count': len(tasks_to_import),
-                'total_images_found': len(images),
-                'project_url': f'http://localhost:8081/projects/{project_id}'
-            })
-        else:
-            error_detail = import_response['text'] or f"HTTP {import_response['status_code']}"
-            current_app.logger.error(f"Failed to import tasks. Status: {import_response['status_code']}, Response: {error_detail}")
-            
-            return jsonify({
-                'error': f'Failed to import images to Label Studio: {error_detail}',
-                'status_code': import_response['status_code']
-            }), 400
-            
     except Exception as e:
         current_app.logger.error(f"Unexpected error importing images: {str(e)}")
         return jsonify({'error': f'Unexpected error: {str(e)}'}), 500
@@ -711,7 +852,7 @@ def import_images_to_label_studio():
 @bp.route('/label-studio/existing-projects', methods=['GET'])
 @jwt_required()
 def get_existing_label_studio_projects():
-    """Get existing Label Studio projects and match them with products"""
+    """Get the user's Label Studio projects (from the local registry) and match them with products"""
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -722,30 +863,54 @@ def get_existing_label_studio_projects():
         if not user.label_studio_api_key:
             return jsonify({'error': 'Label Studio Legacy Token not configured'}), 400
         
-        # Get all existing projects from Label Studio
         base_url = get_label_studio_base_url()
         headers = {
             'Authorization': f'Token {user.label_studio_api_key}',
             'Content-Type': 'application/json'
         }
         
-        existing_projects_response = execute_curl_command(
-            method='GET',
-            url=f'{base_url}/api/projects/',
-            headers=headers,
-            timeout=30
-        )
-        
-        existing_projects = []
-        if existing_projects_response['success']:
-            projects_data = existing_projects_response['json']
-            if isinstance(projects_data, dict) and 'results' in projects_data:
-                existing_projects = projects_data['results']
-            elif isinstance(projects_data, list):
-                existing_projects = projects_data
+        # Get all products from our system with company and classes in a constant number of queries
+        products = Product.query.options(
+            joinedload(Product.company),
+            selectinload(Product.class_counts)
+        ).all()
+        
+        # Resolve the user's projects from the local registry in one indexed query
+        registered = {
+            product_id: (project_id, title)
+            for product_id, project_id, title in db.session.query(
+                LabelStudioProject.product_id, LabelStudioProject.project_id, LabelStudioProject.title
+            ).filter(
+                LabelStudioProject.user_id == user.id,
+                LabelStudioProject.project_id.isnot(None)
+            )
+        }
+        project_ids = sorted({project_id for project_id, _ in registered.values()})
+        
+        # Imported task counts from the local mapping
+        task_counts = dict(
+            db.session.query(LabelStudioTask.project_id, func.count(LabelStudioTask.id))
+            .filter(LabelStudioTask.project_id.in_(project_ids))
+            .group_by(LabelStudioTask.project_id)
+            .all()
+        ) if project_ids else {}
+        
+        # Live stats only for the registered projects, fetched concurrently; projects that
+        # cannot be fetched keep the local counts, projects deleted in Label Studio are forgotten
+        live_projects = {}
+        deleted_project_ids = []
+        for project_id, project, error in prefetch_ordered(
+            project_ids, lambda project_id: label_studio_client.get_project(base_url, project_id, headers)
+        ):
+            if error is not None:
+                current_app.logger.warning(f"Failed to fetch Label Studio project {project_id}: {str(error)}")
+            elif project is None:
+                deleted_project_ids.append(project_id)
+            else:
+                live_projects[project_id] = project
+        for project_id in deleted_project_ids:
+            forget_label_studio_project(project_id)
         
-        # Get all products from our system (no more steps)
-        products = Product.query.all()
         products_with_projects = []
         
         for product in products:
@@ -754,36 +919,30 @@ def get_existing_label_studio_projects():
                 continue
                 
             # Get classes for this product
-            class_counts = ClassCount.query.filter_by(product_id=product.id).all()
-            classes = [cc.class_ for cc in class_counts]
+            classes = [cc.class_ for cc in product.class_counts]
             has_classes = len(classes) > 0
             
-            # Expected project title format - use same logic as project creation
-            base_title = product.name.strip()
-            if len(base_title) < 3:
-                expected_title = f'{base_title}_QC_Project'  # Append suffix to make it longer
-            else:
-                expected_title = base_title
+            # Expected project title format - same as project creation
+            expected_title = label_studio_project_title(product)
             
-            # Find matching project in Label Studio
-            matching_project = None
-            for project in existing_projects:
-                if isinstance(project, dict) and project.get('title') == expected_title:
-                    matching_project = project
-                    break
+            # Registered project of this product, if it still exists
+            project_id, project_title = registered.get(product.id, (None, expected_title))
+            if project_id in deleted_project_ids:
+                project_id = None
+            live_project = live_projects.get(project_id, {})
             
             product_info = {
                 'product_id': product.id,
                 'product_name': product.name,
                 'company_name': company.name,
-                'project_name': expected_title,
+                'project_name': project_title,
                 'classes': classes,
                 'has_classes': has_classes,
-                'has_existing_project': matching_project is not None,
-                'project_id': matching_project.get('id') if matching_project else None,
-                'project_url': f'http://localhost:8081/projects/{matching_project.get("id")}' if matching_project else None,
-                'task_count': matching_project.get('task_number', 0) if matching_project else 0,
-                'annotated_count': matching_project.get('num_tasks_with_annotations', 0) if matching_project else 0
+                'has_existing_project': project_id is not None,
+                'project_id': project_id,
+                'project_url': f'http://localhost:8081/projects/{project_id}' if project_id else None,
+                'task_count': live_project.get('task_number', task_counts.get(project_id, 0)) if project_id else 0,
+                'annotated_count': live_project.get('num_tasks_with_annotations', 0) if project_id else 0
             }
             
             products_with_projects.append(product_info)
@@ -791,7 +950,7 @@ def get_existing_label_studio_projects():
         return jsonify({
             'success': True,
             'products': products_with_projects,
-            'total_existing_projects': len(existing_projects)
+            'total_existing_projects': len(project_ids) - len(deleted_project_ids)
         })
         
     except Exception as e:
@@ -803,14 +962,13 @@ def get_existing_label_studio_projects():
 def get_products_for_labeling():
     """Get all products with their associated classes for labeling project creation"""
     try:
-        # Get all products (system is shared across users)
-        products = Product.query.all()
+        # Get all products (system is shared across users) with their classes in one extra query
+        products = Product.query.options(selectinload(Product.class_counts)).all()
         
         result = []
         for product in products:
             # Get all class counts for this product
-            class_counts = ClassCount.query.filter_by(product_id=product.id).all()
-            classes = [cc.class_ for cc in class_counts]  # Using class_ not class_name
+            classes = [cc.class_ for cc in product.class_counts]  # Using class_ not class_name
             
             result.append({
                 'product_id': product.id,
@@ -831,13 +989,15 @@ def get_products_for_labeling():
 def get_products_with_companies():
     """Get all products with their companies for Label Studio project creation"""
     try:
-        products = Product.query.join(Company).all()
+        products = Product.query.join(Company).options(
+            contains_eager(Product.company),
+            selectinload(Product.class_counts)
+        ).all()
         
         result = []
         for product in products:
-            # Get classes for this product  
-            class_counts = ClassCount.query.filter_by(product_id=product.id).all()
-            classes = [cc.class_ for cc in class_counts]
+            # Get classes for this product
+            classes = [cc.class_ for cc in product.class_counts]
             
             result.append({
                 'id': product.id,
@@ -946,12 +1106,25 @@ def login():
 @bp.route('/images', methods=['POST'])
 @jwt_required()
 def upload_image():
-    """Upload an image file and associate it with a product"""
-    if 'image' not in request.files:
-        return jsonify({'error': 'No image file provided'}), 400
+    """
+    Upload an image file and associate it with a product
     
-    image = request.files['image']
-    product_id = request.form.get('product_id')
+    Accepts multipart form data ('image' file and 'product_id'), or a raw image body
+    (Content-Type image/*, ?product_id=&filename=) that is streamed to storage as it
+    arrives, also when its length is unknown (chunked transfer encoding).
+    """
+    if (request.mimetype or '').startswith('image/'):
+        image = FileStorage(
+            stream=request.stream,
+            filename=request.args.get('filename') or 'capture.jpg',
+            content_type=request.mimetype
+        )
+        product_id = request.args.get('product_id')
+    elif 'image' not in request.files:
+        return jsonify({'error': 'No image file provided'}), 400
+    else:
+        image = request.files['image']
+        product_id = request.form.get('product_id')
 
     if not product_id:
         return jsonify({'error': 'Product ID is required'}), 400
@@ -966,14 +1139,18 @@ def upload_image():
         return jsonify({'error': 'Invalid company for product'}), 400
 
     try:
-        # Upload to MinIO with meaningful names (using product name as step)
-        object_key, metadata = minio_service.upload_image(
+        # Upload to MinIO with meaningful names (using product name as step), or reuse
+        # the stored object of an identical earlier upload
+        metadata = content_store.store(
             image, 
             company.name, 
             product.name, 
             product.name  # Use product name as the folder level
         )
-        
+    except Exception as e:
+        return jsonify({'error': f'Failed to upload image: {str(e)}'}), 500
+
+    try:
         # Store metadata in database
         img = CapturedImage(
             filename=image.filename,
@@ -984,6 +1161,7 @@ def upload_image():
             file_size=metadata['file_size'],
             mime_type=metadata['mime_type'],
             checksum=metadata['checksum'],
+            checksum_algorithm=metadata['checksum_algorithm'],
             storage_provider=metadata['storage_provider']
         )
         db.session.add(img)
@@ -995,6 +1173,7 @@ def upload_image():
             'product_id': img.product_id,
             'storage_url': img.storage_url,
             'file_size': img.file_size,
+            'deduplicated': metadata['deduplicated'],
             'timestamp': img.timestamp.isoformat() if img.timestamp else None
         }
         
@@ -1004,47 +1183,456 @@ def upload_image():
         return response
         
     except Exception as e:
+        db.session.rollback()
+        content_store.discard([metadata['storage_key']])
         return jsonify({'error': f'Failed to upload image: {str(e)}'}), 500
 
+# =============================================================================
+# BATCH IMAGE UPLOAD
+# =============================================================================
+
+BATCH_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff')
+ZIP_CONTENT_TYPES = ('application/zip', 'application/x-zip-compressed')
+TAR_CONTENT_TYPES = ('application/x-tar', 'application/tar', 'application/gzip', 'application/x-gzip', 'application/x-gtar')
+
+def is_batch_image_name(name):
+    """True for archive members that look like images (skips folders, dotfiles and macOS metadata)"""
+    base = os.path.basename(name)
+    return bool(base) and not base.startswith('.') and '__MACOSX' not in name and base.lower().endswith(BATCH_IMAGE_EXTENSIONS)
+
+def spool_file(source):
+    """Copy a stream into a temporary file that moves to disk once it exceeds UPLOAD_SPOOL_MEMORY"""
+    spool = tempfile.SpooledTemporaryFile(max_size=current_app.config.get('UPLOAD_SPOOL_MEMORY', 1024 * 1024))
+    shutil.copyfileobj(source, spool, 64 * 1024)
+    spool.seek(0)
+    return spool
+
+def iter_archive_images(stream, is_zip):
+    """
+    Yield (filename, file) for every image in a ZIP or tar archive, one member at a time
+    
+    Tar archives (optionally gzip/bz2/xz compressed) are read as a forward-only stream;
+    ZIP needs its central directory, so the stream must be seekable. Members are spooled
+    to temporary files rather than held in memory. Non-image members are yielded with
+    file None so they can be reported as skipped.
+    """
+    if is_zip:
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if not is_batch_image_name(info.filename):
+                    yield info.filename, None
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, spool_file(member)
+        return
+    
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            if not is_batch_image_name(member.name):
+                yield member.name, None
+                continue
+            yield member.name, spool_file(archive.extractfile(member))
+
+def iter_batch_upload_files():
+    """
+    Yield (filename, file object or None, content type) for every file of a batch upload
+    
+    Accepts multipart uploads with any number of 'images' (or 'image') files and/or
+    'archive' files (ZIP or tar), or a raw ZIP/tar request body. Files that are not
+    images are yielded with a None file object.
+    """
+    content_type = (request.mimetype or '').lower()
+    if content_type == 'multipart/form-data':
+        for file in request.files.getlist('images') + request.files.getlist('image'):
+            yield file.filename, file, file.content_type or guess_image_content_type(file.filename)
+        for archive in request.files.getlist('archive'):
+            is_zip = zipfile.is_zipfile(archive.stream)
+            archive.stream.seek(0)
+            for name, file in iter_archive_images(archive.stream, is_zip):
+                yield os.path.basename(name), file, guess_image_content_type(name)
+    elif content_type in ZIP_CONTENT_TYPES:
+        # ZIP needs random access; spool the body (to disk once it gets large)
+        with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as spool:
+            while True:
+                chunk = request.stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                spool.write(chunk)
+            spool.seek(0)
+            for name, file in iter_archive_images(spool, True):
+                yield os.path.basename(name), file, guess_image_content_type(name)
+    elif content_type in TAR_CONTENT_TYPES:
+        for name, file in iter_archive_images(request.stream, False):
+            yield os.path.basename(name), file, guess_image_content_type(name)
+
+@bp.route('/images/batch', methods=['POST'])
+@jwt_required()
+@concurrency_limit('IMAGE_BATCH_CONCURRENCY_LIMIT', default=4)
+def upload_images_batch():
+    """
+    Upload many images of one product in a single request
+    
+    Files are uploaded to MinIO on a bounded thread pool (IMAGE_BATCH_UPLOAD_CONCURRENCY)
+    while the request is still being read, and all rows are inserted with one bulk
+    INSERT in one transaction. The product id comes from the form or the query string.
+    
+    Returns:
+        201 when every file was stored, 207 with per-file results when some failed,
+        400 when none was stored
+    """
+    product_id = request.form.get('product_id') or request.args.get('product_id')
+    if not product_id:
+        return jsonify({'error': 'Product ID is required'}), 400
+    
+    # Validate product and company in one query
+    product = Product.query.options(joinedload(Product.company)).filter_by(id=product_id).first()
+    if not product:
+        return jsonify({'error': 'Invalid product ID'}), 400
+    company = product.company
+    if not company:
+        return jsonify({'error': 'Invalid company for product'}), 400
+    company_name, product_name = company.name, product.name
+    
+    max_files = current_app.config.get('IMAGE_BATCH_MAX_FILES', 1000)
+    concurrency = current_app.config.get('IMAGE_BATCH_UPLOAD_CONCURRENCY', 8)
+    app = current_app._get_current_object()
+    
+    def store(item):
+        filename, file, content_type = item
+        if file is None:
+            return None
+        try:
+            # Deduplication looks up and references stored objects from the worker thread
+            with app.app_context():
+                return content_store.store(
+                    file, company_name, product_name, product_name, filename=filename, content_type=content_type
+                )
+        finally:
+            file.close()  # Release spooled archive members right away
+    
+    # A bad archive or too many files stops reading the request; uploads already in
+    # flight still finish, so they can be removed below
+    batch_errors = []
+    
+    def guarded(files):
+        try:
+            for count, item in enumerate(files, 1):
+                if count > max_files:
+                    batch_errors.append(f'Too many files in one batch (limit {max_files})')
+                    return
+                yield item
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            batch_errors.append(f'Could not read archive: {str(e)}')
+    
+    results = []
+    rows = []
+    for (filename, file, _), metadata, error in prefetch_ordered(guarded(iter_batch_upload_files()), store, concurrency):
+        if error is not None:
+            current_app.logger.error(f"Batch upload of '{filename}' failed: {str(error)}")
+            results.append({'filename': filename, 'status': 'failed', 'error': str(error)})
+        elif metadata is None:
+            results.append({'filename': filename, 'status': 'skipped', 'error': 'Not an image file'})
+        else:
+            results.append({'filename': filename, 'status': 'created', 'file_size': metadata['file_size'],
+                            'deduplicated': metadata['deduplicated']})
+            rows.append({
+                'filename': filename,
+                'product_id': product.id,
+                'storage_url': metadata['storage_url'],
+                'storage_bucket': metadata['storage_bucket'],
+                'storage_key': metadata['storage_key'],
+                'file_size': metadata['file_size'],
+                'mime_type': metadata['mime_type'],
+                'checksum': metadata['checksum'],
+                'checksum_algorithm': metadata['checksum_algorithm'],
+                'storage_provider': metadata['storage_provider'],
+            })
+    
+    if batch_errors:
+        # Nothing is recorded for an invalid batch, so drop what was already stored
+        content_store.discard(row['storage_key'] for row in rows)
+        return jsonify({'error': f'Invalid batch upload: {batch_errors[0]}'}), 400
+    
+    if not results:
+        return jsonify({'error': 'No image files provided'}), 400
+    
+    if rows:
+        try:
+            # One multi-row INSERT ... RETURNING for the whole batch
+            created = db.session.execute(
+                insert(CapturedImage).returning(CapturedImage.id, CapturedImage.timestamp, sort_by_parameter_order=True),
+                rows
+            ).all()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Batch insert of {len(rows)} images failed: {str(e)}")
+            content_store.discard(row['storage_key'] for row in rows)
+            return jsonify({'error': f'Failed to record uploaded images: {str(e)}'}), 500
+        
+        created_results = (result for result in results if result['status'] == 'created')
+        for result, row, (image_id, timestamp) in zip(created_results, rows, created):
+            result.update({
+                'id': image_id,
+                'product_id': product.id,
+                'storage_url': row['storage_url'],
+                'timestamp': timestamp.isoformat() if timestamp else None
+            })
+    
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    deduplicated = sum(1 for result in results if result.get('deduplicated'))
+    current_app.logger.info(f"Batch upload for product {product.id}: {len(rows)} stored ({deduplicated} deduplicated), "
+                            f"{failed} failed, {len(results) - len(rows) - failed} skipped")
+    status_code = 201 if not failed else (207 if rows else 400)
+    return jsonify({
+        'product_id': product.id,
+        'created': len(rows),
+        'deduplicated': deduplicated,
+        'failed': failed,
+        'skipped': len(results) - len(rows) - failed,
+        'results': results
+    }), status_code
+
+# Fields that can be requested with ?fields= and the columns each one needs
+IMAGE_LIST_FIELDS = {
+    'id': ['id'],
+    'filename': ['filename'],
+    'product_id': ['product_id'],
+    'timestamp': ['timestamp'],
+    'access_url': ['storage_provider', 'storage_key', 'storage_url'],
+    'thumbnail_url': ['storage_provider', 'storage_key', 'storage_url'],
+    'file_size': ['file_size'],
+    'mime_type': ['mime_type'],
+    'storage_provider': ['storage_provider'],
+    'checksum': ['checksum'],
+    'checksum_algorithm': ['checksum', 'checksum_algorithm'],
+    'integrity_status': ['integrity_status'],
+    'verified_at': ['verified_at'],
+}
+DEFAULT_IMAGE_LIST_FIELDS = ['id', 'filename', 'product_id', 'timestamp', 'access_url', 'thumbnail_url',
+                             'file_size', 'mime_type', 'storage_provider']
+
+def image_checksum_algorithm(img):
+    """Algorithm of an image's checksum; rows from before it was recorded are MD5"""
+    if not img.checksum:
+        return None
+    return img.checksum_algorithm or LEGACY_CHECKSUM_ALGORITHM
+
+def encode_image_cursor(img):
+    """Encode the (timestamp, id) keyset position of an image as an opaque cursor"""
+    position = [img.timestamp.isoformat(), img.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+def decode_image_cursor(cursor):
+    """Decode a cursor produced by encode_image_cursor"""
+    from datetime import datetime
+    
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, image_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(image_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def paginate_images(query, company_id=None):
+    """
+    Keyset-paginate an image query using the request's query arguments
+    
+    Images are ordered newest first by (timestamp, id). Supported arguments:
+    limit (default 100, max 1000), cursor, product_id, company_id, mime_type,
+    integrity_status, min_size, max_size, since, until, fields (comma separated)
+    and include_total.
+    
+    The body stays a JSON array; the next page cursor is returned in the
+    X-Next-Cursor and Link headers, the total (when requested) in X-Total-Count.
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 100)), 1), 1000)
+        filters = parse_export_filters(args)
+        fields = [f.strip() for f in args.get('fields', '').split(',') if f.strip()] or DEFAULT_IMAGE_LIST_FIELDS
+        unknown = [f for f in fields if f not in IMAGE_LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        cursor = decode_image_cursor(args['cursor']) if args.get('cursor') else None
+        min_size = int(args['min_size']) if args.get('min_size') else None
+        max_size = int(args['max_size']) if args.get('max_size') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    
+    if company_id is not None:
+        filters['company_id'] = company_id
+    if 'company_id' in filters:
+        query = query.join(Product, CapturedImage.product_id == Product.id)
+    query = apply_export_filters(query, filters)
+    if args.get('mime_type'):
+        query = query.filter(CapturedImage.mime_type == args['mime_type'])
+    if args.get('integrity_status'):
+        query = query.filter(CapturedImage.integrity_status == args['integrity_status'])
+    if min_size is not None:
+        query = query.filter(CapturedImage.file_size >= min_size)
+    if max_size is not None:
+        query = query.filter(CapturedImage.file_size <= max_size)
+    
+    total = query.order_by(None).count() if args.get('include_total', '').lower() in ('1', 'true', 'yes') else None
+    
+    if cursor:
+        cursor_timestamp, cursor_id = cursor
+        query = query.filter(or_(
+            CapturedImage.timestamp < cursor_timestamp,
+            and_(CapturedImage.timestamp == cursor_timestamp, CapturedImage.id < cursor_id)
+        ))
+    
+    # Only load the columns needed for the requested fields (plus the keyset columns)
+    columns = {'id', 'timestamp'} | {column for f in fields for column in IMAGE_LIST_FIELDS[f]}
+    query = query.options(load_only(*[getattr(CapturedImage, column) for column in sorted(columns)]))
+    
+    images = query.order_by(CapturedImage.timestamp.desc(), CapturedImage.id.desc()).limit(limit + 1).all()
+    has_more = len(images) > limit
+    images = images[:limit]
+    
+    base_url = current_app.config.get('EXTERNAL_URL', 'http://localhost:5000')
+    serializers = {
+        'id': lambda img: img.id,
+        'filename': lambda img: img.filename,
+        'product_id': lambda img: img.product_id,
+        'timestamp': lambda img: img.timestamp.isoformat() if img.timestamp else None,
+        'access_url': lambda img: img.get_access_url(base_url=base_url),
+        'thumbnail_url': lambda img: img.get_thumbnail_url(base_url=base_url),
+        'file_size': lambda img: img.file_size,
+        'mime_type': lambda img: img.mime_type,
+        'storage_provider': lambda img: img.storage_provider,
+        'checksum': lambda img: img.checksum,
+        'checksum_algorithm': image_checksum_algorithm,
+        'integrity_status': lambda img: img.integrity_status,
+        'verified_at': lambda img: img.verified_at.isoformat() if img.verified_at else None,
+    }
+    response = jsonify([{f: serializers[f](img) for f in fields} for img in images])
+    
+    if has_more:
+        next_cursor = encode_image_cursor(images[-1])
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_args = request.args.to_dict()
+        next_args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(next_args)}>; rel="next"'
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
+
 @bp.route('/images', methods=['GET'])
 @jwt_required()
 def list_images():
-    """Get a list of all captured images with metadata"""
-    images = CapturedImage.query.all()
-    return jsonify([
-        {
-            'id': img.id,
-            'filename': img.filename,
-            'product_id': img.product_id,
-            'timestamp': img.timestamp.isoformat() if img.timestamp else None,
-            'access_url': img.get_access_url(),  # Get presigned URL
-            'file_size': img.file_size,
-            'mime_type': img.mime_type,
-            'storage_provider': img.storage_provider
-        } for img in images
-    ])
+    """Get a page of captured images with metadata (see paginate_images for query arguments)"""
+    return paginate_images(CapturedImage.query)
+
+def delete_image_records(images):
+    """
+    Delete image rows in the current transaction, keeping objects that other images still share
+    
+    Commit, then pass the result to remove_image_objects(). Variant and Label Studio
+    task rows of the images are removed with them.
+    
+    Args:
+        images: CapturedImage rows (at least id, storage_key and storage_provider loaded)
+        
+    Returns:
+        Tuple of (original object keys, variant object keys) that are no longer referenced
+    """
+    if not images:
+        return [], []
+    image_ids = [img.id for img in images]
+    
+    # Drop the images' references; an object goes only when its last reference does
+    unreferenced = content_store.release(images)
+    owners = [img.id for img in images if img.storage_key in set(unreferenced)]
+    variant_keys = [key for (key,) in db.session.query(ImageVariant.storage_key).filter(
+        ImageVariant.image_id.in_(owners)
+    )] if owners else []
+    
+    db.session.execute(delete(ImageVariant).where(ImageVariant.image_id.in_(image_ids)))
+    db.session.execute(delete(LabelStudioTask).where(LabelStudioTask.image_id.in_(image_ids)))
+    db.session.execute(delete(CapturedImage).where(CapturedImage.id.in_(image_ids)))
+    return unreferenced, variant_keys
+
+def remove_image_objects(object_keys, variant_keys):
+    """
+    Remove unreferenced originals and their variants from MinIO with batched deletes
+    
+    Returns:
+        Dict with the number of removed objects and the per-object errors
+    """
+    originals = minio_service.delete_images(object_keys)
+    variants = thumbnail_service.delete_variants(variant_keys)
+    errors = originals['errors'] + variants['errors']
+    for error in errors[:20]:
+        current_app.logger.warning(f"Could not remove {error['object_key']} from storage: {error['code']} {error['message']}")
+    return {'removed_objects': originals['deleted'] + variants['deleted'], 'errors': errors}
+
+def image_storage_query():
+    """Image query loading only the columns delete_image_records needs"""
+    return CapturedImage.query.options(load_only(CapturedImage.id, CapturedImage.storage_key, CapturedImage.storage_provider))
 
 @bp.route('/images/<int:image_id>', methods=['DELETE'])
 @jwt_required()
 def delete_image(image_id):
-    """Delete an image by ID from both MinIO storage and database"""
-    img = CapturedImage.query.get_or_404(image_id)
+    """
+    Delete an image by ID from the database, and its object from MinIO once no other image shares it
+    """
+    img = image_storage_query().filter_by(id=image_id).first_or_404()
+    
+    object_keys, variant_keys = delete_image_records([img])
+    db.session.commit()
+    
+    # Remove file and its resized variants from MinIO
+    storage = remove_image_objects(object_keys, variant_keys)
+    if storage['errors']:
+        return jsonify({'message': 'Image deleted from database, storage cleanup may have failed'}), 200
+    return jsonify({'message': 'Image deleted successfully'}), 200
+
+@bp.route('/images', methods=['DELETE'])
+@jwt_required()
+def delete_images():
+    """
+    Delete several images at once (?ids=1,2,3 or repeated ids=)
+    
+    All rows are deleted in one transaction; objects no other image shares, and their
+    variants, are then removed from MinIO with one request per thousand objects.
     
+    Returns:
+        Counts of deleted images and removed objects, ids that did not exist and the
+        objects that could not be removed from storage
+    """
     try:
-        # Remove file from MinIO if it exists
-        if img.storage_key and img.storage_provider == 'minio':
-            minio_service.delete_image(img.storage_key)
-        
-        # Remove from database
-        db.session.delete(img)
+        image_ids = list(dict.fromkeys(
+            int(part) for value in request.args.getlist('ids') for part in value.split(',') if part.strip()
+        ))
+    except ValueError:
+        return jsonify({'error': "'ids' must be a comma-separated list of image ids"}), 400
+    if not image_ids:
+        return jsonify({'error': "'ids' is required"}), 400
+    
+    images = image_storage_query().filter(CapturedImage.id.in_(image_ids)).all()
+    found = {img.id for img in images}
+    
+    try:
+        object_keys, variant_keys = delete_image_records(images)
         db.session.commit()
-        return jsonify({'message': 'Image deleted successfully'}), 200
-        
     except Exception as e:
-        # If MinIO deletion fails, still try to remove from database
-        db.session.delete(img)
-        db.session.commit()
-        return jsonify({'message': 'Image deleted from database, storage cleanup may have failed'}), 200
+        db.session.rollback()
+        current_app.logger.error(f"Bulk delete of {len(images)} images failed: {str(e)}")
+        return jsonify({'error': f'Failed to delete images: {str(e)}'}), 500
+    
+    storage = remove_image_objects(object_keys, variant_keys)
+    return jsonify({
+        'deleted_count': len(images),
+        'not_found': [image_id for image_id in image_ids if image_id not in found],
+        'removed_objects': storage['removed_objects'],
+        'storage_errors': storage['errors']
+    }), 200
 
 @bp.route('/images/<int:image_id>/url', methods=['GET'])
 @jwt_required()
@@ -1053,9 +1641,10 @@ def get_image_url(image_id):
     img = CapturedImage.query.get_or_404(image_id)
     
     try:
-        # Get presigned URL (valid for 1 hour by default)
+        # Backend serving URL by default; ?presigned=true returns a (cached) MinIO presigned URL
         expires = request.args.get('expires', 3600, type=int)
-        access_url = img.get_access_url(expires)
+        presigned = request.args.get('presigned', 'false').lower() == 'true'
+        access_url = img.get_access_url(expires, presigned=presigned)
         
         return jsonify({
             'id': img.id,
@@ -1066,26 +1655,99 @@ def get_image_url(image_id):
     except Exception as e:
         return jsonify({'error': f'Failed to generate access URL: {str(e)}'}), 500
 
+def guess_image_content_type(object_key):
+    """Determine content type based on file extension"""
+    key = object_key.lower()
+    if key.endswith('.png'):
+        return 'image/png'
+    elif key.endswith('.gif'):
+        return 'image/gif'
+    elif key.endswith('.webp'):
+        return 'image/webp'
+    return 'image/jpeg'  # default
+
 @bp.route('/serve-image/<path:object_key>', methods=['GET'])
 def serve_image(object_key):
-    """Serve images directly from MinIO through the backend"""
+    """
+    Stream images directly from MinIO through the backend (supports Range and conditional requests)
+    
+    Optional ?w=&h=&fmt= query arguments return a downscaled JPEG/WebP variant instead.
+    Only objects backing a captured image are served; derived variants and job
+    artefacts in the same bucket are not reachable through this endpoint.
+    """
+    if object_key.startswith((f'{VARIANT_PREFIX}/', f'{ARTIFACT_PREFIX}/')):
+        return jsonify({'error': 'Image not found'}), 404
     try:
-        # Get the object from MinIO
-        response = minio_service.client.get_object(minio_service.bucket_name, object_key)
+        # Validators come from the stored metadata so revalidation never touches MinIO
+        img = CapturedImage.query.filter_by(storage_key=object_key).first()
+        if img is None:
+            return jsonify({'error': 'Image not found'}), 404
+        if img.checksum and img.file_size is not None:
+            etag = img.checksum
+            last_modified = img.timestamp
+            total_size = img.file_size
+            content_type = img.mime_type or guess_image_content_type(object_key)
+        else:
+            stat = minio_service.stat_image(object_key)
+            etag = stat.etag
+            last_modified = stat.last_modified
+            total_size = stat.size
+            content_type = guess_image_content_type(object_key)
         
-        # Read the data
-        data = response.read()
+        headers = {
+            'Accept-Ranges': 'bytes',
+            'Cache-Control': f"public, max-age={current_app.config.get('IMAGE_CACHE_MAX_AGE', 86400)}"
+        }
         
-        # Determine content type based on file extension
-        content_type = 'image/jpeg'  # default
-        if object_key.lower().endswith('.png'):
-            content_type = 'image/png'
-        elif object_key.lower().endswith('.gif'):
-            content_type = 'image/gif'
-        elif object_key.lower().endswith('.webp'):
-            content_type = 'image/webp'
+        # Resized variant requested via ?w=&h=&fmt=
+        try:
+            variant = thumbnail_service.parse_variant_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if variant:
+            width, height, fmt = variant
+            etag = f"{etag}-{width}x{height}.{fmt}"
+        
+        # Answer If-None-Match / If-Modified-Since without opening the object
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            return response
+        
+        if variant:
+            data, variant_type = thumbnail_service.get_variant(img, object_key, width, height, fmt)
+            response = Response(data, mimetype=variant_type, headers=headers)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            return response
+        
+        # Honour a single byte range unless If-Range no longer matches the current version
+        byte_range = None
+        if request.range and ('If-Range' not in request.headers or request.if_range.etag == etag):
+            byte_range = request.range.range_for_length(total_size)
+            if byte_range is None:
+                return Response(status=416, headers={'Content-Range': f'bytes */{total_size}'})
+        
+        if byte_range:
+            start, stop = byte_range
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{total_size}'
+        else:
+            start, stop = 0, total_size
+            status = 200
+        length = stop - start
         
-        return Response(data, mimetype=content_type)
+        if request.method == 'HEAD' or length == 0:
+            body = b''
+        else:
+            body = minio_service.open_image_stream(object_key, offset=start, length=length)
+        
+        response = Response(body, status=status, mimetype=content_type, headers=headers, direct_passthrough=True)
+        response.content_length = length  # Also correct for HEAD, where the body is omitted
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
         
     except Exception as e:
         return jsonify({'error': f'Failed to serve image: {str(e)}'}), 404
@@ -1112,65 +1774,229 @@ def get_storage_stats():
 # IMAGE DOWNLOAD ENDPOINTS
 # =============================================================================
 
+def clean_export_name(name):
+    """Clean names for file system use inside exported archives"""
+    return "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+
+MANIFEST_COLUMNS = ['path', 'image_id', 'filename', 'company', 'product', 'checksum', 'checksum_algorithm',
+                    'file_size', 'timestamp', 'mime_type']
+
+def iter_export_entries(build_query, include_manifest=True):
+    """
+    Yield ZIP entries for images while the next objects are prefetched from MinIO
+    
+    The query is built and run inside the streaming generator: rows loaded by the view
+    would already be detached from their session once the response starts streaming.
+    Up to EXPORT_PREFETCH_CONCURRENCY objects, and at most EXPORT_PREFETCH_MAX_BYTES of
+    them, are read concurrently; entries are still written in query order. Objects larger
+    than EXPORT_STREAM_THRESHOLD (or of unknown size) are not prefetched but streamed into
+    the archive when their turn comes. A manifest.csv describing every exported entry is
+    appended last (spooled to disk for large exports).
+    """
+    concurrency = current_app.config.get('EXPORT_PREFETCH_CONCURRENCY', 8)
+    max_bytes = current_app.config.get('EXPORT_PREFETCH_MAX_BYTES', 64 * 1024 * 1024)
+    stream_threshold = current_app.config.get('EXPORT_STREAM_THRESHOLD', 8 * 1024 * 1024)
+    started = time.monotonic()
+    exported_count = 0
+    exported_bytes = 0
+    
+    manifest = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', newline='')
+    manifest_writer = csv.writer(manifest)
+    manifest_writer.writerow(MANIFEST_COLUMNS)
+    
+    def prefetch_size(img):
+        # Large or unsized objects are streamed, so they take no room in the prefetch budget
+        if img.file_size is None or img.file_size > stream_threshold:
+            return None
+        return img.file_size
+    
+    images = (
+        (img, prefetch_size(img)) for img in build_query()
+        if img.storage_key and img.storage_provider == 'minio'
+    )
+    prefetched = prefetch_ordered(
+        images,
+        lambda item: minio_service.read_image(item[0].storage_key) if item[1] is not None else None,
+        concurrency,
+        weigh=lambda item: item[1] or 0,
+        max_bytes=max_bytes
+    )
+    
+    try:
+        for idx, ((img, size), image_data, error) in enumerate(prefetched):
+            if size is None and error is None:
+                try:
+                    size = minio_service.stat_image(img.storage_key).size
+                    chunks = minio_service.open_image_stream(img.storage_key, length=size)
+                except Exception as e:
+                    error = e
+            elif error is None:
+                size = len(image_data)
+                chunks = (image_data,)
+            if error is not None:
+                current_app.logger.warning(f"Failed to add image {img.filename} to ZIP: {str(error)}")
+                continue
+            
+            # Create a meaningful filename with folder structure
+            company_name = img.product.company.name if img.product and img.product.company else 'Unknown_Company'
+            product_name = img.product.name if img.product else 'Unknown_Product'
+            
+            # Create unique filename to avoid overwrites
+            base_name, ext = img.filename.rsplit('.', 1) if '.' in img.filename else (img.filename, 'jpg')
+            unique_filename = f"{idx+1:03d}_{img.id}_{base_name}.{ext}"
+            
+            zip_path = f"{clean_export_name(company_name)}/{clean_export_name(product_name)}/{unique_filename}"
+            manifest_writer.writerow([
+                zip_path,
+                img.id,
+                img.filename,
+                company_name,
+                product_name,
+                img.checksum or '',
+                image_checksum_algorithm(img) or '',
+                size,
+                img.timestamp.isoformat() if img.timestamp else '',
+                img.mime_type or ''
+            ])
+            exported_count += 1
+            exported_bytes += size
+            yield ZipEntry(zip_path, chunks, modified=img.timestamp, size=size)
+        
+        if include_manifest:
+            manifest.seek(0)
+            yield ZipEntry('manifest.csv', (line.encode('utf-8') for line in manifest))
+    finally:
+        manifest.close()
+    
+    elapsed = max(time.monotonic() - started, 1e-6)
+    current_app.logger.info(
+        f"Export finished: {exported_count} images, {exported_bytes / (1024 * 1024):.1f} MB in {elapsed:.1f}s "
+        f"({exported_bytes / (1024 * 1024) / elapsed:.1f} MB/s, {exported_count / elapsed:.1f} images/s, "
+        f"prefetch concurrency {concurrency})"
+    )
+
+def parse_export_filters(args):
+    """
+    Parse export filters from query arguments
+    
+    Supported: company_id, product_id, since, until (ISO 8601) and ids
+    (comma separated and/or repeated).
+    
+    Raises:
+        ValueError: If a filter value is malformed
+    """
+    from datetime import datetime
+    
+    filters = {}
+    for name in ('company_id', 'product_id'):
+        value = args.get(name)
+        if value:
+            filters[name] = int(value)
+    for name in ('since', 'until'):
+        value = args.get(name)
+        if value:
+            try:
+                filters[name] = datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"'{name}' must be an ISO 8601 date or datetime")
+    ids = [part for value in args.getlist('ids') for part in value.split(',') if part.strip()]
+    if ids:
+        filters['ids'] = [int(part) for part in ids]
+    return filters
+
+def apply_export_filters(query, filters):
+    """Apply export filters to a query that already joins Product"""
+    if 'company_id' in filters:
+        query = query.filter(Product.company_id == filters['company_id'])
+    if 'product_id' in filters:
+        query = query.filter(CapturedImage.product_id == filters['product_id'])
+    if 'since' in filters:
+        query = query.filter(CapturedImage.timestamp >= filters['since'])
+    if 'until' in filters:
+        query = query.filter(CapturedImage.timestamp <= filters['until'])
+    if 'ids' in filters:
+        query = query.filter(CapturedImage.id.in_(filters['ids']))
+    return query
+
+def export_images_query(filters):
+    """Filtered images with product and company loaded by the same joined query, in a stable order"""
+    query = CapturedImage.query.join(Product, CapturedImage.product_id == Product.id).join(
+        Company, Product.company_id == Company.id
+    ).options(
+        contains_eager(CapturedImage.product).contains_eager(Product.company)
+    )
+    return apply_export_filters(query, filters).order_by(CapturedImage.id).yield_per(500)
+
+def stream_images_archive(filters, archive_name):
+    """Build a streaming ZIP response for the images matching filters"""
+    from datetime import datetime
+    
+    exists_query = db.session.query(CapturedImage.id).join(Product, CapturedImage.product_id == Product.id)
+    if not apply_export_filters(exists_query, filters).first():
+        return jsonify({'error': 'No images found'}), 404
+    
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{archive_name}_{timestamp}.zip"
+    
+    # Entries are read from MinIO and written to the client one chunk at a time
+    return Response(
+        stream_with_context(stream_zip(iter_export_entries(lambda: export_images_query(filters)))),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no'  # Don't let a reverse proxy buffer the whole archive
+        }
+    )
+
 @bp.route('/download/images/all', methods=['GET'])
 @jwt_required()
+@concurrency_limit('EXPORT_CONCURRENCY_LIMIT')
 def download_all_images():
-    """Download all images as a ZIP file"""
-    import io
-    import zipfile
-    from datetime import datetime
+    """Download all images as a ZIP file streamed while it is being built"""
+    try:
+        if wants_async():
+            job = job_queue.enqueue('export_images', user_id=int(get_jwt_identity()), args={}, archive_name='all_images')
+            return job_accepted(job)
+        return stream_images_archive({}, 'all_images')
+    except Exception as e:
+        current_app.logger.error(f"Error creating ZIP file: {str(e)}")
+        return jsonify({'error': f'Failed to create ZIP file: {str(e)}'}), 500
+
+@bp.route('/download/images', methods=['GET'])
+@jwt_required()
+@concurrency_limit('EXPORT_CONCURRENCY_LIMIT')
+def download_images():
+    """
+    Download a filtered set of images as a streamed ZIP file with a manifest.csv
     
+    Query parameters: company_id, product_id, since, until (ISO 8601) and ids
+    (e.g. ids=1,2,3). Filters are combined with AND. With async=true the archive
+    is built by a background job and downloaded from /jobs/<id>/artifact.
+    """
     try:
-        # Get all images
-        images = CapturedImage.query.all()
-        
-        if not images:
-            return jsonify({'error': 'No images found'}), 404
-        
-        # Create ZIP file in memory
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for idx, img in enumerate(images):
-                try:
-                    # Get the image data from MinIO
-                    if img.storage_key and img.storage_provider == 'minio':
-                        response = minio_service.client.get_object(minio_service.bucket_name, img.storage_key)
-                        image_data = response.read()
-                        
-                        # Create a meaningful filename with folder structure
-                        company_name = img.product.company.name if img.product and img.product.company else 'Unknown_Company'
-                        product_name = img.product.name if img.product else 'Unknown_Product'
-                        step_name = img.step.name if img.step else 'Unknown_Step'
-                        
-                        # Clean names for file system
-                        company_name = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        product_name = "".join(c for c in product_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        step_name = "".join(c for c in step_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        
-                        # Create unique filename to avoid overwrites
-                        base_name, ext = img.filename.rsplit('.', 1) if '.' in img.filename else (img.filename, 'jpg')
-                        unique_filename = f"{idx+1:03d}_{img.id}_{base_name}.{ext}"
-                        
-                        zip_path = f"{company_name}/{product_name}/{step_name}/{unique_filename}"
-                        zip_file.writestr(zip_path, image_data)
-                        
-                except Exception as e:
-                    current_app.logger.warning(f"Failed to add image {img.filename} to ZIP: {str(e)}")
-                    continue
-        
-        zip_buffer.seek(0)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"all_images_{timestamp}.zip"
-        
-        return Response(
-            zip_buffer.getvalue(),
-            mimetype='application/zip',
-            headers={'Content-Disposition': f'attachment; filename={filename}'}
-        )
-        
+        filters = parse_export_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid filter: {str(e)}'}), 400
+    
+    try:
+        # Name the archive after the narrowest scope requested
+        archive_name = 'images'
+        if 'product_id' in filters:
+            product = Product.query.get(filters['product_id'])
+            if product:
+                archive_name = f"{clean_export_name(product.name)}_images"
+        elif 'company_id' in filters:
+            company = Company.query.get(filters['company_id'])
+            if company:
+                archive_name = f"{clean_export_name(company.name)}_images"
+        
+        archive_name = archive_name.replace(' ', '_')
+        if wants_async():
+            job = job_queue.enqueue('export_images', user_id=int(get_jwt_identity()),
+                                    args=request.args.to_dict(flat=False), archive_name=archive_name)
+            return job_accepted(job)
+        return stream_images_archive(filters, archive_name)
     except Exception as e:
         current_app.logger.error(f"Error creating ZIP file: {str(e)}")
         return jsonify({'error': f'Failed to create ZIP file: {str(e)}'}), 500
@@ -1282,29 +2108,22 @@ def update_company(id):
 @bp.route('/companies/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_company(id):
-    """Delete a company by ID"""
+    """Delete a company by ID, with its products, their images and the objects only they used"""
     company = Company.query.get_or_404(id)
+    images = image_storage_query().join(Product, CapturedImage.product_id == Product.id).filter(
+        Product.company_id == company.id
+    ).all()
+    object_keys, variant_keys = delete_image_records(images)
     db.session.delete(company)
     db.session.commit()
+    remove_image_objects(object_keys, variant_keys)
     return '', 204
 
 @bp.route('/companies/<int:company_id>/images', methods=['GET'])
 @jwt_required()
 def get_images_for_company(company_id):
-    """Get all images associated with a specific company"""
-    images = CapturedImage.query.join(Product).filter(Product.company_id == company_id).all()
-    return jsonify([
-        {
-            'id': img.id,
-            'filename': img.filename,
-            'product_id': img.product_id,
-            'timestamp': img.timestamp.isoformat() if img.timestamp else None,
-            'access_url': img.get_access_url(),  # Get presigned URL
-            'file_size': img.file_size,
-            'mime_type': img.mime_type,
-            'storage_provider': img.storage_provider
-        } for img in images
-    ])
+    """Get a page of images associated with a specific company (see paginate_images for query arguments)"""
+    return paginate_images(CapturedImage.query, company_id=company_id)
 
 # =============================================================================
 # PRODUCT MANAGEMENT ENDPOINTS
@@ -1342,10 +2161,12 @@ def update_product(id):
 @bp.route('/products/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_product(id):
-    """Delete a product by ID"""
+    """Delete a product by ID, with its images and the objects only they used"""
     product = Product.query.get_or_404(id)
+    object_keys, variant_keys = delete_image_records(image_storage_query().filter_by(product_id=product.id).all())
     db.session.delete(product)
     db.session.commit()
+    remove_image_objects(object_keys, variant_keys)
     return '', 204
 
 # =============================================================================
@@ -1488,33 +2309,25 @@ def cleanup_orphaned_images():
     """Remove orphaned image records that reference non-existent products"""
     try:
         # Find images with non-existent products (no longer checking steps since we removed that model)
-        orphaned_product_images = db.session.query(CapturedImage).outerjoin(
+        orphaned_product_images = image_storage_query().outerjoin(
             Product, CapturedImage.product_id == Product.id
         ).filter(Product.id.is_(None)).all()
         
         all_orphaned = orphaned_product_images
         
-        deleted_count = 0
-        for img in all_orphaned:
-            try:
-                # Delete from MinIO storage if it exists
-                if img.storage_key and img.storage_provider == 'minio':
-                    minio_service.delete_image(img.storage_key)
-                
-                # Delete from database
-                db.session.delete(img)
-                deleted_count += 1
-                
-            except Exception as e:
-                current_app.logger.warning(f"Failed to delete orphaned image {img.id}: {e}")
-                continue
-        
+        # Objects still shared with other images are kept
+        object_keys, variant_keys = delete_image_records(all_orphaned)
+        deleted_count = len(all_orphaned)
         db.session.commit()
         
+        storage = remove_image_objects(object_keys, variant_keys)
+        
         return jsonify({
             'status': 'success',
             'message': f'Cleaned up {deleted_count} orphaned images',
-            'deleted_count': deleted_count
+            'deleted_count': deleted_count,
+            'removed_objects': storage['removed_objects'],
+            'storage_errors': storage['errors']
         }), 200
         
     except Exception as e:
@@ -1525,8 +2338,43 @@ def cleanup_orphaned_images():
             'message': f'Failed to cleanup orphaned images: {str(e)}'
         }), 500
 
+def run_label_studio_cleanup(user, progress=None):
+    """
+    Delete duplicate Label Studio projects and tasks, keeping the oldest of each
+    
+    Used both inline by the cleanup endpoint and by the 'label_studio_cleanup' background job.
+    
+    Args:
+        user: User whose Label Studio token is used
+        progress: Optional callback progress(current, total, message, force=False)
+        
+    Returns:
+        Tuple of (response payload dict, HTTP status code)
+    """
+    base_url = get_label_studio_base_url()
+    
+    with advisory_lock('label-studio-cleanup', base_url, blocking=False) as acquired:
+        if not acquired:
+            return {'error': 'A duplicate cleanup is already running, please retry shortly'}, 409
+        
+        cleanup_details = []
+        try:
+            counts = _cleanup_label_studio_duplicates(user, base_url, progress=progress, details=cleanup_details)
+        except LabelStudioError as e:
+            current_app.logger.error(f"Failed to list Label Studio projects or tasks for cleanup: {str(e)}")
+            return {'error': f'Failed to fetch projects from Label Studio: {str(e)}'}, 500
+        
+        return {
+            'success': True,
+            'message': f"Cleanup completed: {counts['deleted_projects']} duplicate projects and {counts['deleted_tasks']} duplicate tasks deleted",
+            'deleted_projects': counts['deleted_projects'],
+            'deleted_tasks': counts['deleted_tasks'],
+            'details': cleanup_details
+        }, 200
+
 @bp.route('/label-studio/cleanup-duplicates', methods=['POST'])
 @jwt_required()
+@concurrency_limit('LABEL_STUDIO_CLEANUP_CONCURRENCY_LIMIT')
 def cleanup_label_studio_duplicates():
     """Clean up duplicate projects and tasks in Label Studio"""
     try:
@@ -1541,124 +2389,291 @@ def cleanup_label_studio_duplicates():
         if not user.label_studio_api_key:
             return jsonify({'error': 'Label Studio Legacy Token not configured'}), 400
         
-        base_url = get_label_studio_base_url()
-        headers = {
-            'Authorization': f'Token {user.label_studio_api_key}',
-            'Content-Type': 'application/json'
-        }
-        
-        # Get all projects
-        projects_response = execute_curl_command(
-            method='GET',
-            url=f'{base_url}/api/projects/',
-            headers=headers,
-            timeout=30
-        )
-        
-        if not projects_response['success']:
-            return jsonify({'error': 'Failed to fetch projects from Label Studio'}), 500
-        
-        projects = projects_response['json']
-        if not isinstance(projects, list):
-            return jsonify({'error': 'Invalid response format from Label Studio'}), 500
-        
-        # Group projects by title to find duplicates
-        project_groups = {}
-        for project in projects:
-            if isinstance(project, dict) and 'title' in project:
-                title = project['title']
-                if title not in project_groups:
-                    project_groups[title] = []
-                project_groups[title].append(project)
+        # Cleanup touches every project; let the client opt into a background job
+        if wants_async():
+            job = job_queue.enqueue('label_studio_cleanup', user_id=user.id)
+            return job_accepted(job)
         
-        deleted_projects = 0
-        deleted_tasks = 0
-        cleanup_details = []
-        
-        # Process each group of projects with the same title
-        for title, project_list in project_groups.items():
-            if len(project_list) > 1:
-                # Keep the first project, delete the rest
-                projects_to_keep = project_list[:1]
-                projects_to_delete = project_list[1:]
-                
-                current_app.logger.info(f"Found {len(project_list)} projects with title '{title}', keeping 1, deleting {len(projects_to_delete)}")
-                
-                for project_to_delete in projects_to_delete:
-                    project_id = project_to_delete.get('id')
-                    if project_id:
-                        # Delete the duplicate project
-                        delete_response = execute_curl_command(
-                            method='DELETE',
-                            url=f'{base_url}/api/projects/{project_id}/',
-                            headers=headers,
-                            timeout=30
-                        )
-                        
-                        if delete_response['success']:
-                            deleted_projects += 1
-                            current_app.logger.info(f"Deleted duplicate project '{title}' with ID {project_id}")
-                            cleanup_details.append(f"Deleted duplicate project '{title}' (ID: {project_id})")
-                        else:
-                            current_app.logger.error(f"Failed to delete project {project_id}: {delete_response}")
-                
-                # For the remaining project, clean up duplicate tasks
-                if projects_to_keep:
-                    remaining_project = projects_to_keep[0]
-                    project_id = remaining_project.get('id')
-                    
-                    if project_id:
-                        # Get tasks for the remaining project
-                        tasks_response = execute_curl_command(
-                            method='GET',
-                            url=f'{base_url}/api/projects/{project_id}/tasks/',
-                            headers=headers,
-                            timeout=30
-                        )
-                        
-                        if tasks_response['success'] and tasks_response['json']:
-                            tasks = tasks_response['json']
-                            
-                            # Group tasks by image filename to find duplicates
-                            task_groups = {}
-                            for task in tasks:
-                                if isinstance(task, dict) and 'data' in task:
-                                    filename = task['data'].get('image_filename')
-                                    if filename:
-                                        if filename not in task_groups:
-                                            task_groups[filename] = []
-                                        task_groups[filename].append(task)
-                            
-                            # Delete duplicate tasks
-                            for filename, task_list in task_groups.items():
-                                if len(task_list) > 1:
-                                    tasks_to_delete = task_list[1:]  # Keep first, delete rest
-                                    
-                                    for task_to_delete in tasks_to_delete:
-                                        task_id = task_to_delete.get('id')
-                                        if task_id:
-                                            delete_task_response = execute_curl_command(
-                                                method='DELETE',
-                                                url=f'{base_url}/api/tasks/{task_id}/',
-                                                headers=headers,
-                                                timeout=30
-                                            )
-                                            
-                                            if delete_task_response['success']:
-                                                deleted_tasks += 1
-                                                current_app.logger.info(f"Deleted duplicate task for '{filename}' with ID {task_id}")
-                                                cleanup_details.append(f"Deleted duplicate task for '{filename}' (ID: {task_id})")
-        
-        return jsonify({
-            'success': True,
-            'message': f'Cleanup completed: {deleted_projects} duplicate projects and {deleted_tasks} duplicate tasks deleted',
-            'deleted_projects': deleted_projects,
-            'deleted_tasks': deleted_tasks,
-            'details': cleanup_details
-        })
+        payload, status_code = run_label_studio_cleanup(user)
+        return jsonify(payload), status_code
         
     except Exception as e:
         current_app.logger.error(f"Error during Label Studio cleanup: {str(e)}")
         return jsonify({
             'error': f'Cleanup failed: {str(e)}'
         }), 500
+
+# =============================================================================
+# IMAGE INTEGRITY VERIFICATION
+# =============================================================================
+
+def image_verification_cursor(job_id):
+    """Image id to resume verification from: where an interrupted previous pass stopped, else 0"""
+    previous_jobs = Job.query.filter(
+        Job.job_type == 'image_verification', Job.id < job_id
+    ).order_by(Job.id.desc()).limit(20)
+    for previous in previous_jobs:
+        if previous.status == 'succeeded' and (previous.result or {}).get('skipped'):
+            continue  # Started while another pass was running; did no work
+        if previous.status == 'failed':
+            return previous.progress_current or 0
+        return 0
+    return 0
+
+def run_image_verification(after_id=0, progress=None):
+    """
+    Re-hash stored images and flag those whose object is corrupt or missing
+    
+    Images are walked in id order, IMAGE_VERIFICATION_BATCH_SIZE at a time. Objects are
+    streamed from MinIO and hashed with each image's own algorithm on
+    IMAGE_VERIFICATION_CONCURRENCY threads, while all reads together are held to
+    IMAGE_VERIFICATION_RATE bytes per second. Objects shared by several images are
+    hashed once per batch. Every finished batch is committed and reported through
+    progress(last_image_id, max_image_id), so an interrupted pass can resume from there.
+    
+    Args:
+        after_id: Only verify images with a higher id
+        progress: Optional callback(current, total, message, force=...) for job progress
+        
+    Returns:
+        Dict with counts of verified, ok, corrupt, missing and unreadable images and bytes read
+    """
+    from datetime import datetime
+    from .services.concurrency import ByteRateLimiter
+    
+    batch_size = current_app.config.get('IMAGE_VERIFICATION_BATCH_SIZE', 200)
+    concurrency = current_app.config.get('IMAGE_VERIFICATION_CONCURRENCY', 2)
+    throttle = ByteRateLimiter(current_app.config.get('IMAGE_VERIFICATION_RATE', 16 * 1024 * 1024))
+    
+    # Images uploaded during the pass are left for the next one
+    last_id = db.session.query(func.max(CapturedImage.id)).scalar() or 0
+    totals = {'resumed_from': after_id, 'verified': 0, 'ok': 0, 'corrupt': 0, 'missing': 0, 'errors': 0, 'bytes_read': 0}
+    if progress:
+        # Record the starting point right away so a pass that dies early resumes from it too
+        progress(after_id, last_id, f'Verifying images after id {after_id}', force=True)
+    
+    while after_id < last_id:
+        rows = db.session.query(
+            CapturedImage.id, CapturedImage.storage_key, CapturedImage.checksum,
+            CapturedImage.checksum_algorithm, CapturedImage.file_size
+        ).filter(
+            CapturedImage.id > after_id,
+            CapturedImage.id <= last_id,
+            CapturedImage.storage_provider == 'minio',
+            CapturedImage.storage_key.isnot(None),
+            CapturedImage.checksum.isnot(None)
+        ).order_by(CapturedImage.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        objects = {}
+        for row in rows:
+            objects.setdefault((row.storage_key, row.checksum_algorithm or LEGACY_CHECKSUM_ALGORITHM), []).append(row)
+        
+        statuses = {}
+        hashed = prefetch_ordered(objects, lambda item: minio_service.hash_object(*item, throttle=throttle), concurrency)
+        for (object_key, algorithm), result, error in hashed:
+            if error is not None:
+                # Unreadable right now (e.g. MinIO unavailable); left for the next pass
+                current_app.logger.warning(f"Could not verify {object_key}: {str(error)}")
+                totals['errors'] += len(objects[(object_key, algorithm)])
+                continue
+            if result is not None:
+                totals['bytes_read'] += result[1]
+            for row in objects[(object_key, algorithm)]:
+                if result is None:
+                    status = 'missing'
+                elif result[0] == row.checksum and (row.file_size is None or result[1] == row.file_size):
+                    status = 'ok'
+                else:
+                    status = 'corrupt'
+                if status != 'ok':
+                    current_app.logger.error(f"Image {row.id} failed verification: object {object_key} is {status}")
+                statuses.setdefault(status, []).append(row.id)
+                totals[status] += 1
+                totals['verified'] += 1
+        
+        now = datetime.utcnow()
+        for status, image_ids in statuses.items():
+            db.session.execute(
+                update(CapturedImage).where(CapturedImage.id.in_(image_ids)).values(integrity_status=status, verified_at=now)
+            )
+        db.session.commit()
+        
+        after_id = rows[-1].id
+        if progress:
+            progress(after_id, last_id, f"Verified {totals['verified']} images: "
+                                        f"{totals['corrupt']} corrupt, {totals['missing']} missing", force=True)
+    
+    current_app.logger.info(f"Image verification finished: {totals}")
+    return totals
+
+@bp.route('/images/verify', methods=['POST'])
+@jwt_required()
+def verify_images():
+    """
+    Start a background pass that re-hashes stored images and flags corrupt or missing ones
+    
+    The pass resumes where an interrupted previous pass stopped unless ?restart=true is
+    given. Flagged images can be listed with GET /images?integrity_status=corrupt (or missing).
+    """
+    restart = request.args.get('restart', '').lower() in ('1', 'true', 'yes')
+    job = job_queue.enqueue('image_verification', user_id=int(get_jwt_identity()), restart=restart)
+    return job_accepted(job)
+
+# =============================================================================
+# BACKGROUND JOB ENDPOINTS
+# =============================================================================
+
+def wants_async():
+    """True when the client asked for a background job (?async=true or Prefer: respond-async)"""
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def job_accepted(job):
+    """202 response pointing the client at the job status endpoint"""
+    response = jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.id}'
+    })
+    response.status_code = 202
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return response
+
+@job_queue.handler('label_studio_import')
+def label_studio_import_job(context, project_id, product_id, full_sync=False, since=None):
+    """Background variant of POST /label-studio/import-images"""
+    from datetime import datetime
+    
+    job = db.session.get(Job, context.job_id)
+    user = db.session.get(User, job.user_id) if job.user_id else None
+    product = db.session.get(Product, product_id)
+    if not user or not user.label_studio_api_key:
+        raise ValueError('Label Studio Legacy Token not configured')
+    if not product:
+        raise ValueError('Product not found')
+    
+    payload, status_code = run_label_studio_import(
+        user, product, project_id, progress=context.progress, full_sync=full_sync,
+        since=datetime.fromisoformat(since) if since else None
+    )
+    if status_code >= 400:
+        raise RuntimeError(payload.get('error', f'Import failed with status {status_code}'))
+    return payload
+
+@job_queue.handler('label_studio_cleanup')
+def label_studio_cleanup_job(context):
+    """
+    Background variant of POST /label-studio/cleanup-duplicates
+    
+    When LABEL_STUDIO_CLEANUP_INTERVAL is set it also runs as a scheduled maintenance job
+    without an owner. It then cleans up only with the dedicated LABEL_STUDIO_SERVICE_TOKEN,
+    never with the tokens users stored for their own requests.
+    """
+    job = db.session.get(Job, context.job_id)
+    if job.user_id is None:
+        token = current_app.config.get('LABEL_STUDIO_SERVICE_TOKEN')
+        if not token:
+            raise ValueError('Scheduled cleanup requires LABEL_STUDIO_SERVICE_TOKEN')
+        # Transient user carrying the service token; it is never added to the session
+        user = User(username='label-studio-service', label_studio_api_key=token)
+    else:
+        user = db.session.get(User, job.user_id)
+        if not user or not user.label_studio_api_key:
+            raise ValueError('Label Studio Legacy Token not configured')
+    
+    payload, status_code = run_label_studio_cleanup(user, progress=context.progress)
+    if status_code >= 400:
+        raise RuntimeError(payload.get('error', f'Cleanup failed with status {status_code}'))
+    return payload
+
+# Duplicates can no longer be created by this app, so cleanup is on-demand or opt-in periodic maintenance
+job_queue.schedule('label_studio_cleanup', 'LABEL_STUDIO_CLEANUP_INTERVAL', default=0)
+
+@job_queue.handler('export_images')
+def export_images_job(context, args, archive_name):
+    """Background variant of the ZIP downloads; the archive is stored in MinIO as the job artefact"""
+    from datetime import datetime
+    
+    filters = parse_export_filters(MultiDict(args))
+    count_query = db.session.query(func.count(CapturedImage.id)).join(Product, CapturedImage.product_id == Product.id)
+    total = apply_export_filters(count_query, filters).scalar()
+    if not total:
+        raise ValueError('No images found')
+    
+    filename = f"{archive_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    
+    def entries_with_progress():
+        for done, entry in enumerate(iter_export_entries(lambda: export_images_query(filters)), 1):
+            context.progress(min(done, total), total, f"Archived {min(done, total)} of {total} images")
+            yield entry
+    
+    # Spool the archive to disk, then upload it in one go with a known length
+    with tempfile.TemporaryFile() as archive:
+        for chunk in stream_zip(entries_with_progress()):
+            archive.write(chunk)
+        size = archive.tell()
+        archive.seek(0)
+        context.progress(total, total, 'Uploading archive', force=True)
+        context.store_artifact(archive, filename, size, 'application/zip')
+    
+    return {'filename': filename, 'size': size, 'image_count': total}
+
+@job_queue.handler('image_verification')
+def image_verification_job(context, restart=False):
+    """
+    Background integrity check of stored images (see run_image_verification)
+    
+    Also runs as a scheduled maintenance job every IMAGE_VERIFICATION_INTERVAL seconds when
+    that is set (off by default). Only one pass runs at a time across all workers.
+    """
+    with advisory_lock('image-verification', 'pass', blocking=False) as acquired:
+        if not acquired:
+            return {'skipped': 'Another verification pass is already running'}
+        after_id = 0 if restart else image_verification_cursor(context.job_id)
+        return run_image_verification(after_id, progress=context.progress)
+
+# A pass reads every stored object, so periodic verification is opt-in
+job_queue.schedule('image_verification', 'IMAGE_VERIFICATION_INTERVAL', default=0)
+
+@bp.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Get status, progress, result and error of a background job"""
+    job = db.session.get(Job, job_id)
+    if not job or job.user_id != int(get_jwt_identity()):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    job_data = job.to_dict()
+    if job.artifact_key:
+        job_data['artifact_url'] = f'/jobs/{job.id}/artifact'
+    return jsonify(job_data)
+
+@bp.route('/jobs/<int:job_id>/artifact', methods=['GET'])
+@jwt_required()
+def download_job_artifact(job_id):
+    """Download the file produced by a finished job (e.g. an export ZIP) streamed from MinIO"""
+    job = db.session.get(Job, job_id)
+    if not job or job.user_id != int(get_jwt_identity()):
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'succeeded' or not job.artifact_key:
+        return jsonify({'error': 'Job has no artifact', 'status': job.status}), 404
+    
+    try:
+        stat = minio_service.stat_image(job.artifact_key)
+        stream = minio_service.open_image_stream(job.artifact_key)
+    except Exception as e:
+        current_app.logger.error(f"Error opening artifact for job {job_id}: {str(e)}")
+        return jsonify({'error': 'Artifact not available'}), 404
+    
+    filename = job.artifact_key.rsplit('/', 1)[-1]
+    response = Response(
+        stream,
+        mimetype=stat.content_type or 'application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+    response.content_length = stat.size
+    response.call_on_close(stream.close)
+    return response
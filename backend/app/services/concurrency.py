@@ -0,0 +1,156 @@
+"""
+Concurrency Helpers
+Cross-worker advisory locks, per-route concurrency limits and I/O throttling for running the backend with multiple workers
+"""
+
+import threading
+import time
+import zlib
+import logging
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, jsonify, make_response
+
+logger = logging.getLogger(__name__)
+
+# Process-local fallback locks for databases without advisory locks (e.g. SQLite in development)
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+def _lock_keys(namespace: str, key) -> tuple:
+    """Map a (namespace, key) pair onto the two int4 keys used by pg_advisory_lock"""
+    return (
+        zlib.crc32(namespace.encode()) & 0x7fffffff,
+        zlib.crc32(str(key).encode()) & 0x7fffffff
+    )
+
+def _local_lock(namespace: str, key) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault((namespace, str(key)), threading.Lock())
+
+@contextmanager
+def advisory_lock(namespace: str, key, blocking: bool = True):
+    """
+    Hold a lock shared by all workers (PostgreSQL advisory lock) for the duration of the block
+
+    The lock lives on its own connection, so it is independent of the ORM session's
+    transactions and is released even if the block commits or rolls back.
+
+    Args:
+        namespace: Lock family, e.g. 'label-studio-project'
+        key: Value identifying the protected resource within the namespace
+        blocking: Wait for the lock (True) or give up immediately (False)
+
+    Yields:
+        True if the lock is held, False if blocking=False and another worker holds it
+    """
+    from ..models import db
+
+    if db.engine.dialect.name != 'postgresql':
+        lock = _local_lock(namespace, key)
+        acquired = lock.acquire(blocking=blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+        return
+
+    class_id, object_id = _lock_keys(namespace, key)
+    with db.engine.connect() as conn:
+        if blocking:
+            conn.exec_driver_sql('SELECT pg_advisory_lock(%s, %s)', (class_id, object_id))
+            acquired = True
+        else:
+            acquired = conn.exec_driver_sql(
+                'SELECT pg_try_advisory_lock(%s, %s)', (class_id, object_id)
+            ).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.exec_driver_sql('SELECT pg_advisory_unlock(%s, %s)', (class_id, object_id))
+            conn.commit()
+
+_route_semaphores = {}
+_route_semaphores_guard = threading.Lock()
+
+def _route_semaphore(name: str, limit: int) -> threading.BoundedSemaphore:
+    with _route_semaphores_guard:
+        semaphore = _route_semaphores.get(name)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(limit)
+            _route_semaphores[name] = semaphore
+        return semaphore
+
+def concurrency_limit(config_key: str, default: int = 2, retry_after: int = 5):
+    """
+    Limit how many requests of a heavy route run at once in this worker
+
+    Requests beyond the limit are rejected with 503 and a Retry-After header instead
+    of tying up every worker thread. The slot is held until the response is closed, so
+    streamed responses (e.g. ZIP exports) count until the last byte is sent.
+
+    Args:
+        config_key: App config key holding the limit (0 disables the limit)
+        default: Limit used when the config key is not set
+        retry_after: Seconds suggested to the client before retrying
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limit = current_app.config.get(config_key, default)
+            if not limit:
+                return view(*args, **kwargs)
+
+            semaphore = _route_semaphore(config_key, limit)
+            if not semaphore.acquire(blocking=False):
+                logger.warning(f"Concurrency limit reached for {view.__name__} ({config_key}={limit})")
+                response = jsonify({'error': 'Server is busy with similar requests, please retry shortly'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                semaphore.release()
+                raise
+            response.call_on_close(semaphore.release)
+            return response
+        return wrapper
+    return decorator
+
+class ByteRateLimiter:
+    """
+    Thread-safe throttle that keeps the average read rate of background work under a limit
+
+    Callers report every chunk they read; once they are ahead of the rate they sleep
+    until it has caught up, so a background task never takes more than its share of
+    storage bandwidth from live requests.
+    """
+
+    def __init__(self, rate: int, burst: int = None):
+        """
+        Args:
+            rate: Bytes per second shared by all callers (0 disables throttling)
+            burst: Bytes that may be read ahead of the rate (default: one second's worth)
+        """
+        self.rate = rate
+        self.burst = burst or rate
+        self._allowance = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, amount: int):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.burst, self._allowance + (now - self._updated) * self.rate)
+            self._updated = now
+            self._allowance -= amount
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0
+        if delay:
+            time.sleep(delay)
@@ -0,0 +1,264 @@
+"""
+Content-Addressed Image Store
+Deduplicates uploaded images by checksum and reference-counts the objects they share in MinIO
+"""
+
+import logging
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+
+from .minio_service import minio_service, HashingReader, stream_length
+
+logger = logging.getLogger(__name__)
+
+# Read size used when hashing a spooled upload ahead of storing it
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class ContentStore:
+    """
+    Stores each distinct image content once and counts the images that reference it
+
+    Every object written for an image is registered in the stored_object table with a
+    reference count. An upload whose checksum (same algorithm) and size match a live
+    object of the same company and product (same "company/product/" key prefix) that
+    has not been flagged by integrity verification takes a reference on it instead of
+    writing a new object; deleting an image drops its reference, and the object is
+    only removed from MinIO once no image uses it. Objects are never shared across
+    products, so a storage key always lives under its owner's prefix.
+    Reference changes are single atomic UPDATEs, so an upload can never reference an
+    object that a concurrent delete is about to remove.
+
+    Objects stored before deduplication was introduced are not registered; they are
+    treated as owned by the image(s) whose storage_key points at them.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the deduplication switch from the app config"""
+        self.enabled = app.config.get('IMAGE_DEDUPLICATION', self.enabled)
+        app.extensions['content_store'] = self
+
+    def hash_stream(self, stream) -> Tuple[str, int]:
+        """
+        Hash a seekable stream with the configured algorithm and rewind it to where it was
+
+        Returns:
+            Tuple of checksum and size in bytes
+        """
+        position = stream.tell()
+        reader = HashingReader(stream, minio_service.checksum_algorithm)
+        while reader.read(HASH_CHUNK_SIZE):
+            pass
+        stream.seek(position)
+        return reader.hexdigest(), reader.bytes_read
+
+    def acquire(self, key_prefix: str, checksum_algorithm: str, checksum: str, file_size: int) -> Optional[str]:
+        """
+        Take a reference on a live, intact object with the given content, committed immediately
+
+        Args:
+            key_prefix: Only objects stored under this prefix (the uploading product's) are considered
+            checksum_algorithm: Algorithm the checksum was computed with
+            checksum: Content checksum
+            file_size: Content size in bytes
+
+        Returns:
+            Object key of the referenced object, or None if no such object exists
+        """
+        from ..models import db, StoredObject, CapturedImage
+
+        table = StoredObject.__table__
+        candidates = table.alias('candidate')
+        images = CapturedImage.__table__
+        flagged = select(images.c.id).where(
+            images.c.storage_key == candidates.c.storage_key,
+            images.c.integrity_status.in_(('corrupt', 'missing'))
+        ).exists()
+        candidate = (
+            select(candidates.c.storage_key)
+            .where(candidates.c.checksum_algorithm == checksum_algorithm,
+                   candidates.c.checksum == checksum,
+                   candidates.c.file_size == file_size,
+                   candidates.c.ref_count > 0,
+                   candidates.c.storage_key.startswith(key_prefix, autoescape=True),
+                   ~flagged)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # ref_count > 0 is re-checked on the locked row, so a concurrent release to zero wins
+        with db.engine.begin() as conn:
+            return conn.execute(
+                update(table)
+                .where(table.c.storage_key == candidate, table.c.ref_count > 0)
+                .values(ref_count=table.c.ref_count + 1)
+                .returning(table.c.storage_key)
+            ).scalar()
+
+    def register(self, storage_key: str, checksum_algorithm: str, checksum: str, file_size: int):
+        """Record a newly written object holding one reference, committed immediately"""
+        from ..models import db, StoredObject
+
+        with db.engine.begin() as conn:
+            conn.execute(StoredObject.__table__.insert().values(
+                storage_key=storage_key, checksum_algorithm=checksum_algorithm, checksum=checksum,
+                file_size=file_size, ref_count=1
+            ))
+
+    def store(self,
+              file,
+              company_name: str,
+              product_name: str,
+              step_name: str,
+              filename: Optional[str] = None,
+              content_type: Optional[str] = None) -> dict:
+        """
+        Store an uploaded image, reusing an existing object of the same product with the same content
+
+        Seekable uploads (multipart files and spooled archive members) are hashed first,
+        so a duplicate is never sent to MinIO, and that checksum is reused for the upload
+        instead of hashing the content a second time. Streams that cannot seek are uploaded
+        while hashing, and the new object is dropped again if it turns out to be a
+        duplicate. Either way the caller owns one reference on the returned object and
+        must record an image for it or hand it back with discard().
+
+        Args:
+            file: The uploaded file object (see MinIOService.upload_image)
+            company_name: Name of the company
+            product_name: Name of the product
+            step_name: Name of the step
+            filename: Original file name (default: file.filename)
+            content_type: MIME type (default: file.content_type, then image/jpeg)
+
+        Returns:
+            CapturedImage storage metadata, with 'deduplicated' set when an existing object was reused
+        """
+        mime_type = content_type or getattr(file, 'content_type', None) or 'image/jpeg'
+        key_prefix = minio_service.object_key_prefix(company_name, product_name)
+
+        checksum = algorithm = None
+        if self.enabled:
+            stream = getattr(file, 'stream', file)
+            if stream_length(stream) is not None:
+                algorithm = minio_service.checksum_algorithm
+                checksum, file_size = self.hash_stream(stream)
+                existing_key = self.acquire(key_prefix, algorithm, checksum, file_size)
+                if existing_key is not None:
+                    logger.info(f"Deduplicated upload of {filename or file.filename} onto {existing_key}")
+                    return dict(minio_service.object_metadata(existing_key, file_size, mime_type, checksum, algorithm),
+                                deduplicated=True)
+
+        _, metadata = minio_service.upload_image(
+            file, company_name, product_name, step_name, filename=filename, content_type=mime_type,
+            checksum=checksum, checksum_algorithm=algorithm
+        )
+
+        if self.enabled:
+            existing_key = self.acquire(key_prefix, metadata['checksum_algorithm'], metadata['checksum'], metadata['file_size'])
+            if existing_key is not None:
+                minio_service.delete_image(metadata['storage_key'])
+                logger.info(f"Deduplicated streamed upload {metadata['storage_key']} onto {existing_key}")
+                return dict(minio_service.object_metadata(existing_key, metadata['file_size'], mime_type,
+                                                          metadata['checksum'], metadata['checksum_algorithm']),
+                            deduplicated=True)
+
+        try:
+            self.register(metadata['storage_key'], metadata['checksum_algorithm'], metadata['checksum'], metadata['file_size'])
+        except Exception:
+            minio_service.delete_image(metadata['storage_key'])
+            raise
+        return dict(metadata, deduplicated=False)
+
+    def _decrement(self, counts: Counter) -> Tuple[List[str], List[str]]:
+        """
+        Drop references in the current session's transaction
+
+        Returns:
+            Tuple of (registered keys that are no longer referenced, keys that are not registered)
+        """
+        from ..models import db, StoredObject
+
+        if not counts:
+            return [], []
+        table = StoredObject.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.storage_key == bindparam('key'))
+            .values(ref_count=table.c.ref_count - bindparam('count')),
+            [{'key': key, 'count': count} for key, count in counts.items()]
+        )
+        rows = db.session.execute(
+            select(table.c.storage_key, table.c.ref_count).where(table.c.storage_key.in_(list(counts)))
+        ).all()
+        unreferenced = [key for key, ref_count in rows if ref_count <= 0]
+        if unreferenced:
+            db.session.execute(table.delete().where(table.c.storage_key.in_(unreferenced), table.c.ref_count <= 0))
+        registered = {key for key, _ in rows}
+        return unreferenced, [key for key in counts if key not in registered]
+
+    def release(self, images: Iterable) -> List[str]:
+        """
+        Drop the references held by images that are about to be deleted
+
+        Runs in the caller's transaction: delete the rows and commit, then remove the
+        returned objects (and their variants) from MinIO. Variant rows of images whose
+        object stays in use are moved to an image that keeps it, since variant objects
+        are derived from the object key rather than from the image.
+
+        Args:
+            images: CapturedImage rows that will be deleted in the same transaction
+
+        Returns:
+            Object keys that are no longer referenced by any image
+        """
+        from ..models import db, CapturedImage, ImageVariant
+
+        images = [img for img in images if img.storage_key and img.storage_provider == 'minio']
+        if not images:
+            return []
+        image_ids = [img.id for img in images]
+
+        unreferenced, unregistered = self._decrement(Counter(img.storage_key for img in images))
+
+        # Unregistered objects are owned by the images pointing at them
+        survivors = dict(db.session.query(CapturedImage.storage_key, db.func.min(CapturedImage.id)).filter(
+            CapturedImage.storage_key.in_([img.storage_key for img in images if img.storage_key not in unreferenced]),
+            CapturedImage.id.notin_(image_ids)
+        ).group_by(CapturedImage.storage_key).all())
+        unreferenced += [key for key in unregistered if key not in survivors]
+
+        variants = ImageVariant.__table__
+        kept = variants.alias('kept')
+        for img in images:
+            survivor_id = survivors.get(img.storage_key)
+            if survivor_id is None:
+                continue
+            db.session.execute(
+                update(variants)
+                .where(variants.c.image_id == img.id,
+                       ~select(kept.c.id).where(kept.c.image_id == survivor_id,
+                                                kept.c.width == variants.c.width,
+                                                kept.c.height == variants.c.height,
+                                                kept.c.format == variants.c.format).exists())
+                .values(image_id=survivor_id)
+            )
+            # Keep the ORM cascade from deleting the moved rows along with the image
+            db.session.expire(img, ['variants'])
+        return unreferenced
+
+    def discard(self, storage_keys: Iterable[str]):
+        """Hand back the references store() returned for uploads that were never recorded"""
+        from ..models import db
+
+        unreferenced, unregistered = self._decrement(Counter(storage_keys))
+        db.session.commit()
+        minio_service.delete_images(unreferenced + unregistered)
+
+# Singleton instance, bound to the application in create_app()
+content_store = ContentStore()
@@ -0,0 +1,164 @@
+"""
+Endpoint Resolution Service
+Discovers and caches the Docker gateway address used to reach Label Studio and MinIO from containers
+"""
+
+import os
+import socket
+import subprocess
+import threading
+import time
+import logging
+from typing import Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Common Docker bridge gateways probed when the route table gives no answer
+COMMON_GATEWAYS = ['172.17.0.1', '172.18.0.1', '172.19.0.1', '172.20.0.1', '172.21.0.1']
+DEFAULT_GATEWAY_IP = '172.20.0.1'
+
+class EndpointResolver:
+    def __init__(self):
+        """Initialize resolver with configuration from environment variables"""
+        self.ttl = int(os.getenv('ENDPOINT_CACHE_TTL', '300'))
+        self.label_studio_port = int(os.getenv('LABEL_STUDIO_PORT', '8081'))
+        self.minio_port = int(os.getenv('MINIO_PORT', '9000'))
+
+        # Explicit overrides skip discovery entirely
+        self.label_studio_url = os.getenv('LABEL_STUDIO_URL') or None
+        self.minio_endpoint = os.getenv('MINIO_LABEL_STUDIO_ENDPOINT') or None
+
+        self._gateway_ip = None
+        self._resolved_at = 0.0
+        self._resolved = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Apply application config overrides and start resolving in the background"""
+        self.ttl = int(app.config.get('ENDPOINT_CACHE_TTL', self.ttl))
+        self.label_studio_url = app.config.get('LABEL_STUDIO_URL') or self.label_studio_url
+        self.minio_endpoint = app.config.get('MINIO_LABEL_STUDIO_ENDPOINT') or self.minio_endpoint
+
+        # Resolve once at startup so the first request does not pay for discovery
+        self.refresh_async()
+
+    def get_label_studio_base_url(self) -> str:
+        """Get the base URL for Label Studio API calls"""
+        if self.label_studio_url:
+            return self.label_studio_url.rstrip('/')
+        gateway_ip = self.get_gateway_ip() or DEFAULT_GATEWAY_IP
+        return f'http://{gateway_ip}:{self.label_studio_port}'
+
+    def get_minio_endpoint(self) -> str:
+        """Get the MinIO endpoint (host:port) reachable from the Label Studio container"""
+        if self.minio_endpoint:
+            return self.minio_endpoint
+        gateway_ip = self.get_gateway_ip() or 'localhost'
+        return f'{gateway_ip}:{self.minio_port}'
+
+    def get_gateway_ip(self) -> Optional[str]:
+        """
+        Get the cached gateway IP, resolving it on first use
+
+        An expired entry keeps being served while a background refresh runs, so
+        callers never block on discovery once a value has been resolved.
+
+        Returns:
+            Gateway IP address, or None if discovery found nothing
+        """
+        if not self._resolved:
+            self._resolve_initial()
+        elif time.monotonic() - self._resolved_at > self.ttl:
+            self.refresh_async()
+        return self._gateway_ip
+
+    def refresh_async(self):
+        """Re-resolve the gateway in a background thread (no-op if a refresh is already running)"""
+        if self.label_studio_url and self.minio_endpoint:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        threading.Thread(target=self._refresh, name='endpoint-resolver', daemon=True).start()
+
+    def invalidate(self):
+        """Mark the cached endpoint as stale after a failed call and refresh it in the background"""
+        self._resolved_at = 0.0
+        self.refresh_async()
+
+    def _resolve_initial(self):
+        # Held for the whole discovery so concurrent first callers wait instead of probing again
+        with self._lock:
+            if not self._resolved:
+                self._store(self._discover_gateway_ip())
+
+    def _refresh(self):
+        try:
+            if not self._resolved:
+                self._resolve_initial()
+                return
+            gateway_ip = self._discover_gateway_ip()
+            with self._lock:
+                self._store(gateway_ip)
+        except Exception as e:
+            logger.error(f"Background endpoint refresh failed: {str(e)}")
+        finally:
+            self._refresh_lock.release()
+
+    def _store(self, gateway_ip: Optional[str]):
+        if gateway_ip != self._gateway_ip:
+            logger.info(f"Resolved Docker gateway IP: {gateway_ip}")
+        self._gateway_ip = gateway_ip
+        self._resolved_at = time.monotonic()
+        self._resolved = True
+
+    def _discover_gateway_ip(self) -> Optional[str]:
+        """Dynamically get the Docker gateway IP to reach the host"""
+        # Method 1: Try to get gateway from route table
+        try:
+            result = subprocess.run(['ip', 'route', 'show', 'default'],
+                                  capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                for line in result.stdout.strip().split('\n'):
+                    parts = line.split()
+                    if 'default' in parts and 'via' in parts:
+                        gateway_idx = parts.index('via') + 1
+                        if gateway_idx < len(parts):
+                            return parts[gateway_idx]
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
+            pass
+
+        # Method 2: Try to get gateway from /proc/net/route
+        try:
+            with open('/proc/net/route', 'r') as f:
+                for line in f:
+                    fields = line.strip().split()
+                    if len(fields) >= 3 and fields[1] == '00000000':  # Default route
+                        # Convert hex to IP (little-endian)
+                        return socket.inet_ntoa(bytes.fromhex(fields[2])[::-1])
+        except (IOError, ValueError):
+            pass
+
+        # Method 3: Try common Docker gateway IPs
+        for gateway in COMMON_GATEWAYS:
+            try:
+                response = requests.get(f'http://{gateway}:{self.label_studio_port}/api/projects/', timeout=2)
+                # Even 401 is good - means Label Studio is there
+                if response.status_code in [200, 401, 403]:
+                    return gateway
+            except requests.RequestException:
+                continue
+
+        # Method 4: Fall back to host.docker.internal if available
+        try:
+            return socket.gethostbyname('host.docker.internal')
+        except (socket.gaierror, UnicodeError):
+            pass
+
+        logger.warning("Could not determine gateway IP")
+        return None
+
+# Singleton instance
+endpoint_resolver = EndpointResolver()
@@ -0,0 +1,380 @@
+"""
+Background Job Queue
+Runs long Label Studio and export operations in a dedicated worker process, tracked in the job table
+"""
+
+import logging
+import secrets
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select, update
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PREFIX = '_jobs'
+
+class JobContext:
+    """Handle given to job handlers for reporting progress and storing artefacts"""
+
+    def __init__(self, queue: 'JobQueue', job_id: int):
+        self.queue = queue
+        self.job_id = job_id
+        self._last_progress = 0.0
+
+    def progress(self, current: int, total: Optional[int] = None, message: Optional[str] = None, force: bool = False):
+        """
+        Record progress; writes are throttled to one per PROGRESS_INTERVAL unless forced
+
+        Progress is written on its own connection so it never commits (or breaks a
+        streaming cursor of) the handler's session.
+        """
+        now = time.monotonic()
+        finished = total is not None and current >= total
+        if not force and not finished and now - self._last_progress < self.queue.progress_interval:
+            return
+        self._last_progress = now
+
+        values = {'progress_current': current, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:500]
+        self.queue._update_job(self.job_id, **values)
+
+    def store_artifact(self, data, filename: str, length: int, content_type: str = 'application/octet-stream') -> str:
+        """
+        Upload a finished artefact to object storage and attach it to the job
+
+        The key carries a random component so it cannot be guessed from the job id and
+        file name; artefacts are only downloadable through the owner's job endpoint.
+
+        Args:
+            data: Readable file-like object positioned at the start
+            filename: Name the artefact is stored and downloaded under
+            length: Size in bytes
+            content_type: MIME type of the artefact
+
+        Returns:
+            Object key of the stored artefact
+        """
+        from .minio_service import minio_service
+
+        object_key = f'{ARTIFACT_PREFIX}/{self.job_id}/{secrets.token_hex(16)}/{filename}'
+        minio_service.upload_file(object_key, data, length, content_type)
+        self.queue._update_job(self.job_id, artifact_key=object_key)
+        return object_key
+
+class JobQueue:
+    """
+    DB-backed job queue executed by a thread pool in a dedicated worker process
+
+    Jobs are rows in the job table. Web workers only enqueue them: `flask jobs worker`
+    runs the pool plus a sweeper thread that picks up queued jobs, so job lifetime is
+    independent of gunicorn worker recycling and timeouts. A job is claimed with an
+    atomic status update, so it runs exactly once even with several worker processes
+    polling the same table. Running jobs are heart-beaten, and jobs whose worker died
+    are marked failed once the heartbeat goes stale. Job types registered with
+    schedule() are also enqueued periodically by the sweeper, as system jobs without
+    an owner.
+
+    Nothing is started by init_app() unless JOB_RUN_IN_PROCESS is set (single-process
+    development setups), so web workers, `flask db` and other CLI commands never run jobs.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._handlers = {}
+        self._schedules = {}
+        self._executor = None
+        self._running = set()
+        self._submitted = set()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+
+        self.workers = 2
+        self.run_in_process = False
+        self.poll_interval = 2
+        self.stale_after = 300
+        self.progress_interval = 1.0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the queue to the app; the worker pool only starts here with JOB_RUN_IN_PROCESS"""
+        self._app = app
+        self.workers = app.config.get('JOB_WORKERS', self.workers)
+        self.run_in_process = app.config.get('JOB_RUN_IN_PROCESS', self.run_in_process)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.stale_after = app.config.get('JOB_STALE_AFTER', self.stale_after)
+        app.extensions['job_queue'] = self
+        app.cli.add_command(jobs_cli)
+
+        if self.run_in_process:
+            self.start()
+
+    def start(self, workers: Optional[int] = None):
+        """Start the worker pool and the sweeper/scheduler thread in this process"""
+        if workers is not None:
+            self.workers = workers
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job-worker')
+        self._sweeper = threading.Thread(target=self._sweep_loop, name='job-sweeper', daemon=True)
+        self._sweeper.start()
+        logger.info(f"Job workers started ({self.workers} concurrent jobs)")
+
+    def run_worker(self, workers: Optional[int] = None):
+        """
+        Run jobs in the foreground until SIGTERM/SIGINT, then let the running jobs finish
+
+        Queued jobs not yet started stay queued for the next worker process.
+        """
+        def stop(signum, frame):
+            logger.info(f"Received signal {signum}, finishing running jobs")
+            self._stop.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.start(workers)
+        if self._executor is None:
+            raise click.ClickException('JOB_WORKERS must be at least 1 to run a job worker')
+        while not self._stop.wait(1.0):
+            pass
+        self.shutdown(wait=True)
+
+    def handler(self, job_type: str) -> Callable:
+        """
+        Register a job handler
+
+        The handler is called as handler(context, **params) inside an application
+        context and returns a JSON-serializable result; raising marks the job failed.
+        """
+        def decorator(func):
+            self._handlers[job_type] = func
+            return func
+        return decorator
+
+    def schedule(self, job_type: str, interval_config: str, default: int = 0):
+        """
+        Run a job type periodically, starting one interval after a worker first sees the schedule
+
+        Args:
+            job_type: Name of a registered handler; it is called without an owner (user_id None)
+            interval_config: App config key holding the interval in seconds (0 disables)
+            default: Interval used when the config key is not set
+        """
+        self._schedules[job_type] = (interval_config, default)
+
+    def enqueue(self, job_type: str, user_id: Optional[int] = None, **params):
+        """
+        Create a job for the worker process (or the local pool, when this process runs one)
+
+        Args:
+            job_type: Name of a registered handler
+            user_id: Owner of the job (only the owner can read it through /jobs)
+            **params: JSON-serializable keyword arguments for the handler
+
+        Returns:
+            The committed Job row
+        """
+        from ..models import db, Job
+
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        job = Job(job_type=job_type, user_id=user_id, params=params, status='queued')
+        db.session.add(job)
+        db.session.commit()
+        self._submit(job.id)
+        logger.info(f"Enqueued {job_type} job {job.id}")
+        return job
+
+    def _submit(self, job_id: int):
+        if self._executor is None:
+            return  # No local workers; another process's sweeper will pick the job up
+        with self._lock:
+            if job_id in self._submitted:
+                return
+            self._submitted.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def _update_job(self, job_id: int, **values):
+        """Update a job row on a separate connection, outside any handler transaction"""
+        from ..models import db, Job
+
+        with db.engine.begin() as conn:
+            conn.execute(update(Job.__table__).where(Job.__table__.c.id == job_id).values(**values))
+
+    def _claim(self, job_id: int) -> bool:
+        """Atomically move a job from queued to running; False if someone else got it"""
+        from ..models import db, Job
+
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(Job.__table__)
+                .where(Job.__table__.c.id == job_id, Job.__table__.c.status == 'queued')
+                .values(status='running', started_at=now, heartbeat_at=now)
+            ).rowcount
+        return claimed == 1
+
+    def _run(self, job_id: int):
+        with self._app.app_context():
+            from ..models import db, Job
+
+            try:
+                if not self._claim(job_id):
+                    return
+                with self._lock:
+                    self._running.add(job_id)
+
+                job = db.session.get(Job, job_id)
+                handler = self._handlers.get(job.job_type)
+                if handler is None:
+                    raise ValueError(f"No handler registered for job type '{job.job_type}'")
+
+                started = time.perf_counter()
+                logger.info(f"Running {job.job_type} job {job_id}")
+                result = handler(JobContext(self, job_id), **(job.params or {}))
+                db.session.rollback()  # Discard anything the handler left uncommitted
+                self._update_job(job_id, status='succeeded', result=result,
+                                 finished_at=datetime.utcnow(), heartbeat_at=datetime.utcnow())
+                logger.info(f"Job {job_id} succeeded in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Job {job_id} failed: {e}")
+                self._update_job(job_id, status='failed', error=str(e),
+                                 finished_at=datetime.utcnow(), heartbeat_at=datetime.utcnow())
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+                    self._submitted.discard(job_id)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with self._app.app_context():
+                    self._sweep()
+            except Exception as e:
+                logger.warning(f"Job sweeper error: {e}")
+
+    def _sweep(self):
+        """Heartbeat local jobs, fail jobs whose worker died and pick up unclaimed queued jobs"""
+        from ..models import db, Job
+
+        table = Job.__table__
+        now = datetime.utcnow()
+        with self._lock:
+            running = list(self._running)
+            backlog = len(self._submitted) - len(running)
+
+        with db.engine.begin() as conn:
+            if running:
+                conn.execute(update(table).where(table.c.id.in_(running)).values(heartbeat_at=now))
+
+            stale = conn.execute(
+                update(table)
+                .where(table.c.status == 'running', table.c.heartbeat_at < now - timedelta(seconds=self.stale_after))
+                .values(status='failed', error='Job worker stopped before the job finished', finished_at=now)
+            ).rowcount
+            if stale:
+                logger.warning(f"Marked {stale} stale job(s) as failed")
+
+            # Only take on as much as this worker can start soon
+            free_slots = self.workers - len(running) - max(backlog, 0)
+            queued = []
+            if free_slots > 0:
+                queued = [row.id for row in conn.execute(
+                    table.select().with_only_columns(table.c.id)
+                    .where(table.c.status == 'queued')
+                    .order_by(table.c.id)
+                    .limit(free_slots)
+                )]
+
+        for job_id in queued:
+            self._submit(job_id)
+
+        self._enqueue_scheduled()
+
+    def _enqueue_scheduled(self):
+        """
+        Enqueue scheduled jobs that are due
+
+        Due times are kept in the job_schedule table and computed from the database clock
+        only, so clock or time zone skew between app and database hosts cannot shift them.
+        A job type is first due one interval after a worker first sees its schedule, not
+        on the first boot of a deployment.
+        """
+        from ..models import db, Job, JobSchedule
+        from .concurrency import advisory_lock
+
+        if not self._schedules:
+            return
+        # Naive wall time in the session time zone, as now() defaults store it in timestamp columns
+        now = db.session.scalar(select(func.now())).replace(tzinfo=None)
+
+        for job_type, (interval_config, default) in self._schedules.items():
+            interval = self._app.config.get(interval_config, default)
+            if not interval:
+                continue
+            period = timedelta(seconds=interval)
+            # One worker decides per job type, so concurrent sweepers cannot both enqueue it
+            with advisory_lock('job-schedule', job_type, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                schedule = JobSchedule.query.filter_by(job_type=job_type).first()
+                if schedule is None:
+                    db.session.add(JobSchedule(job_type=job_type, next_run_at=now + period))
+                    db.session.commit()
+                    continue
+                if schedule.next_run_at <= now:
+                    schedule.next_run_at = now + period
+                    active = db.session.query(Job.id).filter(
+                        Job.job_type == job_type,
+                        Job.user_id.is_(None),
+                        Job.status.in_(('queued', 'running'))
+                    ).first()
+                    db.session.commit()
+                    if active is None:
+                        self.enqueue(job_type)
+                elif schedule.next_run_at > now + period:
+                    # A shortened interval takes effect without waiting out the old one
+                    schedule.next_run_at = now + period
+                    db.session.commit()
+                else:
+                    db.session.rollback()
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stop the sweeper and the worker pool
+
+        Jobs submitted but not yet claimed are cancelled and stay queued; with wait=True
+        this blocks until the jobs already running have finished.
+        """
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            with self._lock:
+                self._submitted.clear()
+
+# Singleton instance, bound to the application in create_app()
+job_queue = JobQueue()
+
+jobs_cli = AppGroup('jobs', help='Background job commands')
+
+@jobs_cli.command('worker')
+@click.option('--workers', type=int, default=None, help='Jobs run concurrently (default: JOB_WORKERS)')
+def run_job_worker(workers):
+    """Run queued and scheduled background jobs until stopped"""
+    job_queue.run_worker(workers)
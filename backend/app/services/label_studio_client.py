@@ -0,0 +1,355 @@
+"""
+Label Studio HTTP Client
+Pooled, in-process HTTP client used for every call the backend makes to the Label Studio API
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .endpoint_resolver import endpoint_resolver
+
+logger = logging.getLogger(__name__)
+
+# Page size for list endpoints; keeps every response (and the memory it takes) bounded
+DEFAULT_PAGE_SIZE = 100
+
+# Tasks deleted per Data Manager action request
+DEFAULT_DELETE_BATCH_SIZE = 500
+
+class LabelStudioError(Exception):
+    """Raised by the paginated iterators when Label Studio does not return a page"""
+
+    def __init__(self, message: str, status_code: int = 0):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LabelStudioClient:
+    def __init__(self,
+                 pool_connections: int = 4,
+                 pool_maxsize: int = 16,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 default_timeout: float = 30):
+        """
+        Initialize the client
+
+        Sessions are created lazily, one per Label Studio base URL, so that keep-alive
+        connections are reused across requests instead of paying a new TCP handshake
+        (and previously a curl fork+exec) for every API call.
+
+        Args:
+            pool_connections: Number of connection pools cached per session
+            pool_maxsize: Maximum number of keep-alive connections per pool
+            max_retries: Retries for connection errors and idempotent requests
+            backoff_factor: Exponential backoff factor between retries
+            default_timeout: Timeout in seconds used when a call does not specify one
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.default_timeout = default_timeout
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        """Create a session with a pooled adapter and retry policy"""
+        # Only idempotent methods are retried on 5xx; POST is retried on connect errors only
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _get_session(self, url: str) -> requests.Session:
+        """Return the keep-alive session for the base URL of the given request URL"""
+        parts = urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+
+        session = self._sessions.get(base_url)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(base_url)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[base_url] = session
+                    logger.info(f"Opened Label Studio connection pool for {base_url}")
+        return session
+
+    def request(self,
+                method: str,
+                url: str,
+                headers: Optional[dict] = None,
+                data=None,
+                timeout: Optional[float] = None) -> dict:
+        """
+        Execute a request against the Label Studio API
+
+        Args:
+            method: HTTP method
+            url: Full request URL
+            headers: Optional request headers
+            data: Optional body; dicts and lists are sent as JSON
+            timeout: Timeout in seconds (defaults to the client default)
+
+        Returns:
+            Dictionary with status_code, text, success and json keys. success is True
+            whenever an HTTP response was received, callers check status_code themselves.
+        """
+        method = method.upper()
+        kwargs = {
+            'headers': headers,
+            'timeout': timeout or self.default_timeout
+        }
+        if data is not None and method in ['POST', 'PUT', 'PATCH']:
+            if isinstance(data, (dict, list)):
+                kwargs['json'] = data
+            else:
+                kwargs['data'] = data
+
+        try:
+            response = self._get_session(url).request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            # The cached gateway may be stale (container restarted, network changed); this also
+            # catches ConnectTimeout, which is a Timeout too, so an unreachable host is re-resolved
+            logger.error(f"Label Studio connection failed: {method} {url}: {str(e)}")
+            endpoint_resolver.invalidate()
+            return {
+                'status_code': 0,
+                'text': f'Request failed: {str(e)}',
+                'success': False,
+                'json': {}
+            }
+        except requests.Timeout:
+            logger.warning(f"Label Studio request timed out: {method} {url}")
+            return {
+                'status_code': 0,
+                'text': 'Request timeout',
+                'success': False,
+                'json': {}
+            }
+        except requests.RequestException as e:
+            logger.error(f"Label Studio request failed: {method} {url}: {str(e)}")
+            return {
+                'status_code': 0,
+                'text': f'Request failed: {str(e)}',
+                'success': False,
+                'json': {}
+            }
+
+        response_data = {
+            'status_code': response.status_code,
+            'text': response.text,
+            'success': True,
+            'json': {}
+        }
+
+        if response_data['text']:
+            try:
+                response_data['json'] = response.json()
+            except (ValueError, json.JSONDecodeError):
+                logger.warning(f"Failed to parse JSON response from {method} {url}")
+
+        logger.debug(f"{method} {url} -> {response.status_code} ({len(response.content)} bytes)")
+        return response_data
+
+    @contextmanager
+    def stream(self,
+               method: str,
+               url: str,
+               headers: Optional[dict] = None,
+               timeout: Optional[float] = None):
+        """
+        Open a streaming response without buffering the body
+
+        The connection is returned to the pool when the context exits.
+
+        Usage:
+            with label_studio_client.stream('GET', url, headers) as response:
+                for chunk in response.iter_content(64 * 1024):
+                    ...
+        """
+        response = self._get_session(url).request(
+            method.upper(),
+            url,
+            headers=headers,
+            timeout=timeout or self.default_timeout,
+            stream=True
+        )
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def iter_pages(self,
+                   url: str,
+                   headers: Optional[dict] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE,
+                   timeout: Optional[float] = None) -> Iterator[Tuple[List[dict], Optional[int]]]:
+        """
+        Lazily fetch a list endpoint page by page
+
+        Label Studio answers list endpoints either with a paginated object
+        ({"count", "next", "results"}, e.g. /api/projects/) or with a bare list
+        (e.g. /api/projects/<id>/tasks/); both are handled. The next page is only
+        requested once the caller has consumed the current one, so breaking out of
+        the loop stops fetching.
+
+        Args:
+            url: Full URL of the list endpoint, without pagination parameters
+            headers: Optional request headers
+            page_size: Items requested per page
+            timeout: Timeout in seconds per page
+
+        Yields:
+            Tuples of (items, total) where total is the server-reported count, if any
+
+        Raises:
+            LabelStudioError: If a page cannot be fetched
+        """
+        separator = '&' if '?' in url else '?'
+        page = 1
+        previous_ids = None
+        while True:
+            response = self.request('GET', f'{url}{separator}page={page}&page_size={page_size}',
+                                    headers=headers, timeout=timeout)
+            if response['status_code'] == 404 and page > 1:
+                return  # Past the last page
+            if not response['success'] or response['status_code'] != 200:
+                raise LabelStudioError(response['text'] or f"HTTP {response['status_code']}", response['status_code'])
+
+            data = response['json']
+            if isinstance(data, dict) and isinstance(data.get('results'), list):
+                items, total, has_next = data['results'], data.get('count'), bool(data.get('next'))
+            elif isinstance(data, dict) and isinstance(data.get('tasks'), list):
+                items, total, has_next = data['tasks'], data.get('total'), len(data['tasks']) >= page_size
+            elif isinstance(data, list):
+                items, total, has_next = data, None, len(data) >= page_size
+            else:
+                raise LabelStudioError(f'Unexpected response format from {url}', response['status_code'])
+
+            # Servers that ignore pagination return the same full list for every page
+            ids = [item.get('id') for item in items if isinstance(item, dict)]
+            if ids and ids == previous_ids:
+                return
+            previous_ids = ids
+
+            if items:
+                yield items, total
+            if not items or not has_next:
+                return
+            page += 1
+
+    def iter_projects(self, base_url: str, headers: Optional[dict] = None,
+                      page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+        """Lazily iterate over all projects of a Label Studio instance"""
+        for items, _ in self.iter_pages(f'{base_url}/api/projects/', headers, page_size):
+            for project in items:
+                if isinstance(project, dict):
+                    yield project
+
+    def iter_tasks(self, base_url: str, project_id, headers: Optional[dict] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[dict]:
+        """Lazily iterate over all tasks of a project"""
+        for items, _ in self.iter_pages(f'{base_url}/api/projects/{project_id}/tasks/', headers, page_size):
+            for task in items:
+                if isinstance(task, dict):
+                    yield task
+
+    def find_project(self, base_url: str, title: str, headers: Optional[dict] = None,
+                     page_size: int = DEFAULT_PAGE_SIZE) -> Optional[dict]:
+        """Return the first project with the given title, fetching only as many pages as needed"""
+        for project in self.iter_projects(base_url, headers, page_size):
+            if project.get('title') == title:
+                return project
+        return None
+
+    def get_project(self, base_url: str, project_id, headers: Optional[dict] = None) -> Optional[dict]:
+        """
+        Fetch a single project
+
+        Returns:
+            The project, or None if it no longer exists
+
+        Raises:
+            LabelStudioError: If Label Studio cannot be reached or answers with an error
+        """
+        response = self.request('GET', f'{base_url}/api/projects/{project_id}/', headers=headers)
+        if response['status_code'] == 404:
+            return None
+        if not response['success'] or response['status_code'] != 200 or not isinstance(response['json'], dict):
+            raise LabelStudioError(response['text'] or f"HTTP {response['status_code']}", response['status_code'])
+        return response['json']
+
+    def delete_tasks(self, base_url: str, project_id, task_ids: List[int], headers: Optional[dict] = None,
+                     batch_size: int = DEFAULT_DELETE_BATCH_SIZE) -> List[int]:
+        """
+        Delete tasks of a project in batches
+
+        Each batch is a single Data Manager delete_tasks action; batches the action
+        rejects (e.g. older Label Studio versions) fall back to one DELETE per task.
+
+        Args:
+            base_url: Label Studio base URL
+            project_id: Project the tasks belong to
+            task_ids: Ids of the tasks to delete
+            headers: Optional request headers
+            batch_size: Tasks deleted per request
+
+        Returns:
+            Ids of the tasks that were deleted (or were already gone)
+        """
+        deleted = []
+        for start in range(0, len(task_ids), batch_size):
+            batch = task_ids[start:start + batch_size]
+            response = self.request(
+                'POST',
+                f'{base_url}/api/dm/actions?id=delete_tasks&project={project_id}',
+                headers=headers,
+                data={'selectedItems': {'all': False, 'included': batch}}
+            )
+            if response['success'] and 200 <= response['status_code'] < 300:
+                deleted.extend(batch)
+                continue
+
+            logger.warning(f"Bulk task delete failed for project {project_id} (HTTP {response['status_code']}), "
+                           f"deleting {len(batch)} tasks one by one")
+            for task_id in batch:
+                response = self.request('DELETE', f'{base_url}/api/tasks/{task_id}/', headers=headers)
+                if response['success'] and (200 <= response['status_code'] < 300 or response['status_code'] == 404):
+                    deleted.append(task_id)
+        return deleted
+
+    def close(self):
+        """Close all pooled sessions"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+# Singleton instance
+label_studio_client = LabelStudioClient()
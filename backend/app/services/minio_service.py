@@ -3,189 +3,408 @@ MinIO Object Storage Service
 Handles all interactions with MinIO for storing and retrieving captured images
 """
 
-import os
+import io
 import uuid
+import time
 import hashlib
-from datetime import datetime, timedelta
-from typing import Optional, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
 from minio import Minio
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from werkzeug.datastructures import FileStorage
 import logging
 
+from .endpoint_resolver import endpoint_resolver
+
 logger = logging.getLogger(__name__)
 
+# Chunk size used when piping objects from MinIO to clients
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Keys per multi-object delete request (the S3 maximum)
+DELETE_BATCH_SIZE = 1000
+
+# Part size for uploads of unknown length; the MinIO client buffers one part at a time,
+# so this bounds the memory an upload takes regardless of the object size
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
+# Streaming hashes for image checksums; the algorithm is stored per image. BLAKE2b is
+# truncated to 32 bytes so its hex digest fits the 64-character checksum column
+CHECKSUM_ALGORITHMS = {
+    'blake2b': lambda: hashlib.blake2b(digest_size=32),
+    'sha256': hashlib.sha256,
+    'md5': hashlib.md5,
+}
+DEFAULT_CHECKSUM_ALGORITHM = 'blake2b'
+
+# Images stored before the algorithm was recorded were hashed with MD5
+LEGACY_CHECKSUM_ALGORITHM = 'md5'
+
+def new_hasher(algorithm: str):
+    """Create a hashlib object for a checksum algorithm name"""
+    try:
+        return CHECKSUM_ALGORITHMS[algorithm]()
+    except KeyError:
+        raise ValueError(f"Unsupported checksum algorithm '{algorithm}', use one of {', '.join(CHECKSUM_ALGORITHMS)}")
+
+class HashingReader:
+    """
+    Read-through wrapper that hashes and counts the bytes put_object pulls from a stream
+    
+    The checksum and size are computed in the same single pass that sends the data,
+    instead of reading the whole upload into memory first.
+    """
+
+    def __init__(self, stream, algorithm: str = DEFAULT_CHECKSUM_ALGORITHM):
+        self._stream = stream
+        self.algorithm = algorithm
+        self.hasher = new_hasher(algorithm)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data:
+            self.hasher.update(data)
+            self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+def stream_length(stream) -> Optional[int]:
+    """Bytes left in a seekable stream without reading it, or None if the stream cannot seek"""
+    try:
+        if not stream.seekable():
+            return None
+        position = stream.tell()
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+# Cached presigned URLs are re-signed once per window of this fraction of their lifetime,
+# so a URL handed out from the cache is always valid for at least 90% of the requested expiry
+PRESIGN_WINDOW_FRACTION = 0.1
+
+class PresignedUrlCache:
+    """
+    Thread-safe LRU cache of presigned URLs with TTL-aware eviction
+    
+    Entries are keyed by (endpoint, object key, expiry, signing window) and expire at the
+    end of their window; expired entries are dropped on access and purged before any
+    live entry is evicted for space.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (url, expires_at epoch seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, url: str, expires_at: float, now: float):
+        with self._lock:
+            self._entries[key] = (url, expires_at)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._purge_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _purge_expired(self, now: float):
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class ObjectStream:
+    """
+    Iterable over the chunks of a MinIO object response
+    
+    The WSGI server calls close() once the response is finished or the client disconnects,
+    which always returns the underlying connection to the pool - even if iteration never started.
+    """
+    
+    def __init__(self, response, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._response = response
+        self._chunk_size = chunk_size
+        self._closed = False
+    
+    def __iter__(self):
+        try:
+            for chunk in self._response.stream(self._chunk_size):
+                yield chunk
+        finally:
+            self.close()
+    
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._response.close()
+            self._response.release_conn()
+
+class StorageUnavailableError(ConnectionError):
+    """Raised without contacting MinIO while a failed bucket check is cooling down"""
+
 class MinIOService:
-    def __init__(self):
-        """Initialize MinIO client with configuration from environment variables"""
-        self.endpoint = os.getenv('MINIO_ENDPOINT', 'qc-minio:9000')
-        self.external_endpoint = os.getenv('MINIO_EXTERNAL_ENDPOINT', 'localhost:9000')
-        self.access_key = os.getenv('MINIO_ACCESS_KEY', 'minio')
-        self.secret_key = os.getenv('MINIO_SECRET_KEY', 'minio123')
-        self.bucket_name = os.getenv('MINIO_BUCKET_NAME', 'quality-control-images')
-        self.secure = os.getenv('MINIO_SECURE', 'False').lower() == 'true'
-        
-        # Initialize MinIO client for internal operations (uploads, deletes, etc.)
-        self.client = Minio(
-            self.endpoint,
-            access_key=self.access_key,
-            secret_key=self.secret_key,
-            secure=False  # Set to True if using HTTPS
-        )
+    def __init__(self, app=None):
+        """
+        Create the service without touching the network
         
-        # For Label Studio integration, we need to use an endpoint accessible from within Docker network
-        # We'll use the Docker gateway IP to make MinIO accessible to Label Studio
-        self.label_studio_endpoint = self._get_minio_endpoint_for_label_studio()
+        Configuration is read from app.config in init_app; the MinIO client is built and the
+        bucket is checked on first use, so importing this module (CLI, `flask db`, tests) is free.
+        """
+        self.endpoint = None
+        self.external_endpoint = None
+        self.access_key = None
+        self.secret_key = None
+        self.bucket_name = None
+        self.secure = False
+        self.bucket_check_backoff = 0.5
+        self.bucket_check_max_backoff = 30.0
         
-        # Initialize separate MinIO client for presigned URL generation with gateway endpoint
-        self.external_client = Minio(
-            self.label_studio_endpoint,
-            access_key=self.access_key,
-            secret_key=self.secret_key,
-            secure=False  # Set to True if using HTTPS
-        )
+        self._client = None
+        self._bucket_ready = False
+        self._bucket_failures = 0
+        self._bucket_retry_at = 0.0
+        self._bucket_error = None
+        self._lock = threading.Lock()
+        
+        # Separate client for presigned URL generation, built lazily against the gateway endpoint
+        self._external_client = None
+        self._external_client_endpoint = None
+        
+        self.presign_cache = PresignedUrlCache()
+        self.presign_concurrency = 4
+        self.checksum_algorithm = DEFAULT_CHECKSUM_ALGORITHM
         
-        # Ensure bucket exists
-        self._ensure_bucket_exists()
+        if app is not None:
+            self.init_app(app)
     
-    def _get_minio_endpoint_for_label_studio(self):
-        """Get MinIO endpoint accessible by Label Studio container"""
+    def init_app(self, app):
+        """Bind the service to an application and read its MinIO configuration"""
+        self.endpoint = app.config['MINIO_ENDPOINT']
+        self.external_endpoint = app.config.get('MINIO_EXTERNAL_ENDPOINT', 'localhost:9000')
+        self.access_key = app.config['MINIO_ACCESS_KEY']
+        self.secret_key = app.config['MINIO_SECRET_KEY']
+        self.bucket_name = app.config['MINIO_BUCKET_NAME']
+        self.secure = app.config.get('MINIO_SECURE', False)
+        self.bucket_check_backoff = app.config.get('MINIO_BUCKET_CHECK_BACKOFF', self.bucket_check_backoff)
+        self.bucket_check_max_backoff = app.config.get('MINIO_BUCKET_CHECK_MAX_BACKOFF', self.bucket_check_max_backoff)
+        
+        # Re-binding (e.g. a second app in tests) starts from a clean state
+        self._client = None
+        self._bucket_ready = False
+        self._bucket_failures = 0
+        self._bucket_retry_at = 0.0
+        self._bucket_error = None
+        self._external_client = None
+        self._external_client_endpoint = None
+        
+        self.presign_cache = PresignedUrlCache(app.config.get('PRESIGN_CACHE_SIZE', 50000))
+        self.presign_concurrency = app.config.get('PRESIGN_CONCURRENCY', self.presign_concurrency)
+        
+        self.checksum_algorithm = app.config.get('CHECKSUM_ALGORITHM', self.checksum_algorithm)
+        new_hasher(self.checksum_algorithm)  # Fail at startup on an unknown algorithm
+        
+        app.extensions['minio_service'] = self
+    
+    @property
+    def client(self) -> Minio:
+        """
+        MinIO client for internal operations (uploads, deletes, etc.), created and checked on first use
+        
+        The bucket check is a single attempt. After a failure, callers fail fast with
+        StorageUnavailableError until an exponentially growing cooldown has passed, and
+        only one caller at a time re-checks; nobody sleeps or queues behind retries.
+        
+        Raises:
+            StorageUnavailableError: If the bucket check failed recently or another caller is re-checking it
+        """
+        if self._bucket_ready:
+            return self._client
+        
+        # Wait for the first check on a cold start; once a check has failed, never queue behind one
+        if not self._lock.acquire(blocking=self._bucket_failures == 0):
+            self._raise_unavailable()
         try:
-            # Method 1: Try to get gateway from route table
-            import subprocess
-            import socket
-            
-            try:
-                result = subprocess.run(['ip', 'route', 'show', 'default'], 
-                                      capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if 'default' in line:
-                            parts = line.split()
-                            if 'via' in parts:
-                                gateway_idx = parts.index('via') + 1
-                                if gateway_idx < len(parts):
-                                    gateway_ip = parts[gateway_idx]
-                                    logger.info(f"Using gateway IP for MinIO access: {gateway_ip}:9000")
-                                    return f"{gateway_ip}:9000"
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError, FileNotFoundError):
-                pass
-            
-            # Method 2: Try to get gateway from /proc/net/route
-            try:
-                with open('/proc/net/route', 'r') as f:
-                    for line in f:
-                        fields = line.strip().split()
-                        if len(fields) >= 3 and fields[1] == '00000000':  # Default route
-                            gateway_hex = fields[2]
-                            # Convert hex to IP (little-endian)
-                            gateway_ip = socket.inet_ntoa(bytes.fromhex(gateway_hex)[::-1])
-                            logger.info(f"Using gateway IP from /proc/net/route: {gateway_ip}:9000")
-                            return f"{gateway_ip}:9000"
-            except (FileNotFoundError, ValueError):
-                pass
-            
-            # Fallback: Use localhost (might work in some setups)
-            logger.warning("Could not determine gateway IP, falling back to localhost:9000")
-            return "localhost:9000"
-            
+            if self._client is None:
+                if self.endpoint is None:
+                    raise RuntimeError("MinIOService is not initialised; call init_app(app) first")
+                self._client = Minio(
+                    self.endpoint,
+                    access_key=self.access_key,
+                    secret_key=self.secret_key,
+                    secure=self.secure
+                )
+            if not self._bucket_ready:
+                if time.monotonic() < self._bucket_retry_at:
+                    self._raise_unavailable()
+                self._check_bucket(self._client)
+        finally:
+            self._lock.release()
+        return self._client
+    
+    def _raise_unavailable(self):
+        retry_in = max(self._bucket_retry_at - time.monotonic(), 0.0)
+        raise StorageUnavailableError(
+            f"MinIO is unavailable (next check in {retry_in:.1f}s): {self._bucket_error}"
+        ) from self._bucket_error
+    
+    def _check_bucket(self, client: Minio):
+        """Run one bucket check; on failure, back off further before the next caller may retry"""
+        try:
+            self._ensure_bucket_exists(client)
         except Exception as e:
-            logger.error(f"Error determining MinIO endpoint for Label Studio: {str(e)}")
-            return "localhost:9000"
+            self._bucket_failures += 1
+            cooldown = min(self.bucket_check_backoff * 2 ** (self._bucket_failures - 1), self.bucket_check_max_backoff)
+            self._bucket_retry_at = time.monotonic() + cooldown
+            self._bucket_error = e
+            logger.warning(f"MinIO bucket check failed ({self._bucket_failures} in a row), "
+                           f"failing fast for {cooldown:.1f}s: {e}")
+            raise
+        if self._bucket_failures:
+            logger.info(f"MinIO reachable again after {self._bucket_failures} failed bucket check(s)")
+        self._bucket_failures = 0
+        self._bucket_error = None
+        self._bucket_ready = True
+    
+    @property
+    def label_studio_endpoint(self) -> str:
+        """MinIO endpoint accessible from within the Docker network (used by Label Studio)"""
+        return self._get_minio_endpoint_for_label_studio()
+    
+    @property
+    def external_client(self) -> Minio:
+        """MinIO client for presigned URLs, rebuilt whenever the resolved gateway endpoint changes"""
+        endpoint = self.label_studio_endpoint
+        if self._external_client is None or endpoint != self._external_client_endpoint:
+            self._external_client = Minio(
+                endpoint,
+                access_key=self.access_key,
+                secret_key=self.secret_key,
+                secure=self.secure
+            )
+            self._external_client_endpoint = endpoint
+        return self._external_client
     
+    def _get_minio_endpoint_for_label_studio(self):
+        """Get MinIO endpoint accessible by Label Studio container (cached by the endpoint resolver)"""
+        return endpoint_resolver.get_minio_endpoint()
     
-    def _ensure_bucket_exists(self):
+    def _ensure_bucket_exists(self, client: Minio):
         """Create bucket if it doesn't exist"""
         try:
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name)
+            if not client.bucket_exists(self.bucket_name):
+                client.make_bucket(self.bucket_name)
                 logger.info(f"Created bucket: {self.bucket_name}")
         except S3Error as e:
             logger.error(f"Error creating bucket: {e}")
             raise
     
+    @staticmethod
+    def _sanitize_name(name: str) -> str:
+        """Remove or replace characters that aren't safe for object keys"""
+        import re
+        # Replace spaces with underscores and remove special characters
+        sanitized = re.sub(r'[^a-zA-Z0-9_-]', '_', str(name))
+        # Remove multiple consecutive underscores
+        sanitized = re.sub(r'_+', '_', sanitized)
+        # Remove leading/trailing underscores
+        return sanitized.strip('_').lower()
+    
+    def object_key_prefix(self, company_name: str, product_name: str) -> str:
+        """Key prefix ("company/product/") under which a product's objects are stored"""
+        return f"{self._sanitize_name(company_name)}/{self._sanitize_name(product_name)}/"
+    
     def _generate_object_key(self, company_name: str, product_name: str, step_name: str, filename: str) -> str:
         """Generate a structured object key using meaningful names"""
-        # Sanitize names for filesystem safety
-        def sanitize_name(name: str) -> str:
-            """Remove or replace characters that aren't safe for object keys"""
-            import re
-            # Replace spaces with underscores and remove special characters
-            sanitized = re.sub(r'[^a-zA-Z0-9_-]', '_', str(name))
-            # Remove multiple consecutive underscores
-            sanitized = re.sub(r'_+', '_', sanitized)
-            # Remove leading/trailing underscores
-            return sanitized.strip('_').lower()
-        
-        company = sanitize_name(company_name)
-        product = sanitize_name(product_name)
-        step = sanitize_name(step_name)
+        step = self._sanitize_name(step_name)
         
         # Keep original filename but add unique prefix to avoid conflicts
         unique_id = str(uuid.uuid4())[:8]
         file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
         safe_filename = f"{unique_id}_{filename}" if filename else f"{unique_id}.{file_extension}"
         
-        return f"{company}/{product}/{step}/{safe_filename}"
-    
-    def _calculate_checksum(self, file_data: bytes) -> str:
-        """Calculate MD5 checksum for file integrity"""
-        return hashlib.md5(file_data).hexdigest()
+        return f"{self.object_key_prefix(company_name, product_name)}{step}/{safe_filename}"
     
     def upload_image(self, 
                     file: FileStorage, 
                     company_name: str,
                     product_name: str, 
-                    step_name: str) -> Tuple[str, dict]:
+                    step_name: str,
+                    filename: Optional[str] = None,
+                    content_type: Optional[str] = None,
+                    checksum: Optional[str] = None,
+                    checksum_algorithm: Optional[str] = None) -> Tuple[str, dict]:
         """
         Upload an image to MinIO using meaningful folder structure
         
+        The upload is streamed: its size and checksum (CHECKSUM_ALGORITHM) are computed while
+        put_object reads it, so every byte is read once and at most one part is held in memory. Werkzeug
+        spools large multipart files to disk, and streams that cannot seek (e.g. a raw
+        request body) are sent with unknown length as a multipart upload. A seekable
+        upload whose checksum the caller already computed is sent without hashing it again.
+        
         Args:
-            file: The uploaded file object
+            file: The uploaded file object (any readable file-like object when filename is given)
             company_name: Name of the company
             product_name: Name of the product
             step_name: Name of the step
+            filename: Original file name (default: file.filename)
+            content_type: MIME type (default: file.content_type, then image/jpeg)
+            checksum: Checksum of the remaining stream content, if already known
+            checksum_algorithm: Algorithm the given checksum was computed with (default: CHECKSUM_ALGORITHM)
             
         Returns:
             Tuple containing the object key and metadata dictionary
         """
         try:
-            # Read file data
-            file_data = file.read()
-            file.seek(0)  # Reset file pointer
-            
             # Generate object key with meaningful names
-            object_key = self._generate_object_key(company_name, product_name, step_name, file.filename)
+            filename = filename or file.filename
+            object_key = self._generate_object_key(company_name, product_name, step_name, filename)
+            mime_type = content_type or getattr(file, 'content_type', None) or 'image/jpeg'
             
-            # Calculate metadata
-            file_size = len(file_data)
-            checksum = self._calculate_checksum(file_data)
-            mime_type = file.content_type or 'image/jpeg'
+            # FileStorage wraps the spooled stream; hash while uploading unless the checksum is known
+            stream = getattr(file, 'stream', file)
+            length = stream_length(stream)
+            reader = None if checksum is not None and length is not None else HashingReader(stream, self.checksum_algorithm)
             
             # Upload to MinIO
             self.client.put_object(
                 bucket_name=self.bucket_name,
                 object_name=object_key,
-                data=file,
-                length=file_size,
-                content_type=mime_type
+                data=reader or stream,
+                length=length if length is not None else -1,
+                content_type=mime_type,
+                part_size=0 if length is not None else UPLOAD_PART_SIZE
             )
             
-            # Generate access URL
-            storage_url = f"http://{self.endpoint}/{self.bucket_name}/{object_key}"
+            if reader is None:
+                metadata = self.object_metadata(object_key, length, mime_type, checksum, checksum_algorithm or self.checksum_algorithm)
+            else:
+                metadata = self.object_metadata(object_key, reader.bytes_read, mime_type, reader.hexdigest(), reader.algorithm)
             
-            # Prepare metadata
-            metadata = {
-                'storage_url': storage_url,
-                'storage_bucket': self.bucket_name,
-                'storage_key': object_key,
-                'file_size': file_size,
-                'mime_type': mime_type,
-                'checksum': checksum,
-                'storage_provider': 'minio'
-            }
-            
-            logger.info(f"Successfully uploaded image: {object_key}")
+            logger.info(f"Successfully uploaded image: {object_key} ({metadata['file_size']} bytes)")
             return object_key, metadata
             
         except S3Error as e:
@@ -195,10 +414,153 @@ class MinIOService:
             logger.error(f"Unexpected error uploading image: {e}")
             raise
     
+    def object_metadata(self, object_key: str, file_size: int, mime_type: str, checksum: str, checksum_algorithm: str) -> dict:
+        """Build the CapturedImage storage fields for an object in the bucket"""
+        return {
+            'storage_url': f"http://{self.endpoint}/{self.bucket_name}/{object_key}",
+            'storage_bucket': self.bucket_name,
+            'storage_key': object_key,
+            'file_size': file_size,
+            'mime_type': mime_type,
+            'checksum': checksum,
+            'checksum_algorithm': checksum_algorithm,
+            'storage_provider': 'minio'
+        }
+    
+    def upload_file(self, object_key: str, data, length: int, content_type: str = 'application/octet-stream') -> str:
+        """
+        Upload an arbitrary file-like object (e.g. a job artefact) under an explicit key
+        
+        Args:
+            object_key: The object key in MinIO
+            data: Readable file-like object positioned at the start
+            length: Number of bytes to upload
+            content_type: MIME type stored with the object
+            
+        Returns:
+            The object key
+        """
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_key,
+            data=data,
+            length=length,
+            content_type=content_type
+        )
+        logger.info(f"Successfully uploaded file: {object_key} ({length} bytes)")
+        return object_key
+    
+    def stat_image(self, object_key: str):
+        """
+        Get object metadata (size, etag, last_modified, content_type) without reading the body
+        
+        Args:
+            object_key: The object key in MinIO
+            
+        Returns:
+            MinIO object stat result
+        """
+        return self.client.stat_object(self.bucket_name, object_key)
+    
+    def open_image_stream(self,
+                          object_key: str,
+                          offset: int = 0,
+                          length: Optional[int] = None,
+                          chunk_size: int = STREAM_CHUNK_SIZE) -> 'ObjectStream':
+        """
+        Open a streaming read of an object (or a byte range of it)
+        
+        Args:
+            object_key: The object key in MinIO
+            offset: Start byte of the range to read
+            length: Number of bytes to read (default: until the end of the object)
+            chunk_size: Size of the chunks yielded while streaming
+            
+        Returns:
+            ObjectStream iterable that releases the pooled connection when closed
+        """
+        response = self.client.get_object(
+            self.bucket_name,
+            object_key,
+            offset=offset,
+            length=length or 0
+        )
+        return ObjectStream(response, chunk_size)
+    
+    def read_image(self, object_key: str) -> bytes:
+        """
+        Read a whole object into memory, always releasing the pooled connection
+        
+        Args:
+            object_key: The object key in MinIO
+            
+        Returns:
+            Object data
+        """
+        response = self.client.get_object(self.bucket_name, object_key)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def hash_object(self,
+                    object_key: str,
+                    algorithm: str,
+                    throttle: Optional[Callable[[int], None]] = None,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Optional[Tuple[str, int]]:
+        """
+        Re-hash a stored object by streaming it, without holding it in memory
+        
+        Args:
+            object_key: The object key in MinIO
+            algorithm: Checksum algorithm name (see CHECKSUM_ALGORITHMS)
+            throttle: Called with the size of every chunk read, e.g. to rate-limit the reads
+            chunk_size: Size of the chunks read from MinIO
+            
+        Returns:
+            Tuple of hex digest and size in bytes, or None if the object does not exist
+        """
+        hasher = new_hasher(algorithm)
+        size = 0
+        try:
+            stream = self.open_image_stream(object_key, chunk_size=chunk_size)
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'NoSuchObject'):
+                return None
+            raise
+        try:
+            for chunk in stream:
+                hasher.update(chunk)
+                size += len(chunk)
+                if throttle is not None:
+                    throttle(len(chunk))
+        finally:
+            stream.close()
+        return hasher.hexdigest(), size
+    
+    def _presign_window(self, expires: int, now: float) -> Tuple[int, int]:
+        """Return (window start, window length) of the signing window containing now"""
+        window = max(1, min(int(expires * PRESIGN_WINDOW_FRACTION), 3600))
+        return int(now // window) * window, window
+    
+    def _sign(self, client: Minio, object_key: str, expires: int, window_start: int) -> str:
+        # Signing with the window start as request date makes the URL identical for the whole window
+        return client.presigned_get_object(
+            bucket_name=self.bucket_name,
+            object_name=object_key,
+            expires=timedelta(seconds=expires),
+            request_date=datetime.fromtimestamp(window_start, timezone.utc)
+        )
+    
     def get_presigned_url(self, object_key: str, expires: int = 3600) -> str:
         """
         Generate a presigned URL for accessing an object using Label Studio accessible endpoint
         
+        URLs are cached per signing window (a tenth of the expiry, at most an hour), so
+        repeated calls for the same object return the same URL, which stays valid for at
+        least 90% of the requested expiry.
+        
         Args:
             object_key: The object key in MinIO
             expires: URL expiration time in seconds (default: 1 hour)
@@ -206,19 +568,80 @@ class MinIOService:
         Returns:
             Presigned URL string with gateway endpoint for Label Studio access
         """
-        try:
-            # Use external client to generate presigned URLs with correct hostname
-            url = self.external_client.presigned_get_object(
-                bucket_name=self.bucket_name,
-                object_name=object_key,
-                expires=timedelta(seconds=expires)
-            )
-            
-            logger.info(f"Generated presigned URL with Label Studio endpoint: {self.label_studio_endpoint}")
+        now = time.time()
+        client = self.external_client
+        window_start, window = self._presign_window(expires, now)
+        cache_key = (self._external_client_endpoint, object_key, expires, window_start)
+        
+        url = self.presign_cache.get(cache_key, now)
+        if url is not None:
             return url
+        
+        try:
+            url = self._sign(client, object_key, expires, window_start)
         except S3Error as e:
             logger.error(f"Error generating presigned URL: {e}")
             raise
+        
+        self.presign_cache.put(cache_key, url, window_start + window, now)
+        logger.debug(f"Generated presigned URL for {object_key} with endpoint {self._external_client_endpoint}")
+        return url
+    
+    def presign_many(self, object_keys: Iterable[str], expires: int = 3600, concurrency: Optional[int] = None) -> Dict[str, str]:
+        """
+        Generate presigned URLs for many objects at once
+        
+        Cached URLs are returned directly; the rest are signed (in parallel when there are
+        enough of them) and added to the cache. Keys that fail to sign are left out of the
+        result and logged, so callers can report them per item.
+        
+        Args:
+            object_keys: Object keys in MinIO (duplicates are signed once)
+            expires: URL expiration time in seconds (default: 1 hour)
+            concurrency: Signing threads (default: PRESIGN_CONCURRENCY)
+            
+        Returns:
+            Dict mapping each successfully signed object key to its URL
+        """
+        now = time.time()
+        client = self.external_client
+        endpoint = self._external_client_endpoint
+        window_start, window = self._presign_window(expires, now)
+        
+        urls = {}
+        missing = []
+        cached = 0
+        for object_key in dict.fromkeys(object_keys):
+            url = self.presign_cache.get((endpoint, object_key, expires, window_start), now)
+            if url is None:
+                missing.append(object_key)
+            else:
+                urls[object_key] = url
+                cached += 1
+        
+        def sign(object_key):
+            try:
+                return object_key, self._sign(client, object_key, expires, window_start)
+            except Exception as e:
+                logger.error(f"Error generating presigned URL for {object_key}: {e}")
+                return object_key, None
+        
+        # Signing is mostly CPU-bound HMAC work, so threads only pay off for larger batches
+        concurrency = self.presign_concurrency if concurrency is None else concurrency
+        if concurrency > 1 and len(missing) >= 64:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='presign') as pool:
+                signed = list(pool.map(sign, missing))
+        else:
+            signed = [sign(object_key) for object_key in missing]
+        
+        for object_key, url in signed:
+            if url is not None:
+                urls[object_key] = url
+                self.presign_cache.put((endpoint, object_key, expires, window_start), url, window_start + window, now)
+        
+        logger.debug(f"Presigned {len(urls)} URLs ({cached} cached, {len(urls) - cached} signed, "
+                     f"{len(missing) - (len(urls) - cached)} failed)")
+        return urls
     
     def delete_image(self, object_key: str) -> bool:
         """
@@ -241,6 +664,43 @@ class MinIOService:
             logger.error(f"Error deleting image: {e}")
             return False
     
+    def delete_images(self, object_keys: Iterable[str], batch_size: int = DELETE_BATCH_SIZE) -> dict:
+        """
+        Delete many objects with one multi-object delete request per batch
+        
+        Errors are collected per object instead of aborting: objects the server refused
+        to delete are reported individually, and when a whole request fails every key of
+        that batch is reported and the remaining batches are still attempted. Keys that
+        do not exist count as deleted.
+        
+        Args:
+            object_keys: Object keys to delete (duplicates and empty keys are ignored)
+            batch_size: Keys per request (S3 allows at most 1000)
+            
+        Returns:
+            Dict with the number of 'deleted' objects and a list of 'errors'
+            ({'object_key', 'code', 'message'}) for objects that are still stored
+        """
+        keys = list(dict.fromkeys(key for key in object_keys if key))
+        errors = []
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            try:
+                # remove_objects is lazy; the request is only sent while its errors are consumed
+                for error in self.client.remove_objects(self.bucket_name, [DeleteObject(key) for key in batch]):
+                    errors.append({'object_key': error.name, 'code': error.code, 'message': error.message})
+            except Exception as e:
+                logger.error(f"Bulk delete of {len(batch)} objects failed: {e}")
+                code = e.code if isinstance(e, S3Error) else type(e).__name__
+                errors.extend({'object_key': key, 'code': code, 'message': str(e)} for key in batch)
+        
+        if errors:
+            logger.warning(f"Deleted {len(keys) - len(errors)} of {len(keys)} objects; "
+                           f"{len(errors)} failed (first: {errors[0]['object_key']}: {errors[0]['code']})")
+        elif keys:
+            logger.info(f"Deleted {len(keys)} objects in {(len(keys) + batch_size - 1) // batch_size} request(s)")
+        return {'deleted': len(keys) - len(errors), 'errors': errors}
+    
     def list_images(self, prefix: str = "") -> list:
         """
         List all images with optional prefix filter
@@ -292,5 +752,5 @@ class MinIOService:
             logger.error(f"Error getting bucket stats: {e}")
             return {}
 
-# Singleton instance
+# Singleton instance, bound to the application in create_app()
 minio_service = MinIOService()
@@ -0,0 +1,62 @@
+"""
+Ordered Prefetcher
+Runs blocking fetches (e.g. MinIO reads) ahead of a consumer on a bounded thread pool
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+def prefetch_ordered(items: Iterable[T],
+                     fetch: Callable[[T], R],
+                     concurrency: int = 8,
+                     weigh: Optional[Callable[[T], int]] = None,
+                     max_bytes: Optional[int] = None) -> Iterator[Tuple[T, Optional[R], Optional[Exception]]]:
+    """
+    Fetch items concurrently while yielding results in input order
+
+    At most `concurrency` fetches are in flight, so memory is bounded by that many
+    results no matter how many items there are. Items are pulled from the input
+    lazily, only when a slot frees up. With weigh and max_bytes, fetching also
+    waits while the results not yet handed to the consumer would exceed max_bytes
+    in total; a single item larger than the budget is still fetched, on its own.
+
+    Args:
+        items: Iterable of inputs, consumed lazily
+        fetch: Blocking function applied to each item on a worker thread
+        concurrency: Number of worker threads / fetches kept in flight
+        weigh: Expected size in bytes of an item's result (e.g. the stored file size)
+        max_bytes: Budget for the combined weight of fetches in flight (None: unlimited)
+
+    Yields:
+        (item, result, error) tuples in the same order as items; error is set and
+        result is None when fetch raised
+    """
+    concurrency = max(1, int(concurrency))
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='prefetch')
+    pending = deque()
+    in_flight = 0
+    try:
+        for item in items:
+            weight = weigh(item) if weigh else 0
+            while pending and (len(pending) >= concurrency or (max_bytes and in_flight + weight > max_bytes)):
+                done, future, done_weight = pending.popleft()
+                in_flight -= done_weight
+                yield _result(done, future)
+            pending.append((item, pool.submit(fetch, item), weight))
+            in_flight += weight
+        while pending:
+            done, future, _ = pending.popleft()
+            yield _result(done, future)
+    finally:
+        # Consumer stopped early (e.g. client disconnected): drop whatever is still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _result(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
@@ -0,0 +1,226 @@
+"""
+Thumbnail Service
+Generates downscaled JPEG/WebP variants of captured images and caches them in MinIO and in-process
+"""
+
+import io
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image
+from minio.error import S3Error
+
+from .minio_service import minio_service
+
+logger = logging.getLogger(__name__)
+
+# Derived prefix under which variants are stored in the bucket
+VARIANT_PREFIX = '_variants'
+
+# Bounding boxes variants are generated at (the list thumbnail plus preview sizes); requested
+# sizes snap to one of these so the number of variants per image stays bounded
+VARIANT_SIZES = ((360, 240), (720, 480), (1080, 720), (1440, 960))
+
+VARIANT_FORMATS = {
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+class VariantCache:
+    """Thread-safe LRU cache of encoded variants bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, key: str):
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self._size -= len(data)
+
+class ThumbnailService:
+    def __init__(self, sizes=VARIANT_SIZES, quality: int = 85):
+        """
+        Initialize thumbnail service
+
+        Args:
+            sizes: (width, height) bounding boxes variants may be generated at, smallest first
+            quality: Encoder quality for JPEG and WebP output
+        """
+        self.sizes = tuple(sizes)
+        self.quality = quality
+        self.cache = VariantCache()
+
+    def parse_variant_args(self, args) -> Optional[Tuple[int, int, str]]:
+        """
+        Parse and validate ?w=&h=&fmt= query arguments
+
+        The requested box snaps to the smallest allowed size covering it (the largest
+        allowed size if none does); a missing w or h leaves that dimension unconstrained.
+
+        Returns:
+            (width, height, fmt) tuple of the snapped size, or None if no variant was requested
+
+        Raises:
+            ValueError: If the arguments are invalid
+        """
+        if not any(name in args for name in ('w', 'h', 'fmt')):
+            return None
+
+        width = args.get('w', 0, type=int) or 0
+        height = args.get('h', 0, type=int) or 0
+        fmt = (args.get('fmt') or 'jpeg').lower()
+
+        if fmt not in VARIANT_FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', use jpeg or webp")
+        if width < 0 or height < 0 or (width == 0 and height == 0):
+            raise ValueError("w and/or h must be positive integers")
+
+        width, height = next(
+            ((w, h) for w, h in self.sizes if w >= width and h >= height),
+            self.sizes[-1]
+        )
+        return width, height, 'jpeg' if fmt == 'jpg' else fmt
+
+    def variant_key(self, object_key: str, width: int, height: int, fmt: str) -> str:
+        """Generate the object key of a variant under the derived prefix"""
+        return f"{VARIANT_PREFIX}/{width}x{height}/{object_key}.{fmt}"
+
+    def get_variant(self, image, object_key: str, width: int, height: int, fmt: str) -> Tuple[bytes, str]:
+        """
+        Get an encoded variant, generating and persisting it on first request
+
+        Lookup order is in-process LRU, then the variant object in MinIO, then generation
+        from the original.
+
+        Args:
+            image: CapturedImage row for the original
+            object_key: Object key of the original
+            width: Bounding box width
+            height: Bounding box height
+            fmt: Output format (jpeg or webp)
+
+        Returns:
+            Tuple of encoded bytes and MIME type
+        """
+        mime_type = VARIANT_FORMATS[fmt][1]
+        key = self.variant_key(object_key, width, height, fmt)
+
+        data = self.cache.get(key)
+        if data is not None:
+            return data, mime_type
+
+        data = self._read_object(key)
+        if data is None:
+            data = self._generate(object_key, width, height, fmt)
+            self._store(image, key, data, width, height, fmt, mime_type)
+
+        self.cache.put(key, data)
+        return data, mime_type
+
+    def delete_variants(self, variant_keys) -> dict:
+        """
+        Remove stored variants from MinIO (in bulk) and from the in-process cache
+
+        Args:
+            variant_keys: Object keys of the variants (ImageVariant.storage_key)
+
+        Returns:
+            Result of MinIOService.delete_images
+        """
+        variant_keys = list(variant_keys)
+        for key in variant_keys:
+            self.cache.discard(key)
+        return minio_service.delete_images(variant_keys)
+
+    def _read_object(self, key: str) -> Optional[bytes]:
+        try:
+            response = minio_service.client.get_object(minio_service.bucket_name, key)
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'NoSuchObject'):
+                return None
+            raise
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _generate(self, object_key: str, width: int, height: int, fmt: str) -> bytes:
+        """Decode the original and encode a downscaled variant"""
+        original = self._read_object(object_key)
+        if original is None:
+            raise FileNotFoundError(f"Original image not found: {object_key}")
+
+        bounds = (width, height)
+        with Image.open(io.BytesIO(original)) as img:
+            # Let the JPEG decoder downscale by a power of two before resampling
+            img.draft('RGB', bounds)
+            img.thumbnail(bounds, Image.LANCZOS)
+            if img.mode not in ('RGB', 'L') and fmt == 'jpeg':
+                img = img.convert('RGB')
+            elif img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGBA')
+
+            output = io.BytesIO()
+            img.save(output, format=VARIANT_FORMATS[fmt][0], quality=self.quality)
+            return output.getvalue()
+
+    def _store(self, image, key: str, data: bytes, width: int, height: int, fmt: str, mime_type: str):
+        """Persist the variant in MinIO and record its metadata next to the original"""
+        from ..models import db, ImageVariant
+        from sqlalchemy.exc import IntegrityError
+
+        minio_service.client.put_object(
+            bucket_name=minio_service.bucket_name,
+            object_name=key,
+            data=io.BytesIO(data),
+            length=len(data),
+            content_type=mime_type
+        )
+        logger.info(f"Generated image variant: {key} ({len(data)} bytes)")
+
+        try:
+            db.session.add(ImageVariant(
+                image_id=image.id,
+                width=width,
+                height=height,
+                format=fmt,
+                storage_key=key,
+                file_size=len(data),
+                mime_type=mime_type
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker generated the same variant concurrently
+            db.session.rollback()
+
+# Singleton instance
+thumbnail_service = ThumbnailService()
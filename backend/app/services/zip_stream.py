@@ -0,0 +1,85 @@
+"""
+Streaming ZIP Writer
+Builds ZIP archives incrementally so large exports can be sent while they are produced
+"""
+
+import io
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# Formats that are already compressed; DEFLATE only burns CPU on them
+STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.zip')
+
+class ZipEntry(NamedTuple):
+    """A single archive member; chunks is any iterable of bytes read lazily while writing"""
+    arcname: str
+    chunks: Iterable[bytes]
+    modified: Optional[datetime] = None
+    size: Optional[int] = None
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def compress_type_for(arcname: str) -> int:
+    """Store already-compressed images as-is, deflate everything else"""
+    return zipfile.ZIP_STORED if arcname.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+def stream_zip(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """
+    Generate a ZIP archive chunk by chunk
+
+    Memory use is bounded by a single source chunk regardless of archive size: each
+    entry is written with a data descriptor (the output is never seeked) and the bytes
+    produced so far are yielded after every chunk.
+
+    Args:
+        entries: Iterable of ZipEntry objects, consumed lazily
+
+    Yields:
+        Consecutive byte chunks of the archive
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', allowZip64=True) as archive:
+        for entry in entries:
+            modified = entry.modified or datetime.now()
+            info = zipfile.ZipInfo(entry.arcname, date_time=modified.timetuple()[:6])
+            info.compress_type = compress_type_for(entry.arcname)
+            info.external_attr = 0o644 << 16
+            if entry.size is not None:
+                info.file_size = entry.size
+
+            # zip64 headers are required up front when the size is unknown
+            with archive.open(info, mode='w', force_zip64=entry.size is None) as member:
+                for chunk in entry.chunks:
+                    member.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    # Central directory is written when the archive is closed
+    data = buffer.drain()
+    if data:
+        yield data
@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration for the QC Management System backend
+All settings can be overridden through environment variables, e.g.
+
+    GUNICORN_WORKERS=4 GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py run:app
+
+Worker classes:
+    gthread  (default) threads per worker; long exports/imports only hold one thread
+    gevent   cooperative greenlets for many slow Label Studio / MinIO calls
+    sync     one request per worker, mainly for debugging
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))  # Used by gthread only
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # Used by gevent only
+
+# Synchronous (non-?async) ZIP exports and Label Studio imports can run for minutes
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth (0 disables). Safe because background
+# jobs run in the separate `flask jobs worker` process; when they run inside the web workers
+# (JOB_RUN_IN_PROCESS, development only) recycling would cut them off, so it is off by default
+jobs_in_process = os.environ.get('JOB_RUN_IN_PROCESS', 'False').lower() == 'true'
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0 if jobs_in_process else 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0 if jobs_in_process else 100))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# The app is created per worker (no preload), so each worker gets its own DB pool,
+# HTTP sessions and background endpoint-resolver thread
+preload_app = False
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative under gevent so DB queries do not block the event loop"""
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning("psycogreen is not installed; database calls will block gevent workers")
+        return
+    patch_psycopg()
+
+
+def worker_exit(server, worker):
+    """Stop the job sweeper (and in-process job workers, if JOB_RUN_IN_PROCESS is set) of an exiting worker"""
+    from app.services.job_queue import job_queue
+    job_queue.shutdown()
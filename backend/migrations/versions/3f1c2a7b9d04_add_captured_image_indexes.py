@@ -0,0 +1,40 @@
+"""add_captured_image_indexes
+
+Revision ID: 3f1c2a7b9d04
+Revises: 9d29172db3e7
+Create Date: 2026-10-18 09:12:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d04'
+down_revision = '9d29172db3e7'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_product_company_id', 'product', ['company_id']),
+    ('ix_class_count_product_id', 'class_count', ['product_id']),
+    ('ix_captured_image_product_id_timestamp_id', 'captured_image', ['product_id', 'timestamp', 'id']),
+    ('ix_captured_image_timestamp_id', 'captured_image', ['timestamp', 'id']),
+    ('ix_captured_image_checksum', 'captured_image', ['checksum']),
+    ('ix_captured_image_storage_key', 'captured_image', ['storage_key']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction, but avoids locking captured_image for writes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
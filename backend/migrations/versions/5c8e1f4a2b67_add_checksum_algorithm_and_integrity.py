@@ -0,0 +1,49 @@
+"""add_checksum_algorithm_and_integrity
+
+Revision ID: 5c8e1f4a2b67
+Revises: 3f1c2a7b9d04
+Create Date: 2026-10-18 14:36:05.271904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1f4a2b67'
+down_revision = '3f1c2a7b9d04'
+branch_labels = None
+depends_on = None
+
+
+# (table, column); existing rows were hashed with MD5
+COLUMNS = [
+    ('captured_image', sa.Column('checksum_algorithm', sa.String(length=16), nullable=True)),
+    ('captured_image', sa.Column('integrity_status', sa.String(length=20), nullable=True)),
+    ('captured_image', sa.Column('verified_at', sa.DateTime(), nullable=True)),
+    ('stored_object', sa.Column('checksum_algorithm', sa.String(length=16), nullable=False, server_default='md5')),
+]
+
+
+def existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    # The app creates missing tables at startup, so stored_object may already have the column
+    for table, column in COLUMNS:
+        columns = existing_columns(table)
+        if columns is not None and column.name not in columns:
+            op.add_column(table, column)
+    op.create_index('ix_captured_image_integrity_status', 'captured_image', ['integrity_status'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_captured_image_integrity_status', table_name='captured_image', if_exists=True)
+    for table, column in reversed(COLUMNS):
+        columns = existing_columns(table)
+        if columns is not None and column.name in columns:
+            op.drop_column(table, column.name)
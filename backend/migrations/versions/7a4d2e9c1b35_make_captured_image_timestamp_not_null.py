@@ -0,0 +1,29 @@
+"""make_captured_image_timestamp_not_null
+
+Revision ID: 7a4d2e9c1b35
+Revises: 5c8e1f4a2b67
+Create Date: 2026-10-19 10:04:18.662310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4d2e9c1b35'
+down_revision = '5c8e1f4a2b67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination over (timestamp, id) cannot page past NULL timestamps; rows
+    # without a capture time are dated to the migration instead
+    op.execute(sa.text('UPDATE captured_image SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL'))
+    op.alter_column('captured_image', 'timestamp', existing_type=sa.DateTime(), nullable=False,
+                    existing_server_default=sa.text('CURRENT_TIMESTAMP'))
+
+
+def downgrade():
+    op.alter_column('captured_image', 'timestamp', existing_type=sa.DateTime(), nullable=True,
+                    existing_server_default=sa.text('CURRENT_TIMESTAMP'))
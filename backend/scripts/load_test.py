@@ -0,0 +1,175 @@
+"""
+Load Test for the backend API
+Fires concurrent requests at a running backend and reports throughput and latency,
+optionally while a slow export is in flight, to check that heavy endpoints no longer
+block the rest of the API and that throughput scales with the number of workers.
+
+Usage:
+    # Against an already running server
+    python scripts/load_test.py --base-url http://localhost:5000 --username admin --password admin
+
+    # Start gunicorn locally with 1, 2 and 4 workers and compare (run from backend/)
+    python scripts/load_test.py --spawn-workers 1,2,4 --username admin --password admin
+
+    # Keep a ZIP export running in the background during the measurement
+    python scripts/load_test.py --username admin --password admin --with-export
+
+Each request path in --paths is hit round-robin by --concurrency client threads for
+--duration seconds.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = '/health,/companies,/products,/images?limit=50'
+
+def login(base_url, username, password):
+    """Return an Authorization header for the given credentials (empty without credentials)"""
+    if not username:
+        return {}
+    response = requests.post(f'{base_url}/login', json={'username': username, 'password': password}, timeout=10)
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+def run_export(base_url, headers, stop):
+    """Download the full image archive repeatedly until stopped, discarding the bytes"""
+    while not stop.is_set():
+        try:
+            with requests.get(f'{base_url}/download/images/all', headers=headers, stream=True, timeout=600) as response:
+                for _ in response.iter_content(chunk_size=1024 * 1024):
+                    if stop.is_set():
+                        break
+        except requests.RequestException:
+            time.sleep(1)
+
+def client_loop(base_url, headers, paths, deadline, offset):
+    """Issue requests back to back until the deadline; returns [(status, seconds), ...]"""
+    session = requests.Session()
+    session.headers.update(headers)
+    results = []
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            status = session.get(f'{base_url}{path}', timeout=30).status_code
+        except requests.RequestException:
+            status = 'error'
+        results.append((status, time.perf_counter() - started))
+    session.close()
+    return results
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run_load(base_url, headers, paths, concurrency, duration, with_export):
+    """Run one measurement and return a summary dict"""
+    stop = threading.Event()
+    exporter = None
+    if with_export:
+        exporter = threading.Thread(target=run_export, args=(base_url, headers, stop), daemon=True)
+        exporter.start()
+        time.sleep(1)  # Let the export get going before measuring
+
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(client_loop, base_url, headers, paths, deadline, i) for i in range(concurrency)]
+        results = [result for future in futures for result in future.result()]
+
+    stop.set()
+    if exporter:
+        exporter.join(timeout=5)
+
+    latencies = [seconds * 1000 for _, seconds in results]
+    return {
+        'requests': len(results),
+        'rps': len(results) / duration,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'statuses': Counter(status for status, _ in results),
+    }
+
+def wait_for_health(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def spawn_server(workers, port, worker_class, threads):
+    """Start gunicorn with the given worker count using gunicorn.conf.py"""
+    env = dict(os.environ,
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_BIND=f'127.0.0.1:{port}',
+               GUNICORN_ACCESS_LOG='/dev/null')
+    return subprocess.Popen(['gunicorn', '-c', 'gunicorn.conf.py', 'run:app'], env=env, start_new_session=True)
+
+def print_summary(label, summary):
+    statuses = ', '.join(f'{status}: {count}' for status, count in sorted(summary['statuses'].items(), key=str))
+    print(f"{label:<12} {summary['requests']:>9} {summary['rps']:>9.1f} "
+          f"{summary['p50']:>9.1f} {summary['p95']:>9.1f} {summary['p99']:>9.1f}   {statuses}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the backend API')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--username', default=os.environ.get('LOADTEST_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('LOADTEST_PASSWORD'))
+    parser.add_argument('--paths', default=DEFAULT_PATHS, help='Comma-separated GET paths hit round-robin')
+    parser.add_argument('--concurrency', type=int, default=32, help='Number of client threads')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per measurement')
+    parser.add_argument('--with-export', action='store_true', help='Keep a ZIP export running during the test')
+    parser.add_argument('--spawn-workers', help='Comma-separated worker counts to start locally, e.g. 1,2,4')
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5055, help='Port used for spawned servers')
+    args = parser.parse_args()
+
+    paths = [path.strip() for path in args.paths.split(',') if path.strip()]
+
+    print(f"{'run':<12} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}   statuses")
+
+    if not args.spawn_workers:
+        headers = login(args.base_url, args.username, args.password)
+        summary = run_load(args.base_url, headers, paths, args.concurrency, args.duration, args.with_export)
+        print_summary('server', summary)
+        return
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    baseline = None
+    for workers in (int(count) for count in args.spawn_workers.split(',')):
+        server = spawn_server(workers, args.port, args.worker_class, args.threads)
+        try:
+            if not wait_for_health(base_url):
+                print(f"Server with {workers} workers did not become healthy", file=sys.stderr)
+                continue
+            headers = login(base_url, args.username, args.password)
+            summary = run_load(base_url, headers, paths, args.concurrency, args.duration, args.with_export)
+            baseline = baseline or summary['rps']
+            print_summary(f'{workers} workers', summary)
+            print(f"{'':<12} scaling vs first run: {summary['rps'] / baseline:.2f}x")
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Shared fixtures: an application on a throwaway SQLite database with no background threads
+
+MinIO and Label Studio are never contacted; their clients only connect on first use,
+and tests that reach them patch the client call they need.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from flask_jwt_extended import create_access_token
+from minio import Minio
+from minio.datatypes import Object
+from minio.error import S3Error
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import User
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'JWT_SECRET_KEY': 'test-secret-key-that-is-long-enough-for-hs256',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'qc.db'}",
+        'JOB_RUN_IN_PROCESS': False,  # Jobs stay queued; nothing runs on background threads
+        'LABEL_STUDIO_URL': 'http://label-studio.test',  # Explicit endpoints skip gateway discovery
+        'MINIO_LABEL_STUDIO_ENDPOINT': 'minio.test:9000',
+        'MINIO_ENDPOINT': 'minio.test:9000',
+    })
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def user(app):
+    """A user with a Label Studio token"""
+    with app.app_context():
+        user = User(username='tester', email='tester@example.com', label_studio_api_key='token')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+@pytest.fixture
+def auth_headers(app, user):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=str(user))}'}
+
+@pytest.fixture
+def count_queries(app):
+    """
+    Count the SQL statements executed inside a block
+
+    Usage:
+        with count_queries() as queries:
+            client.get(...)
+        assert len(queries) == 3
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
+
+@pytest.fixture
+def storage(monkeypatch):
+    """In-memory stand-in for the MinIO bucket (object key -> bytes)"""
+    objects = {}
+
+    def put_object(client, bucket_name, object_name, data, length, content_type=None, part_size=0, **kwargs):
+        objects[object_name] = data.read() if length < 0 else data.read(length)
+
+    def remove_objects(client, bucket_name, delete_object_list, **kwargs):
+        for delete_object in delete_object_list:
+            objects.pop(delete_object.name, None)
+        return iter(())
+
+    class Response:
+        def __init__(self, data):
+            self.data = data
+
+        def read(self, amt=None):
+            data, self.data = (self.data, b'') if amt is None else (self.data[:amt], self.data[amt:])
+            return data
+
+        def stream(self, amt):
+            while self.data:
+                yield self.read(amt)
+
+        def close(self):
+            pass
+
+        def release_conn(self):
+            pass
+
+    def lookup(bucket_name, object_name):
+        if object_name not in objects:
+            raise S3Error(None, 'NoSuchKey', 'Object does not exist', object_name, 'request', 'host')
+        return objects[object_name]
+
+    def get_object(client, bucket_name, object_name, offset=0, length=0, **kwargs):
+        data = lookup(bucket_name, object_name)[offset:]
+        return Response(data[:length] if length else data)
+
+    def stat_object(client, bucket_name, object_name, **kwargs):
+        data = lookup(bucket_name, object_name)
+        return Object(bucket_name, object_name, last_modified=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                      etag=f'etag-{len(data)}', size=len(data), content_type='application/octet-stream')
+
+    monkeypatch.setattr(Minio, 'bucket_exists', lambda client, bucket_name: True)
+    monkeypatch.setattr(Minio, 'get_object', get_object)
+    monkeypatch.setattr(Minio, 'stat_object', stat_object)
+    monkeypatch.setattr(Minio, 'put_object', put_object)
+    monkeypatch.setattr(Minio, 'remove_object', lambda client, bucket_name, object_name, **kwargs: objects.pop(object_name, None))
+    monkeypatch.setattr(Minio, 'remove_objects', remove_objects)
+    return objects
@@ -0,0 +1,119 @@
+"""Batch uploads store files concurrently but record and report them in request order"""
+
+import io
+import tarfile
+import time
+import zipfile
+
+import pytest
+
+from app import db
+from app.models import Company, Product, CapturedImage
+from app.services.content_store import content_store
+
+@pytest.fixture
+def product(app, storage):
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+def post_batch(client, auth_headers, query='', **kwargs):
+    # Closing the response releases its IMAGE_BATCH_CONCURRENCY_LIMIT slot
+    with client.post(f'/images/batch{query}', headers=auth_headers, **kwargs) as response:
+        return response.status_code, response.json
+
+def recorded(app):
+    with app.app_context():
+        return dict(db.session.query(CapturedImage.id, CapturedImage.filename).all())
+
+def test_ids_follow_input_order(app, client, auth_headers, product, monkeypatch):
+    app.config['IMAGE_BATCH_UPLOAD_CONCURRENCY'] = 4
+    names = [f'frame{i:02d}.jpg' for i in range(12)]
+
+    # Later files finish first, so completion order is the reverse of the input order
+    store = content_store.store
+    monkeypatch.setattr(content_store, 'store', lambda file, *args, filename=None, **kwargs: (
+        time.sleep((len(names) - names.index(filename)) * 0.005) or store(file, *args, filename=filename, **kwargs)
+    ))
+
+    status, payload = post_batch(client, auth_headers, data={
+        'product_id': str(product),
+        'images': [(io.BytesIO(name.encode()), name, 'image/jpeg') for name in names],
+    })
+
+    assert status == 201, payload
+    results = payload['results']
+    assert [result['filename'] for result in results] == names
+    assert payload['created'] == len(names)
+
+    rows = recorded(app)
+    assert [rows[result['id']] for result in results] == names
+    assert [result['id'] for result in results] == sorted(rows)
+
+def zip_archive(members):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return output.getvalue()
+
+def tar_archive(members):
+    output = io.BytesIO()
+    with tarfile.open(fileobj=output, mode='w:gz') as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return output.getvalue()
+
+ARCHIVE_MEMBERS = [
+    ('shots/a.jpg', b'frame a'),
+    ('shots/readme.txt', b'not an image'),
+    ('__MACOSX/shots/._a.jpg', b'metadata'),
+    ('shots/.hidden.png', b'dotfile'),
+    ('shots/b.PNG', b'frame b'),
+]
+
+@pytest.mark.parametrize('body, content_type', [
+    (zip_archive(ARCHIVE_MEMBERS), 'application/zip'),
+    (tar_archive(ARCHIVE_MEMBERS), 'application/gzip'),
+])
+def test_archive_members_that_are_not_images_are_skipped(app, client, auth_headers, product, storage, body, content_type):
+    status, payload = post_batch(client, auth_headers, f'?product_id={product}', data=body, content_type=content_type)
+
+    assert status == 201, payload
+    assert [(result['filename'], result['status']) for result in payload['results']] == [
+        ('a.jpg', 'created'),
+        ('readme.txt', 'skipped'),
+        ('._a.jpg', 'skipped'),
+        ('.hidden.png', 'skipped'),
+        ('b.PNG', 'created'),
+    ]
+    assert payload['created'] == 2 and payload['skipped'] == 3
+    assert sorted(recorded(app).values()) == ['a.jpg', 'b.PNG']
+    assert sorted(storage.values()) == [b'frame a', b'frame b']
+
+def test_multipart_archive_reuses_stored_content(app, client, auth_headers, product, storage):
+    status, payload = post_batch(client, auth_headers, f'?product_id={product}', data={
+        'images': [(io.BytesIO(b'frame a'), 'first.jpg', 'image/jpeg')],
+    })
+    assert status == 201 and payload['deduplicated'] == 0
+
+    status, payload = post_batch(client, auth_headers, data={
+        'product_id': str(product),
+        'archive': [(io.BytesIO(zip_archive(ARCHIVE_MEMBERS)), 'shots.zip', 'application/zip')],
+    })
+
+    assert status == 201, payload
+    assert [result['filename'] for result in payload['results'] if result['status'] == 'created'] == ['a.jpg', 'b.PNG']
+    assert payload['deduplicated'] == 1  # a.jpg has the content of first.jpg
+    assert len(storage) == 2
+
+def test_batches_without_images_are_rejected(client, auth_headers, product):
+    query = f'?product_id={product}'
+
+    assert post_batch(client, auth_headers, query, data=b'not a zip', content_type='application/zip')[0] == 400
+    assert post_batch(client, auth_headers, query, data={})[0] == 400
+    assert post_batch(client, auth_headers, data={'images': [(io.BytesIO(b'frame'), 'a.jpg', 'image/jpeg')]})[0] == 400
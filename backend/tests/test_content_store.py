@@ -0,0 +1,55 @@
+"""Identical uploads share one object, but only within the same company and product"""
+
+import io
+
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import StoredObject
+from app.services.content_store import content_store
+
+def store(company, product, data=b'same frame'):
+    upload = FileStorage(io.BytesIO(data), filename='frame.jpg', content_type='image/jpeg')
+    return content_store.store(upload, company, product, 'capture')
+
+def test_identical_uploads_in_one_product_share_an_object(app, storage):
+    with app.app_context():
+        first = store('Acme', 'Widget')
+        second = store('Acme', 'Widget')
+
+        assert second['deduplicated'] is True
+        assert second['storage_key'] == first['storage_key']
+        assert db.session.query(StoredObject.ref_count).scalar() == 2
+    assert len(storage) == 1
+
+def test_identical_uploads_are_not_shared_across_tenants(app, storage):
+    with app.app_context():
+        acme = store('Acme', 'Widget')
+        other_company = store('Globex', 'Widget')
+        other_product = store('Acme', 'Widget Pro')
+
+        assert not other_company['deduplicated'] and not other_product['deduplicated']
+        assert other_company['storage_key'].startswith('globex/widget/')
+        assert other_product['storage_key'].startswith('acme/widget_pro/')
+        assert acme['storage_key'].startswith('acme/widget/')
+    assert len(storage) == 3
+
+def test_seekable_upload_is_hashed_once(app, storage, monkeypatch):
+    from app.services import content_store as content_store_module, minio_service as minio_module
+
+    readers = []
+
+    class CountingReader(minio_module.HashingReader):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            readers.append(self)
+
+    monkeypatch.setattr(minio_module, 'HashingReader', CountingReader)
+    monkeypatch.setattr(content_store_module, 'HashingReader', CountingReader)
+
+    with app.app_context():
+        stored = store('Acme', 'Widget', b'one pass')
+
+    assert len(readers) == 1
+    assert stored['checksum'] == readers[0].hexdigest() and stored['file_size'] == len(b'one pass')
+    assert storage[stored['storage_key']] == b'one pass'
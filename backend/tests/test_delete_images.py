@@ -0,0 +1,92 @@
+"""Bulk deletes remove only the requested images and only objects no other image still uses"""
+
+import io
+
+import pytest
+from minio import Minio
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import Company, Product, CapturedImage, ImageVariant, StoredObject
+from app.services.content_store import content_store
+
+@pytest.fixture
+def images(app, storage):
+    """
+    Four images of one product: 'a' and 'b' share an object, 'c' has a variant; returns {name: id}
+    """
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        rows = {}
+        for name, data in [('a', b'shared frame'), ('b', b'shared frame'), ('c', b'frame c'), ('d', b'frame d')]:
+            upload = FileStorage(io.BytesIO(data), filename=f'{name}.jpg', content_type='image/jpeg')
+            metadata = content_store.store(upload, 'Acme', 'Widget', 'capture')
+            rows[name] = CapturedImage(filename=f'{name}.jpg', product=product, storage_key=metadata['storage_key'],
+                                       file_size=metadata['file_size'], checksum=metadata['checksum'])
+        db.session.add_all(rows.values())
+        db.session.flush()
+        variant_key = f"_variants/360x240/{rows['c'].storage_key}.jpeg"
+        storage[variant_key] = b'variant'
+        db.session.add(ImageVariant(image_id=rows['c'].id, width=360, height=240, format='jpeg', storage_key=variant_key))
+        db.session.commit()
+        return {name: row.id for name, row in rows.items()}
+
+def test_bulk_delete_removes_only_the_requested_images(app, client, auth_headers, images, storage, monkeypatch):
+    with app.app_context():
+        keys = dict(db.session.query(CapturedImage.filename, CapturedImage.storage_key).all())
+
+    requests = []
+    remove_objects = Minio.remove_objects
+    monkeypatch.setattr(Minio, 'remove_objects', lambda client, bucket_name, delete_object_list, **kwargs: (
+        requests.append(sorted(obj.name for obj in delete_object_list))
+        or remove_objects(client, bucket_name, delete_object_list, **kwargs)
+    ))
+
+    response = client.delete(f"/images?ids={images['a']},{images['c']}&ids=999", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json['deleted_count'] == 2
+    assert response.json['not_found'] == [999]
+    assert response.json['storage_errors'] == []
+
+    with app.app_context():
+        remaining = [filename for (filename,) in db.session.query(CapturedImage.filename).order_by(CapturedImage.id)]
+        assert remaining == ['b.jpg', 'd.jpg']
+        assert ImageVariant.query.count() == 0
+        # 'b' still references the object it shared with 'a'
+        assert dict(db.session.query(StoredObject.storage_key, StoredObject.ref_count).all()) == {
+            keys['b.jpg']: 1, keys['d.jpg']: 1
+        }
+
+    # The object of 'c' and its variant went in batched requests; shared and untouched objects stay
+    assert requests == [[keys['c.jpg']], [f"_variants/360x240/{keys['c.jpg']}.jpeg"]]
+    assert sorted(storage) == sorted([keys['b.jpg'], keys['d.jpg']])
+
+def test_deleting_the_last_reference_removes_a_shared_object(app, client, auth_headers, images, storage):
+    with app.app_context():
+        shared_key = db.session.get(CapturedImage, images['a']).storage_key
+
+    assert client.delete(f"/images?ids={images['a']}", headers=auth_headers).json['removed_objects'] == 0
+    assert shared_key in storage
+
+    assert client.delete(f"/images?ids={images['b']}", headers=auth_headers).json['removed_objects'] == 1
+    assert shared_key not in storage
+
+@pytest.mark.parametrize('query', ['', '?ids=', '?ids=1,two'])
+def test_bulk_delete_requires_valid_ids(client, auth_headers, images, query):
+    assert client.delete(f'/images{query}', headers=auth_headers).status_code == 400
+
+def test_objects_are_removed_in_batches(app, storage, monkeypatch):
+    from app.services.minio_service import minio_service
+
+    batches = []
+    remove_objects = Minio.remove_objects
+    monkeypatch.setattr(Minio, 'remove_objects', lambda client, bucket_name, delete_object_list, **kwargs: (
+        batches.append(len(list(delete_object_list))) or remove_objects(client, bucket_name, [], **kwargs)
+    ))
+
+    with app.app_context():
+        result = minio_service.delete_images([f'frame{i}' for i in range(5)] + ['frame0', ''], batch_size=2)
+
+    assert batches == [2, 2, 1]
+    assert result == {'deleted': 5, 'errors': []}
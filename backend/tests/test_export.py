@@ -0,0 +1,169 @@
+"""ZIP exports, streamed directly or built by a background job"""
+
+import csv
+import io
+import re
+import zipfile
+
+import pytest
+
+from app import db
+from app.models import Company, Product, CapturedImage, Job
+from app.services.job_queue import job_queue
+
+@pytest.fixture
+def images(app, storage):
+    """Two captured images of one product with their objects in the bucket; returns their ids"""
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        rows = []
+        for index in range(2):
+            key = f'acme/widget/capture/frame{index}.jpg'
+            storage[key] = f'frame {index}'.encode() * 100
+            rows.append(CapturedImage(filename=f'frame{index}.jpg', product=product, storage_key=key,
+                                      file_size=len(storage[key]), checksum=f'checksum{index}'))
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+def run_export(app, user, **args):
+    with app.app_context():
+        job_id = job_queue.enqueue('export_images', user_id=user, args=args, archive_name='acme_images').id
+    job_queue._run(job_id)
+    with app.app_context():
+        return db.session.get(Job, job_id)
+
+def test_export_artifact_is_only_downloadable_by_its_owner(app, client, user, auth_headers, images, storage):
+    job = run_export(app, user)
+
+    assert job.status == 'succeeded', job.error
+    assert re.fullmatch(rf'_jobs/{job.id}/[0-9a-f]{{32}}/acme_images_\d{{8}}_\d{{6}}\.zip', job.artifact_key)
+    assert client.get(f'/serve-image/{job.artifact_key}').status_code == 404
+
+    response = client.get(f'/jobs/{job.id}/artifact', headers=auth_headers)
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert len([name for name in archive.namelist() if name.endswith('.jpg')]) == len(images)
+
+def read_archive(response):
+    # Closing the response releases its EXPORT_CONCURRENCY_LIMIT slot
+    with response:
+        assert response.status_code == 200 and response.mimetype == 'application/zip'
+        return zipfile.ZipFile(io.BytesIO(response.get_data()))
+
+def status_of(response):
+    with response:
+        return response.status_code
+
+def test_streamed_archive_entries_and_manifest(app, client, auth_headers, images, storage):
+    with app.app_context():
+        db.session.add(CapturedImage(filename='scan.tiff', product_id=1, storage_key='acme/widget/capture/scan.tiff',
+                                     file_size=3000, checksum='checksum2'))
+        db.session.commit()
+    storage['acme/widget/capture/scan.tiff'] = b'II*\x00' * 750
+
+    with read_archive(client.get('/download/images?product_id=1', headers=auth_headers)) as archive:
+        entries = {info.filename: info for info in archive.infolist()}
+        manifest = list(csv.DictReader(io.StringIO(archive.read('manifest.csv').decode())))
+        contents = {name: archive.read(name) for name in entries}
+
+    paths = [f'Acme/Widget/001_{images[0]}_frame0.jpg', f'Acme/Widget/002_{images[1]}_frame1.jpg', 'Acme/Widget/003_3_scan.tiff']
+    assert list(entries) == paths + ['manifest.csv']
+    for path, key in zip(paths, ['acme/widget/capture/frame0.jpg', 'acme/widget/capture/frame1.jpg', 'acme/widget/capture/scan.tiff']):
+        assert contents[path] == storage[key]
+        assert entries[path].file_size == len(storage[key])
+
+    # Already compressed formats are stored, everything else is deflated
+    assert [entries[path].compress_type for path in paths] == [zipfile.ZIP_STORED, zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+    assert entries['manifest.csv'].compress_type == zipfile.ZIP_DEFLATED
+
+    assert [row['path'] for row in manifest] == paths
+    assert [row['checksum'] for row in manifest] == ['checksum0', 'checksum1', 'checksum2']
+    assert [int(row['file_size']) for row in manifest] == [len(contents[path]) for path in paths]
+    assert {row['company'] for row in manifest} == {'Acme'} and {row['product'] for row in manifest} == {'Widget'}
+
+def test_prefetch_stays_within_byte_budget(app, storage, monkeypatch):
+    from app.routes import iter_export_entries, export_images_query
+    from app.services.minio_service import minio_service
+
+    app.config.update(EXPORT_PREFETCH_CONCURRENCY=8, EXPORT_PREFETCH_MAX_BYTES=250, EXPORT_STREAM_THRESHOLD=500)
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        sizes = [100, 100, 100, 1000, 100, 100]
+        for index, size in enumerate(sizes):
+            storage[f'frame{index}.jpg'] = bytes([index]) * size
+            db.session.add(CapturedImage(filename=f'frame{index}.jpg', product=product, storage_key=f'frame{index}.jpg', file_size=size))
+        db.session.commit()
+
+        read = []
+        read_image = minio_service.read_image
+        monkeypatch.setattr(minio_service, 'read_image', lambda key: read.append(key) or read_image(key))
+
+        entries = iter_export_entries(lambda: export_images_query({}), include_manifest=False)
+        for index, entry in enumerate(entries):
+            # Objects read ahead of the entry being written never exceed the budget
+            ahead = [position for position, size in enumerate(sizes) if position > index and f'frame{position}.jpg' in read]
+            assert sum(sizes[position] for position in ahead) <= 250
+            assert entry.size == sizes[index]
+            assert b''.join(entry.chunks) == storage[f'frame{index}.jpg']
+
+    # The object above EXPORT_STREAM_THRESHOLD is streamed, not read into memory
+    assert sorted(read) == ['frame0.jpg', 'frame1.jpg', 'frame2.jpg', 'frame4.jpg', 'frame5.jpg']
+
+def test_parse_export_filters():
+    from datetime import datetime
+    from werkzeug.datastructures import MultiDict
+    from app.routes import parse_export_filters
+
+    assert parse_export_filters(MultiDict()) == {}
+    assert parse_export_filters(MultiDict([
+        ('company_id', '1'), ('product_id', '2'), ('since', '2025-01-01'), ('until', '2025-01-31T12:00:00'),
+        ('ids', '1,2,'), ('ids', '3'),
+    ])) == {
+        'company_id': 1, 'product_id': 2, 'since': datetime(2025, 1, 1), 'until': datetime(2025, 1, 31, 12),
+        'ids': [1, 2, 3],
+    }
+    with pytest.raises(ValueError, match='since'):
+        parse_export_filters(MultiDict({'since': 'yesterday'}))
+    with pytest.raises(ValueError):
+        parse_export_filters(MultiDict({'ids': '1,two'}))
+
+@pytest.fixture
+def catalog(app, storage):
+    """Images of two companies captured on consecutive days; returns {filename: id}"""
+    from datetime import datetime
+
+    with app.app_context():
+        widget = Product(name='Widget', company=Company(name='Acme'))
+        gadget = Product(name='Gadget', company=Company(name='Globex'))
+        rows = []
+        for day, (name, product) in enumerate([('a', widget), ('b', widget), ('c', gadget), ('d', gadget)], start=1):
+            storage[name] = name.encode()
+            rows.append(CapturedImage(filename=f'{name}.jpg', product=product, storage_key=name, file_size=1,
+                                      timestamp=datetime(2025, 1, day)))
+        db.session.add_all(rows)
+        db.session.commit()
+        return {row.filename: row.id for row in rows}
+
+@pytest.mark.parametrize('query, expected', [
+    ('', ['a', 'b', 'c', 'd']),
+    ('company_id=2', ['c', 'd']),
+    ('product_id=1', ['a', 'b']),
+    ('since=2025-01-02&until=2025-01-03', ['b', 'c']),
+    ('ids=1,4', ['a', 'd']),
+    ('company_id=1&ids=1,3', ['a']),
+])
+def test_apply_export_filters(app, catalog, query, expected):
+    from flask import request
+    from app.routes import parse_export_filters, export_images_query
+
+    with app.test_request_context(query_string=query):
+        images = export_images_query(parse_export_filters(request.args)).all()
+        assert [image.filename for image in images] == [f'{name}.jpg' for name in expected]
+
+def test_download_rejects_bad_filters_and_empty_selections(client, auth_headers, catalog):
+    assert status_of(client.get('/download/images?since=yesterday', headers=auth_headers)) == 400
+    assert status_of(client.get('/download/images?ids=99', headers=auth_headers)) == 404
+
+    with read_archive(client.get('/download/images?company_id=2', headers=auth_headers)) as archive:
+        assert archive.namelist() == ['Globex/Gadget/001_3_c.jpg', 'Globex/Gadget/002_4_d.jpg', 'manifest.csv']
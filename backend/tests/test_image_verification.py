@@ -0,0 +1,94 @@
+"""Background integrity verification of stored images and where an interrupted pass resumes"""
+
+import pytest
+
+from app import db
+from app.models import Company, Product, CapturedImage, Job, JobSchedule
+from app.routes import image_verification_cursor
+from app.services.job_queue import job_queue
+from app.services.minio_service import new_hasher
+
+def checksum(data):
+    hasher = new_hasher('blake2b')
+    hasher.update(data)
+    return hasher.hexdigest()
+
+@pytest.fixture
+def images(app, storage):
+    """Three images whose objects are intact, altered and gone; returns their ids in that order"""
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        rows = []
+        for name in ('ok', 'corrupt', 'missing'):
+            key = f'acme/widget/capture/{name}.jpg'
+            data = name.encode() * 10
+            storage[key] = data
+            rows.append(CapturedImage(filename=f'{name}.jpg', product=product, storage_key=key, file_size=len(data),
+                                      checksum=checksum(data), checksum_algorithm='blake2b'))
+        db.session.add_all(rows)
+        db.session.commit()
+        ids = [row.id for row in rows]
+    storage['acme/widget/capture/corrupt.jpg'] = b'bit rot'
+    del storage['acme/widget/capture/missing.jpg']
+    return ids
+
+def add_job(app, status, progress_current=0, result=None):
+    with app.app_context():
+        job = Job(job_type='image_verification', params={}, status=status, progress_current=progress_current, result=result)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+def run_verification(app, **params):
+    with app.app_context():
+        job_id = job_queue.enqueue('image_verification', **params).id
+    job_queue._run(job_id)
+    with app.app_context():
+        return db.session.get(Job, job_id)
+
+def integrity(app):
+    with app.app_context():
+        return [status for (status,) in db.session.query(CapturedImage.integrity_status).order_by(CapturedImage.id)]
+
+def test_pass_flags_corrupt_and_missing_objects(app, images):
+    job = run_verification(app)
+
+    assert job.status == 'succeeded', job.error
+    assert job.result['verified'] == 3 and job.result['resumed_from'] == 0
+    assert integrity(app) == ['ok', 'corrupt', 'missing']
+
+def test_cursor_resumes_after_a_failed_pass(app):
+    failed = add_job(app, 'failed', progress_current=42)
+    skipped = add_job(app, 'succeeded', result={'skipped': 'Another verification pass is already running'})
+    current = add_job(app, 'queued')
+
+    with app.app_context():
+        assert image_verification_cursor(failed) == 0  # No earlier pass
+        assert image_verification_cursor(skipped) == 42
+        assert image_verification_cursor(current) == 42  # Skipped passes did no work and are looked past
+
+        finished = add_job(app, 'succeeded', progress_current=100, result={'verified': 100})
+        assert image_verification_cursor(finished + 1) == 0  # The last real pass completed
+
+def test_interrupted_pass_is_resumed_unless_restarted(app, images):
+    add_job(app, 'failed', progress_current=images[0])
+
+    resumed = run_verification(app)
+    assert resumed.result['resumed_from'] == images[0] and resumed.result['verified'] == 2
+    assert integrity(app) == [None, 'corrupt', 'missing']
+
+    add_job(app, 'failed', progress_current=images[0])
+    restarted = run_verification(app, restart=True)
+    assert restarted.result['resumed_from'] == 0 and restarted.result['verified'] == 3
+    assert integrity(app) == ['ok', 'corrupt', 'missing']
+
+def test_verification_is_not_scheduled_by_default(app):
+    with app.app_context():
+        job_queue._sweep()
+
+        assert JobSchedule.query.filter_by(job_type='image_verification').count() == 0
+
+        app.config['IMAGE_VERIFICATION_INTERVAL'] = 604800
+        job_queue._sweep()
+
+        assert JobSchedule.query.filter_by(job_type='image_verification').count() == 1
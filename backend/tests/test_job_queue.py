@@ -0,0 +1,116 @@
+"""Jobs run only in a dedicated worker, never on threads of the web/CLI app"""
+
+import threading
+import time
+
+from app import create_app, db
+from app.models import Job
+from app.services.job_queue import job_queue
+
+def job_threads():
+    return [t.name for t in threading.enumerate() if t.name.startswith(('job-worker', 'job-sweeper'))]
+
+def test_create_app_starts_no_job_threads(app):
+    assert job_threads() == []
+
+def test_run_in_process_starts_workers(tmp_path):
+    create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'qc.db'}",
+        'JOB_RUN_IN_PROCESS': True,
+        'LABEL_STUDIO_URL': 'http://label-studio.test',
+        'MINIO_LABEL_STUDIO_ENDPOINT': 'minio.test:9000',
+    })
+    try:
+        assert 'job-sweeper' in job_threads()
+    finally:
+        job_queue.shutdown(wait=True)
+
+def test_worker_picks_up_queued_jobs(app, monkeypatch):
+    monkeypatch.setitem(job_queue._handlers, 'echo', lambda context, value: {'value': value})
+    monkeypatch.setattr(job_queue, '_schedules', {})
+    monkeypatch.setattr(job_queue, 'poll_interval', 0.05)
+
+    with app.app_context():
+        job_id = job_queue.enqueue('echo', value=42).id
+        assert job_threads() == []  # Enqueueing from a web worker only writes the row
+
+        job_queue.start(workers=1)
+        try:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                db.session.expire_all()
+                job = db.session.get(Job, job_id)
+                if job.status not in ('queued', 'running'):
+                    break
+                time.sleep(0.05)
+        finally:
+            job_queue.shutdown(wait=True)
+
+        assert job.status == 'succeeded'
+        assert job.result == {'value': 42}
+
+def run_queued(app, job_type, user_id=None, **params):
+    """Insert a queued job row directly and run it synchronously"""
+    with app.app_context():
+        job = Job(job_type=job_type, user_id=user_id, params=params, status='queued')
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+    job_queue._run(job_id)
+    with app.app_context():
+        return db.session.get(Job, job_id)
+
+def test_job_without_handler_fails_at_once(app):
+    job = run_queued(app, 'no_such_job')
+
+    assert job.status == 'failed'
+    assert 'No handler registered' in job.error
+
+def test_label_studio_cleanup_is_not_scheduled_by_default(app):
+    with app.app_context():
+        job_queue._sweep()
+
+        assert Job.query.filter_by(job_type='label_studio_cleanup').count() == 0
+
+def test_scheduled_job_waits_one_interval_then_runs_once_per_interval(app, monkeypatch):
+    from datetime import timedelta
+    from app.models import JobSchedule
+
+    monkeypatch.setitem(job_queue._handlers, 'maintenance', lambda context: None)
+    monkeypatch.setattr(job_queue, '_schedules', {'maintenance': ('MAINTENANCE_INTERVAL', 3600)})
+
+    with app.app_context():
+        job_queue._sweep()
+        schedule = JobSchedule.query.filter_by(job_type='maintenance').one()
+        assert Job.query.filter_by(job_type='maintenance').count() == 0  # Not on first boot
+
+        # The interval has passed (on the database clock)
+        due = schedule.next_run_at - timedelta(hours=1)
+        schedule.next_run_at = due
+        db.session.commit()
+        job_queue._sweep()
+        job_queue._sweep()
+
+        assert Job.query.filter_by(job_type='maintenance').count() == 1
+        assert JobSchedule.query.filter_by(job_type='maintenance').one().next_run_at >= due + timedelta(hours=1)
+
+def test_scheduled_cleanup_never_uses_stored_user_tokens(app, user, monkeypatch):
+    from app import routes
+
+    tokens = []
+    monkeypatch.setattr(routes, 'run_label_studio_cleanup', lambda user, **kwargs: (
+        tokens.append(user.label_studio_api_key) or ({'deleted_projects': 0, 'deleted_tasks': 0}, 200)
+    ))
+
+    job = run_queued(app, 'label_studio_cleanup')
+    assert job.status == 'failed' and 'LABEL_STUDIO_SERVICE_TOKEN' in job.error
+
+    app.config['LABEL_STUDIO_SERVICE_TOKEN'] = 'service-token'
+    job = run_queued(app, 'label_studio_cleanup')
+    assert job.status == 'succeeded', job.error
+    assert tokens == ['service-token']
+
+    job = run_queued(app, 'label_studio_cleanup', user_id=user)
+    assert job.status == 'succeeded', job.error
+    assert tokens == ['service-token', 'token']
@@ -0,0 +1,35 @@
+"""Connection failures, including connect timeouts, invalidate the cached Label Studio endpoint"""
+
+import pytest
+import requests
+
+from app.services import label_studio_client as client_module
+from app.services.label_studio_client import label_studio_client
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    calls = []
+    monkeypatch.setattr(client_module.endpoint_resolver, 'invalidate', lambda: calls.append(True))
+    return calls
+
+def fail_with(monkeypatch, error):
+    def request(session, method, url, **kwargs):
+        raise error
+    monkeypatch.setattr(requests.Session, 'request', request)
+
+@pytest.mark.parametrize('error', [requests.ConnectTimeout('connect timed out'), requests.ConnectionError('refused')])
+def test_unreachable_host_invalidates_endpoint(monkeypatch, invalidations, error):
+    fail_with(monkeypatch, error)
+
+    response = label_studio_client.request('GET', 'http://label-studio.test/api/projects/')
+
+    assert response['status_code'] == 0 and not response['success']
+    assert invalidations == [True]
+
+def test_read_timeout_keeps_endpoint(monkeypatch, invalidations):
+    fail_with(monkeypatch, requests.ReadTimeout('read timed out'))
+
+    response = label_studio_client.request('GET', 'http://label-studio.test/api/projects/')
+
+    assert response['text'] == 'Request timeout'
+    assert invalidations == []
@@ -0,0 +1,113 @@
+"""Label Studio imports send only unmapped images and resume where a failed chunk stopped"""
+
+import pytest
+
+from app import db
+from app.models import User, Company, Product, CapturedImage, LabelStudioTask, LabelStudioSyncState
+from app.routes import run_label_studio_import
+from app.services.label_studio_client import label_studio_client
+from app.services.minio_service import minio_service
+
+PROJECT_ID = 7
+
+@pytest.fixture
+def product(app, monkeypatch):
+    """A product with six stored images (ids 1-6); returns the product id"""
+    monkeypatch.setattr(minio_service, 'presign_many', lambda keys, expires=3600: {
+        key: f'http://minio.test/{key}' for key in keys
+    })
+    app.config['LABEL_STUDIO_IMPORT_CHUNK_SIZE'] = 2
+    with app.app_context():
+        product = Product(name='Widget', company=Company(name='Acme'))
+        db.session.add_all([
+            CapturedImage(filename=f'frame{i}.jpg', product=product, storage_key=f'acme/widget/frame{i}.jpg', file_size=10)
+            for i in range(1, 7)
+        ])
+        db.session.commit()
+        return product.id
+
+@pytest.fixture
+def label_studio(monkeypatch):
+    """
+    Stubbed Label Studio: records the image ids of every import request
+
+    Set failing to a set of image ids whose chunk is rejected, and remote_tasks to
+    the tasks the project already has.
+    """
+    class LabelStudio:
+        imports = []
+        failing = set()
+        remote_tasks = []
+
+        def request(self, method, url, headers=None, data=None, timeout=None):
+            image_ids = [task['image_id'] for task in data]
+            self.imports.append(image_ids)
+            if self.failing & set(image_ids):
+                return {'success': True, 'status_code': 500, 'text': 'Internal Server Error', 'json': None}
+            return {'success': True, 'status_code': 201, 'text': '', 'json': {'task_ids': [100 + i for i in image_ids]}}
+
+        def iter_tasks(self, base_url, project_id, headers=None, page_size=100):
+            return iter(self.remote_tasks)
+
+    stub = LabelStudio()
+    monkeypatch.setattr(label_studio_client, 'request', stub.request)
+    monkeypatch.setattr(label_studio_client, 'iter_tasks', stub.iter_tasks)
+    return stub
+
+def run_import(app, user, product, **kwargs):
+    with app.app_context():
+        return run_label_studio_import(db.session.get(User, user), db.session.get(Product, product), PROJECT_ID, **kwargs)
+
+def mapped_images(app):
+    with app.app_context():
+        return dict(db.session.query(LabelStudioTask.image_id, LabelStudioTask.task_id).all())
+
+def cursor(app, product):
+    with app.app_context():
+        return LabelStudioSyncState.query.filter_by(project_id=PROJECT_ID, product_id=product).one().last_image_id
+
+def test_failed_middle_chunk_leaves_cursor_before_it(app, user, product, label_studio):
+    label_studio.failing = {3}
+
+    payload, status = run_import(app, user, product)
+
+    assert status == 207
+    assert sorted(label_studio.imports) == [[1, 2], [3, 4], [5, 6]]
+    assert [chunk['status'] for chunk in payload['chunks']] == ['succeeded', 'failed', 'succeeded']
+    assert mapped_images(app) == {1: 101, 2: 102, 5: 105, 6: 106}
+    assert cursor(app, product) == 2
+
+def test_rerun_resends_only_unmapped_images(app, user, product, label_studio):
+    label_studio.failing = {3}
+    run_import(app, user, product)
+
+    label_studio.imports.clear()
+    label_studio.failing = set()
+    payload, status = run_import(app, user, product)
+
+    assert status == 200 and payload['sync'] == 'incremental'
+    assert label_studio.imports == [[3, 4]]
+    assert sorted(mapped_images(app)) == [1, 2, 3, 4, 5, 6]
+    assert cursor(app, product) == 6
+
+    label_studio.imports.clear()
+    payload, status = run_import(app, user, product)
+
+    assert status == 200 and payload['imported_count'] == 0
+    assert label_studio.imports == []
+
+def test_first_sync_adopts_existing_remote_tasks(app, user, product, label_studio):
+    label_studio.remote_tasks = [
+        {'id': 501, 'data': {'image_id': 1}},
+        {'id': 502, 'data': {'image_filename': 'frame2.jpg'}},
+        {'id': 999, 'data': {'image_id': 42}},  # Belongs to no local image
+    ]
+
+    payload, status = run_import(app, user, product)
+
+    assert status == 200
+    assert payload['sync'] == 'full'
+    assert payload['adopted_count'] == 2 and payload['imported_count'] == 4
+    assert sorted(label_studio.imports) == [[3, 4], [5, 6]]
+    assert mapped_images(app) == {1: 501, 2: 502, 3: 103, 4: 104, 5: 105, 6: 106}
+    assert cursor(app, product) == 6
@@ -0,0 +1,66 @@
+"""Label Studio product listings run a constant number of queries, however many products exist"""
+
+import pytest
+
+from app import db
+from app.models import ClassCount, Company, LabelStudioProject, Product
+from app.services.label_studio_client import label_studio_client
+
+ENDPOINTS = [
+    '/label-studio/existing-projects',
+    '/label-studio/products',
+    '/label-studio/products-with-companies',
+]
+
+# Token lookup, products, companies, classes and project registry/task counts
+MAX_QUERIES = 6
+
+@pytest.fixture(autouse=True)
+def live_projects(monkeypatch):
+    """Answer Label Studio project lookups without a server"""
+    monkeypatch.setattr(label_studio_client, 'get_project', lambda base_url, project_id, headers: {
+        'id': project_id, 'task_number': 0, 'num_tasks_with_annotations': 0
+    })
+
+def add_products(app, user_id, count):
+    """Create products, each under its own company with classes and a registered project"""
+    with app.app_context():
+        start = Product.query.count()
+        for i in range(start, start + count):
+            company = Company(name=f'Company {i}')
+            product = Product(name=f'Product {i}', company=company)
+            product.class_counts = [ClassCount(class_='ok'), ClassCount(class_='defect')]
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(LabelStudioProject(user_id=user_id, product_id=product.id, project_id=1000 + i,
+                                              title=f'Company {i} - Product {i}', status='ready'))
+        db.session.commit()
+
+def queries_for(client, count_queries, auth_headers, endpoint):
+    with count_queries() as queries:
+        response = client.get(endpoint, headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+    return len(queries), response.get_json()
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_query_count_does_not_grow_with_products(app, client, user, auth_headers, count_queries, endpoint):
+    add_products(app, user, 1)
+    single, _ = queries_for(client, count_queries, auth_headers, endpoint)
+
+    add_products(app, user, 9)
+    many, body = queries_for(client, count_queries, auth_headers, endpoint)
+
+    assert len(body['products']) == 10
+    assert many == single
+    assert many <= MAX_QUERIES
+
+def test_existing_projects_are_matched_to_their_products(app, client, user, auth_headers):
+    add_products(app, user, 3)
+
+    body = client.get('/label-studio/existing-projects', headers=auth_headers).get_json()
+
+    assert body['total_existing_projects'] == 3
+    by_product = {p['product_name']: p for p in body['products']}
+    assert by_product['Product 2']['project_id'] == 1002
+    assert by_product['Product 2']['company_name'] == 'Company 2'
+    assert by_product['Product 2']['classes'] == ['ok', 'defect']
@@ -0,0 +1,53 @@
+"""MinIO bucket checks fail fast while MinIO is down instead of retrying inline"""
+
+import pytest
+from minio import Minio
+
+from app.services.minio_service import minio_service, StorageUnavailableError
+
+@pytest.fixture
+def bucket_checks(app, monkeypatch):
+    """Record bucket_exists calls; the check fails while calls['down'] is set"""
+    calls = {'count': 0, 'down': True}
+
+    def bucket_exists(client, bucket_name):
+        calls['count'] += 1
+        if calls['down']:
+            raise ConnectionRefusedError('connection refused')
+        return True
+
+    monkeypatch.setattr(Minio, 'bucket_exists', bucket_exists)
+    return calls
+
+def test_failed_bucket_check_fails_fast_during_cooldown(app, bucket_checks, monkeypatch):
+    monkeypatch.setattr(minio_service, 'bucket_check_backoff', 60)
+
+    with pytest.raises(ConnectionRefusedError):
+        minio_service.client
+    for _ in range(3):
+        with pytest.raises(StorageUnavailableError):
+            minio_service.client
+
+    assert bucket_checks['count'] == 1
+
+def test_bucket_is_rechecked_after_cooldown(app, bucket_checks, monkeypatch):
+    monkeypatch.setattr(minio_service, 'bucket_check_backoff', 0)
+
+    with pytest.raises(ConnectionRefusedError):
+        minio_service.client
+    bucket_checks['down'] = False
+
+    assert minio_service.client is minio_service.client
+    assert bucket_checks['count'] == 2
+
+def test_callers_do_not_queue_behind_a_recheck(app, bucket_checks, monkeypatch):
+    monkeypatch.setattr(minio_service, 'bucket_check_backoff', 0)
+    with pytest.raises(ConnectionRefusedError):
+        minio_service.client
+
+    # Another caller is re-checking the bucket right now
+    with minio_service._lock:
+        with pytest.raises(StorageUnavailableError):
+            minio_service.client
+
+    assert bucket_checks['count'] == 1
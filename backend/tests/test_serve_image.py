@@ -0,0 +1,114 @@
+"""/serve-image only serves captured images, and variants snap to a bounded set of sizes"""
+
+import io
+
+import pytest
+from PIL import Image
+
+from app import db
+from app.models import Company, Product, CapturedImage, ImageVariant
+from app.services.thumbnail_service import thumbnail_service
+
+OBJECT_KEY = 'acme/widget/capture/frame.jpg'
+
+def jpeg(size=(1600, 1200)):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'gray').save(output, format='JPEG')
+    return output.getvalue()
+
+@pytest.fixture
+def image(app, storage):
+    """A captured image whose object is in the bucket; returns its bytes"""
+    data = jpeg()
+    storage[OBJECT_KEY] = data
+    with app.app_context():
+        company = Company(name='Acme')
+        product = Product(name='Widget', company=company)
+        db.session.add(CapturedImage(filename='frame.jpg', product=product, storage_key=OBJECT_KEY,
+                                     file_size=len(data), checksum='abc123', mime_type='image/jpeg'))
+        db.session.commit()
+    return data
+
+@pytest.mark.parametrize('args, size', [
+    ({'w': 360, 'h': 240}, (360, 240)),
+    ({'w': 100, 'h': 100}, (360, 240)),
+    ({'w': 361}, (720, 480)),
+    ({'h': 700}, (1080, 720)),
+    ({'w': 5000, 'h': 5000}, (1440, 960)),
+])
+def test_variant_sizes_snap_to_allowlist(app, args, size):
+    with app.test_request_context(query_string=args):
+        from flask import request
+        assert thumbnail_service.parse_variant_args(request.args) == (*size, 'jpeg')
+
+def test_arbitrary_sizes_share_one_variant(app, client, image, storage):
+    for width in (361, 500, 719):
+        response = client.get(f'/serve-image/{OBJECT_KEY}?w={width}&fmt=webp')
+        assert response.status_code == 200 and response.mimetype == 'image/webp'
+
+    with app.app_context():
+        variants = db.session.query(ImageVariant.width, ImageVariant.height).all()
+    assert variants == [(720, 480)]
+    assert sorted(storage) == [f'_variants/720x480/{OBJECT_KEY}.webp', OBJECT_KEY]
+
+def test_unknown_key_is_not_served_or_resized(client, image, storage):
+    storage['acme/widget/capture/orphan.jpg'] = jpeg()
+
+    assert client.get('/serve-image/acme/widget/capture/orphan.jpg').status_code == 404
+    assert client.get('/serve-image/acme/widget/capture/orphan.jpg?w=360&h=240').status_code == 404
+    assert not any(key.startswith('_variants/') for key in storage)
+
+@pytest.mark.parametrize('prefix', ['_variants/360x240', '_jobs/1'])
+def test_derived_objects_are_not_served(client, image, storage, prefix):
+    storage[f'{prefix}/{OBJECT_KEY}'] = b'derived'
+
+    assert client.get(f'/serve-image/{prefix}/{OBJECT_KEY}').status_code == 404
+
+def test_full_response_carries_validators(client, image):
+    response = client.get(f'/serve-image/{OBJECT_KEY}')
+
+    assert response.status_code == 200 and response.data == image
+    assert response.headers['ETag'] == '"abc123"'
+    assert response.headers['Last-Modified']
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.content_length == len(image) and response.mimetype == 'image/jpeg'
+
+def test_validators_fall_back_to_object_metadata(app, client, image):
+    with app.app_context():
+        CapturedImage.query.update({'checksum': None})
+        db.session.commit()
+
+    response = client.get(f'/serve-image/{OBJECT_KEY}')
+
+    assert response.status_code == 200 and response.data == image
+    assert response.headers['ETag'] == f'"etag-{len(image)}"'
+    assert response.headers['Last-Modified'] == 'Wed, 01 Jan 2025 00:00:00 GMT'
+
+@pytest.mark.parametrize('validator', ['If-None-Match', 'If-Modified-Since'])
+def test_unchanged_image_is_revalidated_without_reading_the_object(client, image, storage, validator):
+    first = client.get(f'/serve-image/{OBJECT_KEY}')
+    value = first.headers['ETag'] if validator == 'If-None-Match' else first.headers['Last-Modified']
+    del storage[OBJECT_KEY]
+
+    response = client.get(f'/serve-image/{OBJECT_KEY}', headers={validator: value})
+
+    assert response.status_code == 304 and response.data == b''
+    assert response.headers['ETag'] == '"abc123"'
+
+def test_single_range_is_served_partially(client, image):
+    response = client.get(f'/serve-image/{OBJECT_KEY}', headers={'Range': 'bytes=10-19'})
+
+    assert response.status_code == 206
+    assert response.data == image[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(image)}'
+    assert response.content_length == 10
+
+    # A stale If-Range turns the request into a full response
+    response = client.get(f'/serve-image/{OBJECT_KEY}', headers={'Range': 'bytes=10-19', 'If-Range': '"old"'})
+    assert response.status_code == 200 and response.data == image
+
+def test_unsatisfiable_range(client, image):
+    response = client.get(f'/serve-image/{OBJECT_KEY}', headers={'Range': f'bytes={len(image)}-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(image)}'
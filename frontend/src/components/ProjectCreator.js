@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useContext, useRef, useCallback } from 'react';
 import { Card, Form, Button, Alert, Table, Badge } from 'react-bootstrap';
 import { AuthContext } from '../context/AuthContext';
-import api from '../services/api';
+import api, { waitForJob } from '../services/api';
 
 function ProjectCreator() {
   const { user } = useContext(AuthContext);
@@ -138,7 +138,8 @@ function ProjectCreator() {
     console.log(`[ProjectCreator] Importing images with request ID: ${requestId}`);
 
     try {
-      const response = await api.post('/label-studio/import-images', {
+      // Imports run as a background job so large products don't hit HTTP timeouts
+      const response = await api.post('/label-studio/import-images?async=true', {
         project_id: projectStep.project_id,
         product_id: projectStep.product_id
       }, {
@@ -147,12 +148,21 @@ function ProjectCreator() {
         }
       });
 
-      setImportSuccess(`${response.data.message} for project "${projectStep.project_name}"`);
+      const job = await waitForJob(response.data.job_id, {
+        onProgress: (progress) => {
+          if (progress?.message) {
+            setImportSuccess(`${progress.message}...`);
+          }
+        }
+      });
+
+      setImportSuccess(`${job.result.message} for project "${projectStep.project_name}"`);
       // Refresh the project data to update task counts
       await fetchProducts();
     } catch (error) {
       console.error('Error importing images:', error);
-      setError(error.response?.data?.error || 'Failed to import images');
+      setImportSuccess('');
+      setError(error.response?.data?.error || error.message || 'Failed to import images');
     } finally {
       setImportingImages(false);
       isImportingRef.current = false;
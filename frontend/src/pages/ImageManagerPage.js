@@ -4,6 +4,8 @@ import AuthContext from "../context/AuthContext";
 import CaptureImage from "../components/CaptureImage";
 import { downloadAllImages } from "../services/api";
 
+const IMAGE_PAGE_SIZE = 100;
+
 const ImageManagerPage = () => {
   const { auth } = useContext(AuthContext);
   const [companies, setCompanies] = useState([]);
@@ -11,8 +13,20 @@ const ImageManagerPage = () => {
   const [images, setImages] = useState([]);
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [message, setMessage] = useState("");
 
+  // Images are paginated server-side; one page is fetched at a time and X-Next-Cursor
+  // (absent on the last page) is kept for "Load more"
+  const fetchCompanyImages = async (companyId, cursor = null) => {
+    const res = await axios.get(`${process.env.REACT_APP_API_URL || ""}/companies/${companyId}/images`, {
+      headers: { Authorization: `Bearer ${auth.token}` },
+      params: cursor ? { limit: IMAGE_PAGE_SIZE, cursor } : { limit: IMAGE_PAGE_SIZE },
+    });
+    return { images: res.data, nextCursor: res.headers["x-next-cursor"] || null };
+  };
+
   useEffect(() => {
     const fetchCompanies = async () => {
       try {
@@ -30,17 +44,17 @@ const ImageManagerPage = () => {
   useEffect(() => {
     if (!selectedCompany) return;
     setLoading(true);
+    setNextCursor(null);
     const fetchData = async () => {
       try {
-        const [imgRes, prodRes] = await Promise.all([
-          axios.get(`${process.env.REACT_APP_API_URL || ""}/companies/${selectedCompany}/images`, {
-            headers: { Authorization: `Bearer ${auth.token}` },
-          }),
+        const [page, prodRes] = await Promise.all([
+          fetchCompanyImages(selectedCompany),
           axios.get(`${process.env.REACT_APP_API_URL || ""}/products`, {
             headers: { Authorization: `Bearer ${auth.token}` },
           }),
         ]);
-        setImages(imgRes.data);
+        setImages(page.images);
+        setNextCursor(page.nextCursor);
         setProducts(prodRes.data.filter(p => String(p.company_id) === String(selectedCompany)));
       } catch (err) {
         setMessage("Failed to load images/products.");
@@ -65,16 +79,27 @@ const ImageManagerPage = () => {
   const refreshImages = async () => {
     if (!selectedCompany) return;
     try {
-      const imgRes = await axios.get(`${process.env.REACT_APP_API_URL || ""}/companies/${selectedCompany}/images`, {
-        headers: { Authorization: `Bearer ${auth.token}` },
-      });
-      console.log('Images data:', imgRes.data); // Debug log
-      setImages(imgRes.data);
+      const page = await fetchCompanyImages(selectedCompany);
+      setImages(page.images);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setMessage("Failed to refresh images.");
     }
   };
 
+  const loadMoreImages = async () => {
+    if (!selectedCompany || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchCompanyImages(selectedCompany, nextCursor);
+      setImages(prev => [...prev, ...page.images]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setMessage("Failed to load more images.");
+    }
+    setLoadingMore(false);
+  };
+
   const handleDownloadAll = async () => {
     setMessage("Preparing download...");
     const result = await downloadAllImages();
@@ -185,7 +210,7 @@ const ImageManagerPage = () => {
                             </div>
                             {img.access_url ? (
                               <img 
-                                src={img.access_url} 
+                                src={img.thumbnail_url || img.access_url} 
                                 alt="img" 
                                 style={{ width: 180, height: 120, objectFit: "cover", borderRadius: "3px" }}
                                 onError={(e) => {
@@ -233,6 +258,22 @@ const ImageManagerPage = () => {
                   ))}
                 </div>
               )}
+              {nextCursor && (
+                <button
+                  onClick={loadMoreImages}
+                  disabled={loadingMore}
+                  style={{
+                    backgroundColor: '#6c757d',
+                    color: 'white',
+                    border: 'none',
+                    padding: '10px 20px',
+                    borderRadius: '5px',
+                    cursor: loadingMore ? 'not-allowed' : 'pointer'
+                  }}
+                >
+                  {loadingMore ? 'Loading...' : 'Load more images'}
+                </button>
+              )}
             </div>
           )}
         </>
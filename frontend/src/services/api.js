@@ -178,4 +178,23 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Background Job APIs
+// Poll /jobs/<id> until the job finishes; resolves with the job, rejects with its error
+export const waitForJob = async (jobId, { interval = 2000, onProgress } = {}) => {
+  for (;;) {
+    const response = await api.get(`/jobs/${jobId}`);
+    const job = response.data;
+    if (onProgress) {
+      onProgress(job.progress);
+    }
+    if (job.status === 'succeeded') {
+      return job;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Job failed');
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+};
+
 export default api;
@@ -31,13 +31,114 @@ CREATE TABLE captured_image (
     id SERIAL PRIMARY KEY,
     filename VARCHAR(255) NOT NULL,
     product_id INTEGER REFERENCES product(id) ON DELETE CASCADE,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- Keyset pagination column, never NULL
     -- MinIO/Object Storage fields
     storage_url VARCHAR(1000),           -- Full URL to access the image
     storage_bucket VARCHAR(100) DEFAULT 'qc-images',  -- Bucket name
     storage_key VARCHAR(500),            -- Object key/path in storage
     file_size BIGINT,                    -- File size in bytes
     mime_type VARCHAR(100) DEFAULT 'image/jpeg',  -- MIME type
-    checksum VARCHAR(64),                -- MD5 or SHA256 for integrity
-    storage_provider VARCHAR(50) DEFAULT 'minio'  -- Storage provider type
+    checksum VARCHAR(64),                -- Content hash for integrity and deduplication
+    checksum_algorithm VARCHAR(16),      -- blake2b, sha256 or md5 (NULL: MD5, hashed before this was recorded)
+    storage_provider VARCHAR(50) DEFAULT 'minio',  -- Storage provider type
+    -- Integrity verification
+    integrity_status VARCHAR(20),        -- ok, corrupt or missing (NULL: not verified yet)
+    verified_at TIMESTAMP                -- When the stored object was last re-hashed
+);
+
+-- Indexes for hot captured_image queries (keep in sync with migration 3f1c2a7b9d04)
+CREATE INDEX ix_product_company_id ON product (company_id);
+CREATE INDEX ix_class_count_product_id ON class_count (product_id);
+CREATE INDEX ix_captured_image_product_id_timestamp_id ON captured_image (product_id, timestamp, id);
+CREATE INDEX ix_captured_image_timestamp_id ON captured_image (timestamp, id);
+CREATE INDEX ix_captured_image_checksum ON captured_image (checksum);
+CREATE INDEX ix_captured_image_storage_key ON captured_image (storage_key);
+CREATE INDEX ix_captured_image_integrity_status ON captured_image (integrity_status);
+
+CREATE TABLE stored_object (
+    id SERIAL PRIMARY KEY,
+    storage_key VARCHAR(500) UNIQUE NOT NULL,  -- Object key in storage
+    checksum_algorithm VARCHAR(16) NOT NULL,  -- Algorithm the checksum was computed with
+    checksum VARCHAR(64) NOT NULL,       -- Content checksum the object is addressed by
+    file_size BIGINT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 1,  -- Images (and in-flight uploads) using the object
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX ix_stored_object_checksum_file_size ON stored_object (checksum, file_size);
+
+CREATE TABLE image_variant (
+    id SERIAL PRIMARY KEY,
+    image_id INTEGER NOT NULL REFERENCES captured_image(id) ON DELETE CASCADE,
+    width INTEGER NOT NULL,              -- Requested bounding box (0 = unconstrained)
+    height INTEGER NOT NULL,
+    format VARCHAR(10) NOT NULL,         -- jpeg or webp
+    storage_key VARCHAR(500) NOT NULL,   -- Object key of the variant in storage
+    file_size BIGINT,
+    mime_type VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_image_variant_size_format UNIQUE (image_id, width, height, format)
+);
+
+CREATE INDEX ix_image_variant_image_id ON image_variant (image_id);
+
+CREATE TABLE job (
+    id SERIAL PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,       -- Registered handler name, e.g. 'label_studio_import'
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- queued, running, succeeded, failed
+    user_id INTEGER REFERENCES "user"(id) ON DELETE SET NULL,
+    params JSON,
+    progress_current INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    message VARCHAR(500),
+    result JSON,
+    error TEXT,
+    artifact_key VARCHAR(500),           -- Object key of the produced file in storage
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    heartbeat_at TIMESTAMP
+);
+
+CREATE INDEX ix_job_status ON job (status);
+CREATE INDEX ix_job_user_id ON job (user_id);
+
+CREATE TABLE job_schedule (
+    id SERIAL PRIMARY KEY,
+    job_type VARCHAR(50) UNIQUE NOT NULL,  -- Registered handler name
+    next_run_at TIMESTAMP NOT NULL       -- On the database clock, like created_at
+);
+
+CREATE TABLE label_studio_project (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES "user"(id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES product(id) ON DELETE CASCADE,
+    project_id INTEGER,                  -- Label Studio project id, set once created
+    title VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, creating, ready
+    claimed_at TIMESTAMP,                -- When a worker started creating the project
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_label_studio_project_user_product UNIQUE (user_id, product_id)  -- One project per user and product
+);
+
+CREATE INDEX ix_label_studio_project_project_id ON label_studio_project (project_id);
+
+CREATE TABLE label_studio_task (
+    id SERIAL PRIMARY KEY,
+    image_id INTEGER NOT NULL REFERENCES captured_image(id) ON DELETE CASCADE,
+    project_id INTEGER NOT NULL,         -- Label Studio project id
+    task_id INTEGER,                     -- Label Studio task id (when reported by the import API)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_label_studio_task_project_image UNIQUE (project_id, image_id)
+);
+
+CREATE INDEX ix_label_studio_task_task_id ON label_studio_task (task_id);
+
+CREATE TABLE label_studio_sync_state (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL,         -- Label Studio project id
+    product_id INTEGER NOT NULL REFERENCES product(id) ON DELETE CASCADE,
+    last_image_id INTEGER NOT NULL DEFAULT 0,  -- Every image up to this id has been synced
+    last_synced_at TIMESTAMP,
+    CONSTRAINT uq_label_studio_sync_state_project_product UNIQUE (project_id, product_id)
 );